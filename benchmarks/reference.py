@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Set
+from utils.eia_api import EIADataPuller
+
+# Implementations replaced by the optimized code paths, kept verbatim (apart
+# from their names) so tests and benchmarks can compare against them.
+
+def eia_rows_frame(puller: EIADataPuller, header: Dict[str, Any], url: str, dataset: str, facet_cols: List[str]) -> pd.DataFrame:
+    """
+    EIA rows before pages were streamed into typed arrays: every page is
+    kept as JSON dicts, then the whole list becomes a DataFrame.
+    """
+    exp_cols = ["period", "value", *facet_cols]
+    return pd.DataFrame(puller._get_all_data(header, url, dataset))[exp_cols]
+
+def upscale_monthly_to_weekly_columns(df: pd.DataFrame, datetime_col: str, value_cols: List[str]) -> pd.DataFrame:
+    """
+    DataTransforms.upscale_monthly_to_weekly_columns before it was
+    vectorized, with a strftime week number.
+    """
+    monthly_df = df.assign(**{col: df[col] / df[datetime_col].dt.days_in_month for col in value_cols})
+
+    weekly_index = pd.date_range(df[datetime_col].min(), df[datetime_col].max() + pd.Timedelta(weeks=4), freq='W-FRI', inclusive='both')
+
+    weekly_df = (pd.DataFrame(weekly_index,columns=[datetime_col])
+        .sort_values(by=[datetime_col])
+        .assign(Year=lambda x: x[datetime_col].dt.year,
+                Month=lambda x: x[datetime_col].dt.month,
+                Week=lambda x: x[datetime_col].dt.strftime("%U").astype(int))
+    )
+    merged_df = pd.merge(weekly_df, monthly_df.drop(columns=[datetime_col]), on=["Year", "Month"], how="left")
+    merged_df[value_cols] = merged_df[value_cols] / 30 * 4 # Assume scaled to 30 days/month, then scale to 4 weeks/month
+    return merged_df
+
+def weekly_interpolate_from_middle_week(df: pd.DataFrame, datetime_col: str, value_col: str) -> pd.DataFrame:
+    """
+    DataTransforms.weekly_interpolate_from_middle_week before it was
+    vectorized, one groupby-apply per month. Adds an is_middle_week column
+    to df and always writes the result to a column named value.
+    """
+    df['is_middle_week'] = (df
+        .groupby(df[datetime_col].dt.to_period('M'), group_keys=False)
+        .apply(lambda g: g[datetime_col] == min(g[datetime_col], key=lambda d: abs(d - (d.replace(day=15)))))
+    )
+
+    return (df
+        .assign(value=lambda x: 
+            x[value_col]
+            .where(x['is_middle_week'], np.nan)
+            .interpolate('linear', limit_direction='both')
+        )
+        .drop(columns=["is_middle_week"])
+    )
+
+def extract_degree_day_data(year: int, lines: List[str], states: List[str]) -> pd.DataFrame:
+    """
+    noaa.extract_degree_day_data before bulk parsing: every value of every
+    selected state row is converted and summed one at a time.
+    """
+    states: Set[str] = set(states)
+    day_type = "Cooling_Days" if "Cooling" in lines[0] else "Heating_Days"
+    n_days = len(lines[3].split("|")) - 1 
+
+    day_sum: Dict[datetime, int] = {}
+    for row in [row.split("|") for row in lines[4:-1]]: # Skip last empty line
+
+        if row[0] not in states:
+            continue
+
+        date = datetime(year, 1, 1)
+        for day_n in range(n_days):
+            cooling_days = int(row[day_n + 1])
+
+            day_sum[date] = day_sum.get(date, 0) + cooling_days
+
+            date += timedelta(days=1)
+
+    columns = ["period", day_type]
+
+    df = pd.DataFrame([(date, day_sum[date]) for date in day_sum], columns=columns)
+    return df
@@ -0,0 +1,350 @@
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pyarrow
+import sklearn
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import train_test_split
+from utils.batch import BATCH_REGIONS
+from utils.custom_types import FuelType, StorageRegion, storage_region_to_noaa_states
+from utils.data_transforms import DataTransforms
+from utils.feature_store import FeatureStore, ENGINEERED_FEATURES
+from utils.eia_api import EIADataPuller
+from utils.noaa import (
+    DegreeDayWeights,
+    extract_degree_day_data,
+    extract_degree_day_data_by_region,
+    extract_weighted_degree_day_data,
+    get_noaa_day_data_by_region,
+)
+from benchmarks import reference, synthetic
+from benchmarks.stand_in import StandInProcess, offline_puller, use_stand_in
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_LATENCY = 0.02 # Seconds per request, roughly a round trip to api.eia.gov
+DEFAULT_TOLERANCE = 0.25 # Median slowdown flagged as a regression by --compare
+STATE_PARSE_YEARS = 15 # Years of StatesCONUS files parsed for every state by parse.noaa_states
+
+# Synthetic data sizes. "default" matches a full history pull of the live datasets
+PROFILES: Dict[str, Dict[str, int]] = {
+    "small": {"eia_years": 2, "noaa_years": 2, "transform_years": 20, "model_rows": 2_000, "model_features": 13},
+    "default": {"eia_years": 16, "noaa_years": 16, "transform_years": 100, "model_rows": 50_000, "model_features": 13},
+    "large": {"eia_years": 32, "noaa_years": 40, "transform_years": 500, "model_rows": 500_000, "model_features": 13},
+}
+
+class Benchmark:
+    """
+    A timed call of func. setup runs before every call (untimed) and
+    returns the arguments for func, so benchmarks of functions that mutate
+    their input get a fresh copy each time.
+    """
+    def __init__(self, name: str, func: Callable[..., Any], setup: Optional[Callable[[], Tuple]] = None):
+        self.name = name
+        self.func = func
+        self.setup = setup or (lambda: ())
+
+def _output_rows(output: Any) -> int:
+    if isinstance(output, pd.DataFrame):
+        return len(output)
+    if isinstance(output, dict):
+        return sum(_output_rows(value) for value in output.values())
+    if isinstance(output, (list, tuple)):
+        return sum(_output_rows(value) for value in output)
+    return 0
+
+def measure(benchmark: Benchmark, repeat: int, request_count: Optional[Callable[[], int]] = None) -> Dict[str, Any]:
+    """
+    Times repeat calls of a benchmark, then makes one more call under
+    tracemalloc for its peak Python heap allocation. Timing and memory
+    runs are separate since tracemalloc slows allocation-heavy code.
+    Arrow allocates from its own pool, out of tracemalloc's sight, so the
+    bytes allocated from that pool during the call are recorded as well
+    (an upper bound of its peak).
+    """
+    timings: List[float] = []
+    requests_before = request_count() if request_count else 0
+    for _ in range(repeat):
+        args = benchmark.setup()
+        gc.collect()
+        start_time = time.perf_counter()
+        output = benchmark.func(*args)
+        timings.append(time.perf_counter() - start_time)
+    requests_per_call = (request_count() - requests_before) / repeat if request_count else None
+
+    args = benchmark.setup()
+    gc.collect()
+    arrow_bytes_before = pyarrow.default_memory_pool().total_bytes_allocated()
+    tracemalloc.start()
+    benchmark.func(*args)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_bytes = pyarrow.default_memory_pool().total_bytes_allocated() - arrow_bytes_before
+
+    result = {
+        "seconds": {
+            "min": min(timings),
+            "median": float(np.median(timings)),
+            "mean": float(np.mean(timings)),
+            "runs": timings,
+        },
+        "peak_mb": peak_bytes / 1e6,
+        "arrow_mb": arrow_bytes / 1e6,
+        "rows": _output_rows(output),
+    }
+    if requests_per_call is not None:
+        result["requests"] = requests_per_call
+    return result
+
+def fetch_benchmarks(eia_start: str, noaa_years: int) -> List[Benchmark]:
+    """
+    EIADataPuller and NOAA pulls of every region, end to end (HTTP,
+    pagination, JSON decoding and the per-region reshaping).
+    """
+    regions = BATCH_REGIONS
+    end_year = datetime.now().year
+
+    def puller() -> Tuple[EIADataPuller]:
+        return (EIADataPuller(StorageRegion.EAST, use_cache=False),)
+
+    return [
+        Benchmark("fetch.storage", lambda p: p.get_storage_data_for_regions(regions, eia_start), puller),
+        Benchmark("fetch.power_gen", lambda p: p.get_power_gen_data_for_regions(FuelType.NATURAL_GAS, regions, eia_start), puller),
+        Benchmark("fetch.ng_usage", lambda p: p.get_all_ng_usage_data_for_regions(regions, eia_start), puller),
+        Benchmark("fetch.ng_withdrawls", lambda p: p.get_ng_withdrawls_data_for_regions(regions, eia_start), puller),
+        Benchmark("fetch.degree_days", lambda: get_noaa_day_data_by_region(end_year - noaa_years + 1, end_year, storage_region_to_noaa_states)),
+    ]
+
+def parse_benchmarks(eia_start: str, eia_end: str, noaa_years: int) -> List[Benchmark]:
+    """
+    Decoding of already downloaded responses, without any HTTP. The
+    .reference variants run the implementations the current code replaced.
+    """
+    power_gen_puller = offline_puller(synthetic.power_gen_rows(eia_start, eia_end))
+    power_gen_facets = ["respondent", "respondent-name"]
+    end_year = datetime.now().year
+    degree_day_files = [
+        (year, synthetic.degree_day_text(year, day_kind).split("\n"))
+        for year in range(end_year - noaa_years + 1, end_year + 1)
+        for day_kind in ["Heating", "Cooling"]
+    ]
+    divisions = synthetic.climate_divisions()
+    division_files = [
+        (year, synthetic.degree_day_text(year, day_kind, [str(division_id) for division_id in divisions]).split("\n"))
+        for year in range(end_year - noaa_years + 1, end_year + 1)
+        for day_kind in ["Heating", "Cooling"]
+    ]
+    division_weights = DegreeDayWeights.from_divisions(storage_region_to_noaa_states, divisions)
+    state_files = [
+        (year, synthetic.degree_day_text(year, day_kind).split("\n"))
+        for year in range(end_year - STATE_PARSE_YEARS, end_year)
+        for day_kind in ["Heating", "Cooling"]
+    ]
+
+    def noaa_files() -> List[Dict]:
+        return [extract_degree_day_data_by_region(year, lines, storage_region_to_noaa_states) for year, lines in degree_day_files]
+
+    def noaa_state_files(extract: Callable[[int, List[str], List[str]], pd.DataFrame]) -> List[pd.DataFrame]:
+        return [extract(year, lines, synthetic.ALL_STATES) for year, lines in state_files]
+
+    def noaa_division_files() -> List[Dict]:
+        return [extract_weighted_degree_day_data(year, lines, division_weights) for year, lines in division_files]
+
+    return [
+        Benchmark("parse.eia_frame", lambda: power_gen_puller._get_frame({}, "", "eia_power_gen", power_gen_facets)),
+        Benchmark("parse.eia_frame.reference", lambda: reference.eia_rows_frame(power_gen_puller, {}, "", "eia_power_gen", power_gen_facets)),
+        Benchmark("parse.noaa_degree_days", noaa_files),
+        Benchmark("parse.noaa_states", lambda: noaa_state_files(extract_degree_day_data)),
+        Benchmark("parse.noaa_states.reference", lambda: noaa_state_files(reference.extract_degree_day_data)),
+        Benchmark("parse.noaa_division_degree_days", noaa_division_files),
+    ]
+
+def transform_benchmarks(transform_years: int) -> List[Benchmark]:
+    usage_cols = ["ELECTRICITY", "COMMERCIAL", "VEHICLEFUEL", "DELIVERY", "INDUSTRIAL", "RESIDENTIAL"]
+    monthly_df = synthetic.monthly_frame(12 * transform_years, usage_cols)
+    weekly_df = synthetic.weekly_frame(52 * transform_years)
+    daily_df = synthetic.daily_frame(365 * transform_years)
+
+    return [
+        Benchmark("transforms.upscale_monthly_to_weekly",
+                  lambda: DataTransforms.upscale_monthly_to_weekly_columns(monthly_df, "period", usage_cols)),
+        Benchmark("transforms.upscale_monthly_to_weekly.reference",
+                  lambda: reference.upscale_monthly_to_weekly_columns(monthly_df, "period", usage_cols)),
+        Benchmark("transforms.weekly_interpolate_from_middle_week",
+                  lambda: DataTransforms.weekly_interpolate_from_middle_week(weekly_df, "period", "value")),
+        Benchmark("transforms.weekly_interpolate_from_middle_week.reference",
+                  lambda df: reference.weekly_interpolate_from_middle_week(df, "period", "value"),
+                  lambda: (weekly_df.copy(),)), # Mutates its input
+        Benchmark("transforms.downscale_daily_to_weekly",
+                  lambda: DataTransforms.downscale_daily_to_weekly(daily_df, "period", "value")),
+        Benchmark("transforms.calculate_deviation_from_yearly_avg",
+                  lambda df: DataTransforms.calculate_deviation_from_yearly_avg(df, "period", "value"),
+                  lambda: (weekly_df.copy(),)), # Mutates its input
+    ]
+
+def store_benchmarks(n_rows: int, n_features: int) -> List[Benchmark]:
+    """
+    Reads of a feature table from the feature store, in full and
+    projected to a few columns of its last fifth of periods. The .csv
+    variants read the same table from its CSV export the way the notebooks
+    do, filtering after the read.
+    """
+    df = synthetic.feature_matrix(n_rows, n_features).assign(period=pd.date_range("2000-01-01", periods=n_rows, freq="h")) # Hourly keeps large tables in range
+    columns = ["period", "feature_0", "feature_1", "target"]
+    start = df["period"].iloc[n_rows * 4 // 5]
+
+    store_dir = tempfile.TemporaryDirectory(prefix="nat-gas-store-") # Removed once the closures below are released
+    feature_store = FeatureStore(Path(store_dir.name))
+    feature_store.publish(StorageRegion.EAST, ENGINEERED_FEATURES, df, Path(store_dir.name))
+    csv_path = FeatureStore.csv_path(StorageRegion.EAST, ENGINEERED_FEATURES, Path(store_dir.name))
+
+    def read_csv(usecols: Optional[List[str]] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        _ = store_dir
+        csv_df = pd.read_csv(csv_path, usecols=usecols).astype({"period": "datetime64[ns]"})
+        return csv_df if start is None else csv_df[csv_df["period"] >= start]
+
+    return [
+        Benchmark("store.read_full", lambda: feature_store.read(StorageRegion.EAST, ENGINEERED_FEATURES)),
+        Benchmark("store.read_full.csv", lambda: read_csv()),
+        Benchmark("store.read_filtered", lambda: feature_store.read(StorageRegion.EAST, ENGINEERED_FEATURES, columns=columns, start=start)),
+        Benchmark("store.read_filtered.csv", lambda: read_csv(columns, start)),
+    ]
+
+def model_benchmarks(model_rows: int, model_features: int) -> List[Benchmark]:
+    """
+    The regression.ipynb fit: 80/20 split, LinearRegression fit and score.
+    """
+    df = synthetic.feature_matrix(model_rows, model_features)
+    features = [col for col in df.columns if col != "target"]
+
+    def fit() -> float:
+        x_train, x_test, y_train, y_test = train_test_split(df[features], df[["target"]], test_size=0.2, random_state=42)
+        model = LinearRegression().fit(x_train, y_train)
+        return model.score(x_test, y_test)
+
+    return [Benchmark("model.linear_regression", fit)]
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(profile: str = "default", repeat: int = 5, latency: float = DEFAULT_LATENCY,
+                   only: Optional[List[str]] = None, fault_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Runs every benchmark whose name starts with one of only (all by
+    default) and returns the results with the run metadata. fault_rate is
+    the share of stand-in requests failed with a 429 or 5xx.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile}, expected one of {list(PROFILES)}")
+    sizes = PROFILES[profile]
+    eia_end = datetime.now().strftime("%Y-%m-%d")
+    eia_start = f"{datetime.now().year - sizes['eia_years'] + 1}-01-01"
+
+    def selected(benchmarks: List[Benchmark]) -> Iterator[Benchmark]:
+        return (benchmark for benchmark in benchmarks if not only or any(benchmark.name.startswith(prefix) for prefix in only))
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def run(benchmark: Benchmark, request_count: Optional[Callable[[], int]] = None) -> None:
+        print(f"Running {benchmark.name}...")
+        results[benchmark.name] = measure(benchmark, repeat, request_count)
+
+    fetches = list(selected(fetch_benchmarks(eia_start, sizes["noaa_years"])))
+    if fetches:
+        with StandInProcess(eia_start, eia_end, latency=latency, fault_rate=fault_rate) as server, use_stand_in(server):
+            for benchmark in fetches:
+                run(benchmark, lambda: server.request_count)
+
+    for benchmark in selected(parse_benchmarks(eia_start, eia_end, sizes["noaa_years"])):
+        run(benchmark)
+    for benchmark in selected(transform_benchmarks(sizes["transform_years"])):
+        run(benchmark)
+    for benchmark in selected(store_benchmarks(sizes["model_rows"], sizes["model_features"])):
+        run(benchmark)
+    for benchmark in selected(model_benchmarks(sizes["model_rows"], sizes["model_features"])):
+        run(benchmark)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "profile": profile,
+            "sizes": sizes,
+            "repeat": repeat,
+            "latency": latency,
+            "fault_rate": fault_rate,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "versions": {"numpy": np.__version__, "pandas": pd.__version__, "pyarrow": pyarrow.__version__, "sklearn": sklearn.__version__},
+        },
+        "results": results,
+    }
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Prints median time and peak memory against a baseline run and returns
+    the names of benchmarks whose median slowed down by more than tolerance.
+    """
+    regressions = []
+    print(f"{'Benchmark':<60}{'Median s':>10}{'Baseline':>10}{'Ratio':>8}{'Peak MB':>10}{'Baseline':>10}")
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        base = baseline["results"][name]
+        ratio = result["seconds"]["median"] / base["seconds"]["median"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<60}{result['seconds']['median']:>10.4f}{base['seconds']['median']:>10.4f}{ratio:>8.2f}"
+              f"{result['peak_mb']:>10.1f}{base['peak_mb']:>10.1f}{flag}")
+    return regressions
+
+def print_results(results: Dict[str, Any]) -> None:
+    print(f"{'Benchmark':<60}{'Median s':>10}{'Min s':>10}{'Peak MB':>10}{'Arrow MB':>10}{'Rows':>10}")
+    for name, result in results["results"].items():
+        print(f"{name:<60}{result['seconds']['median']:>10.4f}{result['seconds']['min']:>10.4f}{result['peak_mb']:>10.1f}"
+              f"{result.get('arrow_mb', 0.0):>10.1f}{result['rows']:>10}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Timing and memory benchmarks against a local EIA/NOAA stand-in.")
+    parser.add_argument("--profile", choices=list(PROFILES), default="default", help="Synthetic data size")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per benchmark")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="Simulated seconds per stand-in request")
+    parser.add_argument("--fault-rate", type=float, default=0.0, help="Share of stand-in requests failed with a 429 or 5xx")
+    parser.add_argument("--only", nargs="+", help="Benchmark name prefixes to run, e.g. fetch transforms.upscale")
+    parser.add_argument("--output", type=Path, help="Results JSON path (default benchmarks/results/<timestamp>-<profile>.json)")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Median slowdown ratio above 1 flagged by --compare")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.profile, args.repeat, args.latency, args.only, args.fault_rate)
+    output_path = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{args.profile}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print_results(results)
+    print(f"Saved results to {output_path}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare_results(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {regressions}")
+            return 1
+    return 0
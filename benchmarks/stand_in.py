@@ -0,0 +1,273 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+import multiprocessing
+import pandas as pd
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+import utils.eia_api as eia_api
+import utils.noaa as noaa
+from utils.custom_types import StorageRegion
+from utils.eia_api import EIADataPuller, MAX_QUERY_SIZE
+from utils.scheduler import EIA, NOAA, RequestScheduler, set_scheduler
+from multiprocessing.connection import Connection
+from benchmarks.synthetic import climate_divisions, climate_divisions_text, degree_day_text, eia_dataset_rows
+
+QUERY_CACHE_SIZE = 32 # Filtered row lists kept so paging through a query doesn't re-filter every page
+DEGREE_DAY_PATH = re.compile(r"^/noaa/(\d{4})/(StatesCONUS|ClimateDivisions)\.(Heating|Cooling)\.txt$")
+CLIMATE_DIVISIONS_PATH = "/noaa/regions/ClimateDivisions.txt"
+FAULT_STATUSES = (429, 500, 502, 503)
+STAND_IN_CONCURRENCY = 16 # Enough slots that the schedulers never bound the fetch benchmarks
+STAND_IN_RETRIES = 10 # High fault rates should slow a pull down, not fail it
+
+def _period_in_range(period: str, start: Optional[str], end: Optional[str]) -> bool:
+    # Periods are YYYY-MM or YYYY-MM-DD, so compare against start/end truncated to the same precision
+    return (start is None or start[:len(period)] <= period) and (end is None or period <= end[:len(period)])
+
+def degree_days_to_date(year: int, day_kind: str, file_name: str = "StatesCONUS") -> str:
+    # The current year's file only runs to today, like the live files
+    rows = [str(division_id) for division_id in climate_divisions()] if file_name == "ClimateDivisions" else None
+    return degree_day_text(year, day_kind, rows, end=pd.Timestamp.today().normalize())
+
+class StandInServer:
+    """
+    Local HTTP stand-in for the EIA v2 API and the NOAA degree day files.
+
+    EIA requests are served from eia_rows (route -> rows, e.g. from
+    synthetic.eia_dataset_rows()) under /v2/{route}/, honoring the facets,
+    start, end, sort, offset and length of the X-Params header like the
+    live API. StatesCONUS and ClimateDivisions files are served under
+    /noaa/{year}/{file}.{Heating|Cooling}.txt from degree_days(year,
+    day_kind, file), which defaults to synthetic files ending today, along
+    with /noaa/regions/ClimateDivisions.txt. Each request sleeps for
+    latency seconds to model the network round trip, and fails with a
+    random FAULT_STATUSES status (429s with Retry-After: 0) with
+    probability fault_rate to exercise retries.
+    """
+    def __init__(self, eia_rows: Dict[str, List[Dict[str, str]]],
+                 degree_days: Callable[[int, str, str], str] = degree_days_to_date, latency: float = 0.0,
+                 fault_rate: float = 0.0, seed: int = 0):
+        self.eia_rows = {route.strip("/"): rows for route, rows in eia_rows.items()}
+        self.degree_days = degree_days
+        self.latency = latency
+        self.fault_rate = fault_rate
+        self.request_count = 0
+        self.fault_count = 0
+        self._faults = random.Random(seed)
+        self._query_cache: OrderedDict[str, List[Dict[str, str]]] = OrderedDict()
+        self._file_cache: Dict[Tuple[int, str, str], bytes] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise ValueError("StandInServer is not running, call start() first")
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def eia_url(self) -> str:
+        return f"{self.url}/v2"
+
+    @property
+    def noaa_url(self) -> str:
+        return f"{self.url}/noaa"
+
+    def start(self) -> "StandInServer":
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                status, content_type, body = stand_in.handle(self.path.split("?", 1)[0], self.headers.get("X-Params"))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def handle(self, path: str, x_params: Optional[str]) -> Tuple[int, str, bytes]:
+        """
+        Returns the status, content type and body for a GET of path.
+        """
+        with self._lock:
+            self.request_count += 1
+            fault = self._faults.random() < self.fault_rate
+            if fault:
+                self.fault_count += 1
+                status = self._faults.choice(FAULT_STATUSES)
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if fault:
+            return status, "text/plain", f"Injected {status}".encode()
+
+        if path.startswith("/v2/"):
+            return self._handle_eia(path.removeprefix("/v2/").strip("/"), x_params)
+
+        match = DEGREE_DAY_PATH.match(path)
+        if match:
+            return 200, "text/plain", self._degree_day_file(int(match.group(1)), match.group(3), match.group(2))
+        if path == CLIMATE_DIVISIONS_PATH:
+            return 200, "text/plain", climate_divisions_text().encode()
+        return 404, "text/plain", f"No stand-in for {path}".encode()
+
+    def _handle_eia(self, route: str, x_params: Optional[str]) -> Tuple[int, str, bytes]:
+        if route not in self.eia_rows:
+            return self._eia_error(404, f"No route {route}")
+        if x_params is None:
+            return self._eia_error(400, "Missing X-Params header")
+
+        params = json.loads(x_params)
+        rows = self._query_rows(route, params)
+        offset, length = int(params.get("offset", 0)), int(params.get("length", 5000))
+        body = {"response": {"total": str(len(rows)), "data": rows[offset:offset + length]}}
+        return 200, "application/json", json.dumps(body).encode()
+
+    @staticmethod
+    def _eia_error(status: int, message: str) -> Tuple[int, str, bytes]:
+        return status, "application/json", json.dumps({"error": message, "code": status}).encode()
+
+    def _query_rows(self, route: str, params: Dict[str, Any]) -> List[Dict[str, str]]:
+        """
+        Rows of route matching the facets and date range of params, sorted
+        as requested. Cached per query so every page sees the same rows.
+        """
+        query = {key: value for key, value in params.items() if key not in ("offset", "length", "api_key")}
+        key = json.dumps([route, query], sort_keys=True)
+        with self._lock:
+            if key in self._query_cache:
+                self._query_cache.move_to_end(key)
+                return self._query_cache[key]
+
+        facets = {col: set(values) for col, values in (params.get("facets") or {}).items()}
+        start, end = params.get("start"), params.get("end")
+        rows = [
+            row for row in self.eia_rows[route]
+            if all(row.get(col) in values for col, values in facets.items())
+            and _period_in_range(row["period"], start, end)
+        ]
+        for sort in reversed(params.get("sort") or []): # Stable sorts applied last key first
+            rows = sorted(rows, key=lambda row: row.get(sort["column"], ""), reverse=sort.get("direction") == "desc")
+
+        with self._lock:
+            self._query_cache[key] = rows
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return rows
+
+    def _degree_day_file(self, year: int, day_kind: str, file_name: str) -> bytes:
+        with self._lock:
+            cached = self._file_cache.get((year, day_kind, file_name))
+        if cached is None:
+            cached = self.degree_days(year, day_kind, file_name).encode()
+            with self._lock:
+                self._file_cache[(year, day_kind, file_name)] = cached
+        return cached
+
+def offline_puller(rows: List[Dict[str, str]], max_workers: int = eia_api.DEFAULT_MAX_WORKERS) -> EIADataPuller:
+    """
+    EIADataPuller whose every query returns rows without any HTTP. The
+    pages are encoded to JSON up front and decoded one by one as they are
+    consumed, like responses arriving over the network, so memory
+    measurements only see the pages the caller holds on to.
+    """
+    bodies = [json.dumps(rows[offset:offset + MAX_QUERY_SIZE]).encode() for offset in range(0, len(rows), MAX_QUERY_SIZE)]
+    puller = EIADataPuller(StorageRegion.EAST, max_workers=max_workers, use_cache=False)
+    puller._stream_pages = lambda header, url, dataset: (len(rows), (json.loads(body) for body in bodies))
+    return puller
+
+def _serve(conn: Connection, eia_start: str, eia_end: str, latency: float, seed: int, fault_rate: float) -> None:
+    server = StandInServer(eia_dataset_rows(eia_start, eia_end, seed=seed), latency=latency, fault_rate=fault_rate, seed=seed).start()
+    conn.send(server.url)
+    while conn.recv() != "stop":
+        conn.send(server.request_count)
+    server.stop()
+
+class StandInProcess:
+    """
+    Runs a StandInServer over synthetic data from eia_start to eia_end in a
+    child process, so serving requests doesn't compete with the code under
+    test for the GIL or show up in its memory measurements.
+    """
+    def __init__(self, eia_start: str, eia_end: str, latency: float = 0.0, seed: int = 0, fault_rate: float = 0.0):
+        self.args = (eia_start, eia_end, latency, seed, fault_rate)
+        self.url = ""
+        self._conn: Optional[Connection] = None
+        self._process: Optional[multiprocessing.Process] = None
+
+    @property
+    def eia_url(self) -> str:
+        return f"{self.url}/v2"
+
+    @property
+    def noaa_url(self) -> str:
+        return f"{self.url}/noaa"
+
+    @property
+    def request_count(self) -> int:
+        self._conn.send("count")
+        return self._conn.recv()
+
+    def __enter__(self) -> "StandInProcess":
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child_conn, *self.args), daemon=True)
+        self._process.start()
+        self.url = self._conn.recv()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._conn.send("stop")
+        self._process.join()
+
+@contextmanager
+def use_stand_in(server: Union[StandInServer, StandInProcess]) -> Iterator[Union[StandInServer, StandInProcess]]:
+    """
+    Points EIADataPuller and the NOAA helpers at a running stand-in and
+    disables the response cache, restoring both on exit. The stand-in has
+    no quota, so requests go through unthrottled schedulers that still
+    retry, with short backoffs.
+    """
+    previous_urls = (eia_api.EIA_API_URL, noaa.NOAA_DEGREE_DAYS_URL)
+    previous_cache_env = os.environ.get("NAT_GAS_CACHE")
+    eia_api.EIA_API_URL, noaa.NOAA_DEGREE_DAYS_URL = server.eia_url, server.noaa_url
+    os.environ["NAT_GAS_CACHE"] = "0"
+    previous_schedulers = {
+        source: set_scheduler(source, RequestScheduler(float("inf"), 1, STAND_IN_CONCURRENCY, retries=STAND_IN_RETRIES, backoff=0.01, max_backoff=0.1))
+        for source in (EIA, NOAA)
+    }
+    try:
+        yield server
+    finally:
+        eia_api.EIA_API_URL, noaa.NOAA_DEGREE_DAYS_URL = previous_urls
+        for source, scheduler in previous_schedulers.items():
+            set_scheduler(source, scheduler)
+        if previous_cache_env is None:
+            os.environ.pop("NAT_GAS_CACHE", None)
+        else:
+            os.environ["NAT_GAS_CACHE"] = previous_cache_env
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from utils.custom_types import (
+    FuelType,
+    Respondent,
+    Timezone,
+    StorageRegion,
+    EIAConsumptionType,
+    storage_region_to_noaa_states,
+)
+from utils.schema import calendar_columns, enforce_schema
+
+# Routes of the EIA v2 API used by EIADataPuller, relative to EIA_API_URL
+POWER_GEN_ROUTE = "electricity/rto/daily-fuel-type-data/data"
+STORAGE_ROUTE = "natural-gas/stor/wkly/data"
+USAGE_ROUTE = "natural-gas/cons/sum/data"
+WITHDRAWLS_ROUTE = "natural-gas/prod/sum/data"
+
+ALL_STATES = sorted({state for states in storage_region_to_noaa_states.values() for state in states})
+
+def _seasonal(n: int, period: float, rng: np.random.Generator, base: float, amplitude: float, noise: float) -> np.ndarray:
+    """
+    Sine wave with a given period (in samples) plus gaussian noise, floored at 0.
+    """
+    phase = rng.uniform(0, 2 * np.pi)
+    wave = base + amplitude * np.sin(2 * np.pi * np.arange(n) / period + phase)
+    return np.maximum(wave + rng.normal(0, noise, n), 0)
+
+def _rows(columns: Dict[str, np.ndarray]) -> List[Dict[str, str]]:
+    # EIA returns every field, including value, as a string
+    return pd.DataFrame(columns).astype(str).to_dict("records")
+
+def power_gen_rows(start: str, end: str, respondents: Optional[List[Respondent]] = None,
+                   fueltypes: Optional[List[FuelType]] = None, timezones: Optional[List[Timezone]] = None,
+                   seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Daily generation (MWh) per respondent, fuel type and timezone, in the
+    row format of the daily-fuel-type-data route.
+    """
+    rng = np.random.default_rng(seed)
+    periods = pd.date_range(start, end, freq="D").strftime("%Y-%m-%d").values
+    respondents = respondents or list(Respondent)
+    fueltypes = fueltypes or [FuelType.NATURAL_GAS]
+    timezones = timezones or [Timezone.EASTERN]
+
+    keys = [(respondent, fueltype, timezone) for respondent in respondents for fueltype in fueltypes for timezone in timezones]
+    n = len(periods)
+    return _rows({
+        "period": np.tile(periods, len(keys)),
+        "respondent": np.repeat([respondent.value for respondent, _, _ in keys], n),
+        "respondent-name": np.repeat([respondent.name for respondent, _, _ in keys], n),
+        "fueltype": np.repeat([fueltype.value for _, fueltype, _ in keys], n),
+        "timezone": np.repeat([timezone.value for _, _, timezone in keys], n),
+        "value": np.concatenate([_seasonal(n, 365.25 / 2, rng, 40000, 15000, 3000) for _ in keys]).astype(np.int64),
+        "value-units": np.repeat("megawatthours", n * len(keys)),
+    })
+
+def storage_rows(start: str, end: str, regions: Optional[List[StorageRegion]] = None, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Weekly (W-FRI) working gas in storage (BCF) per storage region series.
+    """
+    rng = np.random.default_rng(seed)
+    periods = pd.date_range(start, end, freq="W-FRI").strftime("%Y-%m-%d").values
+    regions = regions or list(StorageRegion)
+
+    n = len(periods)
+    return _rows({
+        "period": np.tile(periods, len(regions)),
+        "series": np.repeat([region.value for region in regions], n),
+        "value": np.concatenate([_seasonal(n, 52.18, rng, 800, 300, 10) for _ in regions]).astype(np.int64),
+        "units": np.repeat("BCF", n * len(regions)),
+    })
+
+def usage_rows(start: str, end: str, duoareas: Optional[List[str]] = None,
+               consumption_types: Optional[List[EIAConsumptionType]] = None, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Monthly consumption (MMCF) per duoarea and consumption type. Duoareas
+    default to the codes EIADataPuller queries for every respondent.
+    """
+    rng = np.random.default_rng(seed)
+    periods = pd.date_range(start, end, freq="MS").strftime("%Y-%m").values
+    duoareas = duoareas or [f"S{respondent.value}" for respondent in Respondent]
+    consumption_types = consumption_types or list(EIAConsumptionType)
+
+    keys = [(duoarea, consumption_type) for duoarea in duoareas for consumption_type in consumption_types]
+    n = len(periods)
+    return _rows({
+        "period": np.tile(periods, len(keys)),
+        "duoarea": np.repeat([duoarea for duoarea, _ in keys], n),
+        "process": np.repeat([consumption_type.value for _, consumption_type in keys], n),
+        "value": np.concatenate([_seasonal(n, 12, rng, 30000, 12000, 2000) for _ in keys]).astype(np.int64),
+        "units": np.repeat("MMCF", n * len(keys)),
+    })
+
+def withdrawl_rows(start: str, end: str, states: Optional[List[str]] = None, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Monthly gross withdrawals (MMCF) per state series.
+    """
+    rng = np.random.default_rng(seed)
+    periods = pd.date_range(start, end, freq="MS").strftime("%Y-%m").values
+    states = states or ALL_STATES
+
+    n = len(periods)
+    return _rows({
+        "period": np.tile(periods, len(states)),
+        "series": np.repeat([f"N9010{state}2" for state in states], n),
+        "value": np.concatenate([_seasonal(n, 12, rng, 50000, 5000, 2000) for _ in states]).astype(np.int64),
+        "units": np.repeat("MMCF", n * len(states)),
+    })
+
+def eia_dataset_rows(start: str, end: str, seed: int = 0) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Rows of every EIA route used by EIADataPuller between start and end,
+    keyed by route.
+    """
+    return {
+        POWER_GEN_ROUTE: power_gen_rows(start, end, seed=seed),
+        STORAGE_ROUTE: storage_rows(start, end, seed=seed),
+        USAGE_ROUTE: usage_rows(start, end, seed=seed),
+        WITHDRAWLS_ROUTE: withdrawl_rows(start, end, seed=seed),
+    }
+
+def climate_divisions(states: Optional[List[str]] = None) -> Dict[int, Tuple[str, str]]:
+    """
+    One to nine climate divisions per state, as the id -> (state, name)
+    map of get_noaa_region_data(). Ids are {state number}{division:02d}.
+    """
+    return {
+        (i + 1) * 100 + division: (state, f"{state} Division {division}")
+        for i, state in enumerate(states or ALL_STATES)
+        for division in range(1, i % 9 + 2)
+    }
+
+def climate_divisions_text(states: Optional[List[str]] = None) -> str:
+    """
+    A regions/ClimateDivisions.txt file listing climate_divisions(states).
+    """
+    lines = ["Climate Divisions", "", "", "", "Region ID|ST|Name"]
+    lines += [f"{division_id}|{state}|{name}" for division_id, (state, name) in climate_divisions(states).items()]
+    return "\n".join(lines) + "\n"
+
+def degree_day_text(year: int, day_kind: str, states: Optional[List[str]] = None,
+                    end: Optional[pd.Timestamp] = None, seed: int = 0) -> str:
+    """
+    A StatesCONUS.{day_kind}.txt file (day_kind is Heating or Cooling) with
+    one pipe-delimited row of daily degree days per state. The file stops
+    at end when it falls within the year, like the current year's file.
+    Passing division ids as states gives a ClimateDivisions file.
+    """
+    rng = np.random.default_rng([seed, year, int(day_kind == "Heating")])
+    last_day = min(pd.Timestamp(year, 12, 31), end) if end is not None else pd.Timestamp(year, 12, 31)
+    days = pd.date_range(pd.Timestamp(year, 1, 1), last_day, freq="D")
+    states = states or ALL_STATES
+
+    peak_offset = 15 if day_kind == "Heating" else 196 # Mid January / mid July
+    seasonal = 20 * np.cos(2 * np.pi * (days.dayofyear.values - peak_offset) / 365.25)
+    degree_days = np.maximum(seasonal[None, :] + rng.normal(0, 5, (len(states), len(days))), 0).astype(np.int64)
+
+    lines = [f"Daily {day_kind} Degree Days", "", "", "Region|" + "|".join(days.strftime("%Y%m%d"))]
+    lines += [state + "|" + "|".join(row) for state, row in zip(states, degree_days.astype(str))]
+    return "\n".join(lines) + "\n"
+
+def monthly_frame(n_months: int, value_cols: List[str], start: str = "1700-01-01", seed: int = 0) -> pd.DataFrame:
+    """
+    Monthly frame with period, Year, Month and value_cols, the input shape
+    of DataTransforms.upscale_monthly_to_weekly_columns().
+    """
+    rng = np.random.default_rng(seed)
+    periods = pd.date_range(start, periods=n_months, freq="MS")
+    return pd.DataFrame({
+        "period": periods,
+        "Year": periods.year,
+        "Month": periods.month,
+        **{col: _seasonal(n_months, 12, rng, 30000, 12000, 2000) for col in value_cols},
+    }).pipe(enforce_schema)
+
+def weekly_frame(n_weeks: int, start: str = "1700-01-01", seed: int = 0) -> pd.DataFrame:
+    """
+    Weekly (W-FRI) frame with period, Year, Month, Week and value.
+    """
+    rng = np.random.default_rng(seed)
+    periods = pd.date_range(start, periods=n_weeks, freq="W-FRI")
+    return pd.DataFrame({
+        "period": periods,
+        **calendar_columns(periods.values),
+        "value": _seasonal(n_weeks, 52.18, rng, 40000, 15000, 3000),
+    }).pipe(enforce_schema)
+
+def daily_frame(n_days: int, value_col: str = "value", start: str = "1700-01-01", seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "period": pd.date_range(start, periods=n_days, freq="D"),
+        value_col: _seasonal(n_days, 365.25, rng, 15, 15, 5),
+    }).pipe(enforce_schema)
+
+def feature_matrix(n_rows: int, n_features: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Feature table shaped like the engineered features, with a target
+    column that is a noisy linear combination of the features.
+    """
+    rng = np.random.default_rng(seed)
+    features = rng.normal(0, 1, (n_rows, n_features))
+    target = features @ rng.normal(0, 50, n_features) + 800 + rng.normal(0, 25, n_rows)
+    return pd.DataFrame(features, columns=[f"feature_{i}" for i in range(n_features)]).assign(target=target).pipe(enforce_schema)
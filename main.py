@@ -1,5 +1,160 @@
+import argparse
+import pandas as pd
+from dotenv import load_dotenv
+from pathlib import Path
+from utils.backtest import EXPANDING, ROLLING, DEFAULT_MIN_TRAIN, backtest_all_regions, summarize_backtests
+from utils.batch import BATCH_REGIONS, build_all_regions
+from utils.charts import CHART_DIR, CHART_FORMATS, render_all_charts
+from utils.custom_types import StorageRegion, storage_region_to_noaa_states
+from utils.feature_store import ENGINEERED_FEATURES, RAW_FEATURES
+from utils.instrumentation import get_profiler
+from utils.model_search import MODEL_FAMILIES, DEFAULT_REFIT_EVERY, search_region
+from utils.nowcast import DEFAULT_PORT, DEFAULT_RELOAD_INTERVAL, serve
+from utils.pipeline import build_region
+from utils.scenarios import DEFAULT_BLOCK_WEEKS, DEFAULT_HORIZON, DEFAULT_SCENARIOS, scenario_bands, simulate_regions, summarize_scenarios
+
+ALL_REGIONS = "ALL"
+
 def main():
-    print("Hello from nat-gas-model!")
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(prog="nat-gas-model", description="Natural gas storage model pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the raw and engineered feature tables for a region")
+    build_parser.add_argument("--region", choices=[region.name for region in storage_region_to_noaa_states] + [ALL_REGIONS], default=StorageRegion.EAST.name,
+                              help=f"{ALL_REGIONS} pulls every region's full history in one batch run, with one query per dataset")
+    build_parser.add_argument("--full", action="store_true", help="Re-pull the full history instead of refreshing incrementally")
+    build_parser.add_argument("--force", action="store_true", help="Re-run every stage, ignoring memoized outputs")
+    build_parser.add_argument("--profile", action="store_true", help="Record per-stage time, HTTP and rows (same as NAT_GAS_PROFILE=1)")
+    build_parser.add_argument("--profile-memory", action="store_true", help="Also record peak memory per stage, slower (implies --profile)")
+    build_parser.add_argument("--profile-json", type=Path, help="Write the profile to this JSON file (implies --profile)")
+    build_parser.add_argument("--profile-trace", type=Path, help="Write the profile to this Chrome trace file (implies --profile)")
+    build_parser.add_argument("--charts", action="store_true", help="Render the region's raw feature charts after the build")
+
+    backtest_parser = subparsers.add_parser("backtest", help="Walk-forward backtest of the storage regression on the engineered features")
+    backtest_parser.add_argument("--region", nargs="+", choices=[region.name for region in storage_region_to_noaa_states], help="Regions to backtest (default: every built region)")
+    backtest_parser.add_argument("--window", choices=[EXPANDING, ROLLING], default=EXPANDING)
+    backtest_parser.add_argument("--window-size", type=int, help="Training weeks of a rolling window")
+    backtest_parser.add_argument("--min-train", type=int, default=DEFAULT_MIN_TRAIN, help="Training weeks before the first forecast")
+    backtest_parser.add_argument("--refit-every", type=int, default=1, help="Weeks forecast by each refit")
+    backtest_parser.add_argument("--output", type=Path, help="Write the forecast vs actual series of every region to this CSV")
+
+    search_parser = subparsers.add_parser("search", help="Walk-forward search over feature subsets and model families for a region")
+    search_parser.add_argument("--region", choices=[region.name for region in storage_region_to_noaa_states], default=StorageRegion.EAST.name)
+    search_parser.add_argument("--models", nargs="+", choices=list(MODEL_FAMILIES), help="Model families to try (default: all)")
+    search_parser.add_argument("--subsets", type=int, default=20, help="Random feature subsets to try, besides all features")
+    search_parser.add_argument("--min-features", type=int, default=2)
+    search_parser.add_argument("--max-features", type=int, help="Largest random subset (default: every feature)")
+    search_parser.add_argument("--lag-grid", action="store_true", help="Add the lag/rolling candidate feature grid before searching")
+    search_parser.add_argument("--window", choices=[EXPANDING, ROLLING], default=EXPANDING)
+    search_parser.add_argument("--window-size", type=int, help="Training weeks of a rolling window")
+    search_parser.add_argument("--min-train", type=int, default=DEFAULT_MIN_TRAIN, help="Training weeks before the first forecast")
+    search_parser.add_argument("--refit-every", type=int, default=DEFAULT_REFIT_EVERY, help="Weeks forecast by each refit")
+    search_parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    search_parser.add_argument("--seed", type=int, default=0, help="Seed of the random feature subsets")
+    search_parser.add_argument("--top", type=int, default=20, help="Leaderboard rows to print")
+    search_parser.add_argument("--output", type=Path, help="Write the full leaderboard to this CSV")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve nowcasts of the upcoming storage report over local HTTP")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--reload-interval", type=float, default=DEFAULT_RELOAD_INTERVAL, help="Seconds between checks for newly published features")
+
+    charts_parser = subparsers.add_parser("charts", help="Render by-year PNG/SVG charts of every series of the stored feature tables")
+    charts_parser.add_argument("--region", nargs="+", choices=[region.name for region in storage_region_to_noaa_states], help="Regions to render (default: every built region)")
+    charts_parser.add_argument("--tables", nargs="+", choices=[RAW_FEATURES, ENGINEERED_FEATURES], default=[RAW_FEATURES])
+    charts_parser.add_argument("--format", nargs="+", choices=list(CHART_FORMATS), default=["png"])
+    charts_parser.add_argument("--output", type=Path, default=CHART_DIR, help="Chart directory")
+    charts_parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+
+    scenarios_parser = subparsers.add_parser("scenarios", help="Monte Carlo storage paths over resampled historical weather")
+    scenarios_parser.add_argument("--region", nargs="+", choices=[region.name for region in storage_region_to_noaa_states], help="Regions to simulate (default: every built region)")
+    scenarios_parser.add_argument("--scenarios", type=int, default=DEFAULT_SCENARIOS)
+    scenarios_parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="Weeks to simulate past the latest week")
+    scenarios_parser.add_argument("--block-weeks", type=int, default=DEFAULT_BLOCK_WEEKS, help="Consecutive historical weeks per resampled block")
+    scenarios_parser.add_argument("--seed", type=int, default=0)
+    scenarios_parser.add_argument("--output", type=Path, help="Write the weekly percentile bands of every region to this CSV")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        profiler = get_profiler()
+        if args.profile or args.profile_memory or args.profile_json or args.profile_trace:
+            profiler.enable(trace_memory=args.profile_memory or None)
+
+        if args.region == ALL_REGIONS:
+            build_all_regions()
+            if profiler.enabled: # build_region's pipeline prints its own
+                print(profiler.report())
+        else:
+            build_region(StorageRegion[args.region], full=args.full, force=args.force)
+        if args.charts:
+            render_all_charts(BATCH_REGIONS if args.region == ALL_REGIONS else [StorageRegion[args.region]], max_workers=1)
+
+        if args.profile_json:
+            profiler.export_json(args.profile_json)
+        if args.profile_trace:
+            profiler.export_chrome_trace(args.profile_trace)
+    elif args.command == "backtest":
+        if args.window == ROLLING and args.window_size is None:
+            backtest_parser.error("--window-size is required for a rolling window")
+        results = backtest_all_regions(
+            [StorageRegion[region] for region in args.region] if args.region else None,
+            window=args.window,
+            window_size=args.window_size,
+            min_train=args.min_train,
+            refit_every=args.refit_every,
+        )
+        print(summarize_backtests(results).to_string(index=False))
+
+        if args.output:
+            pd.concat([result.forecasts.assign(region=region.name) for region, result in results.items()]).to_csv(args.output, index=False)
+    elif args.command == "search":
+        if args.window == ROLLING and args.window_size is None:
+            search_parser.error("--window-size is required for a rolling window")
+        leaderboard_df = search_region(
+            StorageRegion[args.region],
+            n_subsets=args.subsets,
+            min_size=args.min_features,
+            max_size=args.max_features,
+            lag_grid=args.lag_grid,
+            seed=args.seed,
+            families=args.models,
+            window=args.window,
+            window_size=args.window_size,
+            min_train=args.min_train,
+            refit_every=args.refit_every,
+            max_workers=args.workers,
+        )
+        with pd.option_context("display.width", 200, "display.max_colwidth", 80):
+            print(leaderboard_df.head(args.top).to_string(index=False))
+
+        if args.output:
+            leaderboard_df.to_csv(args.output, index=False)
+    elif args.command == "scenarios":
+        results = simulate_regions(
+            [StorageRegion[region] for region in args.region] if args.region else None,
+            n_scenarios=args.scenarios,
+            horizon=args.horizon,
+            block_weeks=args.block_weeks,
+            seed=args.seed,
+        )
+        with pd.option_context("display.width", 200):
+            print(summarize_scenarios(results).round(1).to_string(index=False))
+
+        if args.output:
+            scenario_bands(results).to_csv(args.output, index=False)
+    elif args.command == "charts":
+        written = render_all_charts(
+            [StorageRegion[region] for region in args.region] if args.region else None,
+            tables=args.tables,
+            output_dir=args.output,
+            formats=args.format,
+            max_workers=args.workers,
+        )
+        print(f"Wrote {len(written)} charts to {args.output}")
+    elif args.command == "serve":
+        serve(args.host, args.port, args.reload_interval)
 
 
 if __name__ == "__main__":
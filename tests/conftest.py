@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+from typing import Callable, Optional
+from utils.backtest import target_col
+from utils.custom_types import StorageRegion
+from utils.refresh import build_engineered_features
+
+REGION = StorageRegion.EAST
+
+@pytest.fixture
+def engineered_frame() -> Callable[..., pd.DataFrame]:
+    """
+    Builds a synthetic engineered feature table of region (EAST by default)
+    for n_weeks Fridays, from 2015-01-02 or ending on last_week, where
+    storage draws down with heating days.
+    """
+    def make(n_weeks: int = 260, seed: int = 0, last_week: Optional[str] = None, region: StorageRegion = REGION) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        heating = np.maximum(rng.normal(100, 60, n_weeks), 0)
+        cooling = np.maximum(rng.normal(40, 30, n_weeks), 0)
+        storage = 2000 + np.cumsum(rng.normal(0, 40, n_weeks) - 0.3 * (heating - 100))
+        periods = (pd.date_range(end=last_week, periods=n_weeks, freq="W-FRI") if last_week
+                   else pd.date_range("2015-01-02", periods=n_weeks, freq="W-FRI"))
+        raw = pd.DataFrame({
+            "period": periods,
+            target_col(region): storage,
+            "Heating_Days": heating,
+            "Cooling_Days": cooling,
+        })
+        return build_engineered_features(region, raw)
+    return make
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+import utils.backtest as backtest
+from utils.backtest import TARGET_DERIVED_COLS, target_col, walk_forward_backtest
+from utils.custom_types import StorageRegion
+
+REGION = StorageRegion.EAST
+
+def test_default_features_leave_out_target_derived_columns(engineered_frame):
+    df = engineered_frame()
+    assert set(TARGET_DERIVED_COLS) <= set(df.columns)
+    result = walk_forward_backtest(df, target_col(REGION))
+    assert not set(result.feature_cols) & set(TARGET_DERIVED_COLS)
+    assert {"Storage_t1", "Storage_t2", "Heating_Days_4Wk_Avg"} <= set(result.feature_cols)
+
+def test_forecasts_match_refitting_before_every_fold(engineered_frame):
+    df = engineered_frame()
+    target = target_col(REGION)
+    result = walk_forward_backtest(df, target, min_train=104, refit_every=13)
+    x, y = df[result.feature_cols].to_numpy(dtype=np.float64), df[target].to_numpy(dtype=np.float64)
+    for fold_start in [104, 104 + 13 * 5]:
+        model = LinearRegression().fit(x[:fold_start], y[:fold_start])
+        expected = model.predict(x[fold_start:fold_start + 13])
+        forecasts = result.forecasts.set_index("period")["forecast"]
+        np.testing.assert_allclose(forecasts.loc[df["period"].iloc[fold_start:fold_start + 13]].to_numpy(), expected, rtol=1e-6)
+
+def test_wide_feature_sets_solve_folds_one_at_a_time(engineered_frame, monkeypatch, capsys):
+    df = engineered_frame()
+    target = target_col(REGION)
+    batched = walk_forward_backtest(df, target, min_train=104, refit_every=13)
+    assert "one at a time" not in capsys.readouterr().out
+
+    monkeypatch.setattr(backtest, "MAX_GRAM_BYTES", 0)
+    per_fold = walk_forward_backtest(df, target, min_train=104, refit_every=13)
+    assert "one at a time" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(per_fold.forecasts, batched.forecasts, rtol=1e-6)
+    np.testing.assert_allclose(per_fold.coefs, batched.coefs, rtol=1e-6, atol=1e-9)
@@ -0,0 +1,34 @@
+import pandas as pd
+from benchmarks import synthetic
+from benchmarks.stand_in import StandInServer, use_stand_in
+from utils.batch import build_all_regions
+from utils.custom_types import StorageRegion
+from utils.feature_store import FeatureStore, RAW_FEATURES, ENGINEERED_FEATURES
+from utils.refresh import build_engineered_features, refresh_region
+from utils.series_store import SeriesStore
+
+REGIONS = [StorageRegion.EAST, StorageRegion.MIDWEST]
+
+def test_batch_build_matches_per_region_builds(tmp_path):
+    today = pd.Timestamp.today().strftime("%Y-%m-%d")
+    rows = synthetic.eia_dataset_rows("2010-01-01", today)
+    del rows[synthetic.POWER_GEN_ROUTE]
+    batch_store = SeriesStore(FeatureStore(tmp_path / "batch"))
+    region_dir = tmp_path / "per_region"
+    region_dir.mkdir()
+    with StandInServer(rows) as server, use_stand_in(server):
+        tables = build_all_regions(REGIONS, batch_store, output_dir=tmp_path, max_processes=2)
+        batch_requests = server.request_count
+        region_dfs = {region: refresh_region(region, SeriesStore(FeatureStore(region_dir / region.name)), output_dir=region_dir)
+                      for region in REGIONS}
+    # One query per dataset and one download per NOAA file for both regions
+    assert batch_requests < server.request_count - batch_requests
+
+    for region in REGIONS:
+        raw_df, engineered_df = tables[region]
+        pd.testing.assert_frame_equal(raw_df, region_dfs[region])
+        pd.testing.assert_frame_equal(engineered_df, build_engineered_features(region, region_dfs[region]))
+        pd.testing.assert_frame_equal(batch_store.feature_store.read(region, ENGINEERED_FEATURES), engineered_df)
+        assert set(batch_store.names(region)) >= {"storage", "ng_usage", "ng_withdrawls", "degree_days", RAW_FEATURES}
+        assert (tmp_path / f"{region.name}_data_engineered.csv").exists()
+    assert not tables[StorageRegion.EAST][0].equals(tables[StorageRegion.MIDWEST][0])
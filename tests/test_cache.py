@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import pandas as pd
+import pytest
+from datetime import datetime, timedelta
+from benchmarks import synthetic
+from benchmarks.stand_in import StandInServer, use_stand_in
+import utils.eia_api as eia_api
+import utils.noaa as noaa
+from utils.cache import DATASET_TTLS, ResponseCache, expires_after, expires_next_weekly_release
+from utils.custom_types import StorageRegion
+from utils.eia_api import EIADataPuller, MAX_QUERY_SIZE
+
+def _headers(**params) -> dict:
+    return {"X-Params": json.dumps(params)}
+
+def test_key_ignores_api_key_and_end_date():
+    base = ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(api_key="a", start="2010-01-01", end="2026-10-16"))
+    assert base == ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(api_key="b", start="2010-01-01", end="2026-10-17"))
+    assert base == ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(start="2010-01-01"))
+
+def test_key_keeps_the_rest_of_the_query():
+    base = ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(start="2010-01-01", offset=0))
+    assert base != ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(start="2011-01-01", offset=0))
+    assert base != ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(start="2010-01-01", offset=5000))
+    assert base != ResponseCache.make_key("https://api.eia.gov/v2/y", _headers(start="2010-01-01", offset=0))
+
+def test_paginated_key_covers_every_page():
+    base = ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(start="2010-01-01", offset=0, length=5000), paginated=True)
+    assert base == ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(start="2010-01-01", offset=5000, length=1), paginated=True)
+    assert base != ResponseCache.make_key("https://api.eia.gov/v2/x", _headers(start="2011-01-01"), paginated=True)
+
+def test_expired_entries_miss_and_are_removed(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path)
+    monkeypatch.setitem(DATASET_TTLS, "eia_storage", expires_after(timedelta(hours=1)))
+    cache.put("fresh", "body", "eia_storage")
+    monkeypatch.setitem(DATASET_TTLS, "eia_storage", lambda fetched_at: fetched_at - timedelta(seconds=1))
+    cache.put("expired", "body", "eia_storage")
+    with cache.write_pages("expired_pages", "eia_storage") as write:
+        write("page")
+
+    assert cache.get("fresh") == "body"
+    assert cache.get("expired") is None and cache.get_pages("expired_pages") is None
+    assert [path.name for path in tmp_path.iterdir()] == ["fresh.json"]
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+def test_next_weekly_release_expiry():
+    policy = expires_next_weekly_release()
+    assert policy(datetime(2026, 10, 14, 12)) == datetime(2026, 10, 15, 10, 30) # Wednesday
+    assert policy(datetime(2026, 10, 15, 10, 29)) == datetime(2026, 10, 15, 10, 30)
+    assert policy(datetime(2026, 10, 15, 10, 30)) == datetime(2026, 10, 22, 10, 30)
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=2500)
+    for age, key in enumerate(["newer", "older"], start=1):
+        cache.put(key, "x" * 1000, "noaa_historical")
+        os.utime(cache._path(key), (time.time() - 60 * age,) * 2)
+    assert cache.get("older") is not None # Now the most recently used
+
+    cache.put("newest", "x" * 1000, "noaa_historical")
+    assert cache.get("newer") is None
+    assert cache.get("older") is not None and cache.get("newest") is not None
+    assert cache.stats.evictions == 1 and cache.size_bytes() <= 2500
+
+def test_query_pages_are_stored_together(tmp_path):
+    cache = ResponseCache(tmp_path)
+    with pytest.raises(ValueError):
+        with cache.write_pages("query", "eia_storage") as write:
+            write("page 0")
+            raise ValueError("Page 1 failed")
+    assert cache.get_pages("query") is None and list(tmp_path.iterdir()) == []
+
+    with cache.write_pages("query", "eia_storage") as write:
+        write("page 0\nwith a newline")
+        write("page 1")
+    assert list(cache.get_pages("query")) == ["page 0\nwith a newline", "page 1"]
+
+def test_warm_rerun_makes_no_requests(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path)
+    rows = synthetic.power_gen_rows("2021-01-01", "2023-12-31")
+    assert len(rows) > 2 * MAX_QUERY_SIZE
+    with StandInServer({synthetic.POWER_GEN_ROUTE: rows}) as server, use_stand_in(server):
+        monkeypatch.setattr(noaa, "get_default_cache", lambda: cache)
+
+        def pull():
+            puller = EIADataPuller(StorageRegion.EAST)
+            puller.cache = cache
+            header = puller._build_header(frequency="daily", data=["value"], facets=None, start="2021-01-01", end="2023-12-31")
+            frame = puller._get_frame(header, f"{eia_api.EIA_API_URL}/{synthetic.POWER_GEN_ROUTE}/", "eia_power_gen", ["respondent"])
+            degree_days = noaa.get_noaa_day_data_by_region(2020, 2021, {StorageRegion.EAST: ["NY", "PA"]})
+            return frame, degree_days[StorageRegion.EAST]
+
+        cold_frame, cold_degree_days = pull()
+        cold_requests = server.request_count
+        warm_frame, warm_degree_days = pull()
+
+    assert cold_requests == 3 + 4 # Three pages, heating and cooling files of two years
+    assert server.request_count == cold_requests
+    pd.testing.assert_frame_equal(cold_frame, warm_frame)
+    pd.testing.assert_frame_equal(cold_degree_days, warm_degree_days)
+    assert len(list(tmp_path.glob("*.jsonl"))) == 1 # Every page of the query in one entry
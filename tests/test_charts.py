@@ -0,0 +1,39 @@
+import numpy as np
+from utils.charts import ChartRenderer, render_all_charts
+from utils.custom_types import StorageRegion
+from utils.feature_store import FeatureStore, ENGINEERED_FEATURES
+from utils.plots import year_groups
+
+def test_render_all_charts_writes_every_series_and_format(tmp_path, engineered_frame):
+    feature_store = FeatureStore(tmp_path / "store")
+    df = engineered_frame(n_weeks=110)
+    feature_store.write(StorageRegion.EAST, ENGINEERED_FEATURES, df)
+
+    written = render_all_charts([StorageRegion.EAST], tables=[ENGINEERED_FEATURES], output_dir=tmp_path / "charts",
+                                formats=["png", "svg"], feature_store=feature_store, max_workers=1, dpi=30)
+    chart_dir = tmp_path / "charts" / "EAST" / ENGINEERED_FEATURES
+    expected = sorted(chart_dir / f"{col}.{fmt}" for col in df.columns.drop("period") for fmt in ("png", "svg"))
+    assert written == expected
+    for path in written:
+        header = path.read_bytes()[:200]
+        assert header.startswith(b"\x89PNG") if path.suffix == ".png" else b"<svg" in header
+
+def test_reused_figure_only_shows_the_current_chart(tmp_path):
+    renderer = ChartRenderer(dpi=30)
+    weeks = np.tile(np.arange(52), 3)
+    groups = year_groups(np.repeat([2021, 2022, 2023], 52))
+    first, second = np.arange(156.0), -np.arange(156.0)
+
+    renderer.render_year_plot(weeks, first, groups, "First", "Week", "First", [tmp_path / "first.png"])
+    renderer.render_year_plot(weeks, second, groups, "Second", "Week", "Second", [tmp_path / "second.png"])
+    assert len(renderer.ax.lines) == 3
+    np.testing.assert_array_equal(np.concatenate([line.get_ydata() for line in renderer.ax.lines]), second)
+    assert renderer.ax.get_ylim()[1] < 20 # Rescaled to the second series, the first reached 155
+    assert renderer.ax.get_title() == "Second"
+
+    # A table with other years rebuilds the axes instead of adding to them
+    other_weeks = np.tile(np.arange(52), 2)
+    other_groups = year_groups(np.repeat([2024, 2025], 52))
+    renderer.render_year_plot(other_weeks, np.ones(104), other_groups, "Third", "Week", "Third", [tmp_path / "third.png"])
+    assert [line.get_label() for line in renderer.ax.lines] == ["2024", "2025"]
+    assert [text.get_text() for text in renderer.ax.get_legend().get_texts()] == ["2024", "2025"]
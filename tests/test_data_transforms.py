@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks import reference
+from utils.data_transforms import DataTransforms
+
+def _weekly_input(periods: pd.DatetimeIndex, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"period": periods, "value": rng.uniform(0, 50000, len(periods))})
+
+def _random_periods(n: int, seed: int = 0, midnight: bool = True) -> pd.DatetimeIndex:
+    rng = np.random.default_rng(seed)
+    periods = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 6 * 365, n), unit="D")
+    if not midnight:
+        periods += pd.to_timedelta(rng.integers(0, 24 * 3600, n), unit="s")
+    return pd.DatetimeIndex(periods)
+
+def _assert_matches_reference(df: pd.DataFrame) -> None:
+    expected = reference.weekly_interpolate_from_middle_week(df.copy(), "period", "value")
+    pd.testing.assert_frame_equal(DataTransforms.weekly_interpolate_from_middle_week(df, "period", "value"), expected)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_middle_week_matches_reference_on_sorted_weeks(seed):
+    _assert_matches_reference(_weekly_input(pd.date_range("2010-01-01", periods=520, freq="W-FRI"), seed))
+
+@pytest.mark.parametrize("seed", range(3))
+def test_middle_week_matches_reference_on_shuffled_rows(seed):
+    df = _weekly_input(pd.date_range("2010-01-01", periods=520, freq="W-FRI"), seed)
+    _assert_matches_reference(df.sample(frac=1, random_state=seed))
+
+@pytest.mark.parametrize("seed", range(3))
+def test_middle_week_matches_reference_on_random_times(seed):
+    # Duplicate days and times of day, so ties within a day are broken by row order
+    _assert_matches_reference(_weekly_input(_random_periods(400, seed, midnight=False), seed))
+    _assert_matches_reference(_weekly_input(_random_periods(400, seed, midnight=True), seed))
+
+def test_middle_week_ignores_time_of_day():
+    # The 15th at noon is 0 days from the 15th, the 14th at 23:00 a whole day
+    df = _weekly_input(pd.DatetimeIndex(["2024-03-14 23:00", "2024-03-15 12:00", "2024-03-29 08:00", "2024-04-12 06:00"]))
+    result = DataTransforms.weekly_interpolate_from_middle_week(df, "period", "value")
+    assert result["value"].tolist()[:2] == [df["value"][1]] * 2
+    _assert_matches_reference(df)
+
+def _monthly_input(periods: pd.DatetimeIndex, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "period": periods,
+        "Year": periods.year,
+        "Month": periods.month,
+        "RESIDENTIAL": rng.uniform(0, 90000, len(periods)),
+        "INDUSTRIAL": rng.uniform(0, 90000, len(periods)),
+    })
+
+@pytest.mark.parametrize("hours", [0, 7])
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_upscale_matches_reference(hours, shuffle):
+    df = _monthly_input(pd.date_range("2012-01-01", periods=120, freq="MS") + pd.Timedelta(hours=hours))
+    if shuffle:
+        df = df.sample(frac=1, random_state=0)
+    value_cols = ["RESIDENTIAL", "INDUSTRIAL"]
+    expected = reference.upscale_monthly_to_weekly_columns(df, "period", value_cols)
+    result = DataTransforms.upscale_monthly_to_weekly_columns(df, "period", value_cols)
+    # The vectorized version stores the schema's compact dtypes
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=False, rtol=1e-6)
+
+def test_weekly_frame_matches_date_range():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        start = pd.Timestamp("2000-01-01") + pd.Timedelta(seconds=int(rng.integers(0, 10**8)))
+        start = start.normalize() if rng.random() < 0.3 else start
+        end = start + pd.Timedelta(seconds=int(rng.integers(-10**5, 10**8)))
+        expected = pd.date_range(start, end, freq="W-FRI").values
+        np.testing.assert_array_equal(DataTransforms._weekly_frame(start, end, "period")["period"].values, expected)
@@ -0,0 +1,60 @@
+import gc
+import time
+import tracemalloc
+import pandas as pd
+from benchmarks import reference, synthetic
+from benchmarks.stand_in import StandInServer, offline_puller, use_stand_in
+import utils.eia_api as eia_api
+from utils.custom_types import StorageRegion
+from utils.eia_api import EIADataPuller, MAX_QUERY_SIZE
+
+START, END = "2019-01-01", "2023-12-31" # Five pages, the last four fetched at once by four workers
+FACET_COLS = ["respondent", "respondent-name"]
+
+def _pull_power_gen(max_workers: int):
+    """
+    Frame and seconds of a full power-gen query through _get_frame.
+    """
+    puller = EIADataPuller(StorageRegion.EAST, max_workers=max_workers, use_cache=False)
+    header = puller._build_header(frequency="daily", data=["value"], facets=None, start=START, end=END,
+                                  sort=[{"column": "period", "direction": "asc"}])
+    start_time = time.perf_counter()
+    frame = puller._get_frame(header, f"{eia_api.EIA_API_URL}/{synthetic.POWER_GEN_ROUTE}/", "eia_power_gen", FACET_COLS)
+    return frame, time.perf_counter() - start_time
+
+def test_concurrent_pages_are_faster_and_identical():
+    rows = synthetic.power_gen_rows(START, END)
+    assert len(rows) > 4 * MAX_QUERY_SIZE # Enough pages for the workers to overlap
+    with StandInServer({synthetic.POWER_GEN_ROUTE: rows}, latency=0.3) as server, use_stand_in(server):
+        serial, serial_seconds = _pull_power_gen(max_workers=1)
+        concurrent, concurrent_seconds = _pull_power_gen(max_workers=4)
+
+    pd.testing.assert_frame_equal(serial, concurrent)
+    assert len(serial) == len(rows)
+    assert serial["period"].is_monotonic_increasing # Pages are yielded in offset order
+    assert concurrent_seconds < 0.6 * serial_seconds
+
+def _peak_bytes(func) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def test_typed_array_decode_lowers_peak_memory():
+    rows = synthetic.power_gen_rows(START, END)
+    puller = offline_puller(rows)
+
+    frame = puller._get_frame({}, "", "eia_power_gen", FACET_COLS)
+    rows_frame = reference.eia_rows_frame(puller, {}, "", "eia_power_gen", FACET_COLS)
+    assert len(frame) == len(rows_frame) == len(rows)
+    assert (frame["period"].to_numpy() == pd.to_datetime(rows_frame["period"]).to_numpy()).all()
+    assert (frame["value"].to_numpy() == pd.to_numeric(rows_frame["value"]).astype(frame["value"].dtype).to_numpy()).all()
+    for col in FACET_COLS:
+        assert (frame[col].astype(str) == rows_frame[col]).all()
+
+    peak = _peak_bytes(lambda: puller._get_frame({}, "", "eia_power_gen", FACET_COLS))
+    rows_peak = _peak_bytes(lambda: reference.eia_rows_frame(puller, {}, "", "eia_power_gen", FACET_COLS))
+    assert peak < 0.5 * rows_peak
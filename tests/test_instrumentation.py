@@ -0,0 +1,81 @@
+import json
+import pandas as pd
+import pytest
+from benchmarks import synthetic
+from benchmarks.stand_in import StandInServer, use_stand_in
+import utils.eia_api as eia_api
+import utils.instrumentation as instrumentation
+from utils.custom_types import StorageRegion
+from utils.eia_api import EIADataPuller
+from utils.instrumentation import Profiler, instrumented
+
+@pytest.fixture
+def profiler(monkeypatch) -> Profiler:
+    profiler = Profiler()
+    profiler.enable()
+    monkeypatch.setattr(instrumentation, "_profiler", profiler)
+    return profiler
+
+@instrumented("inner")
+def _inner(df: pd.DataFrame) -> pd.DataFrame:
+    return df.head(2)
+
+@instrumented("outer", category="pipeline")
+def _outer(df: pd.DataFrame) -> list:
+    return [_inner(df), _inner(df)]
+
+def _pull_power_gen(rows) -> pd.DataFrame:
+    puller = EIADataPuller(StorageRegion.EAST, use_cache=False)
+    header = puller._build_header(frequency="daily", data=["value"], facets=None, start="2021-01-01", end="2023-12-31")
+    return puller._get_frame(header, f"{eia_api.EIA_API_URL}/{synthetic.POWER_GEN_ROUTE}/", "eia_power_gen", ["respondent"])
+
+def test_spans_nest_and_count_rows(profiler):
+    _outer(pd.DataFrame({"value": range(5)}))
+    inner_first, inner_second, outer = profiler.spans # Recorded as they close
+    assert [span.name for span in profiler.spans] == ["inner", "inner", "outer"]
+    assert (outer.depth, inner_first.depth, inner_second.depth) == (0, 1, 1)
+    assert outer.start <= inner_first.start <= inner_first.end <= inner_second.start <= inner_second.end <= outer.end
+    assert (outer.rows_in, outer.rows_out, inner_first.rows_in, inner_first.rows_out) == (5, 4, 5, 2)
+
+    summary = profiler.summary().set_index("stage")
+    assert summary.loc["inner", "calls"] == 2 and summary.loc["outer", "category"] == "pipeline"
+
+def test_disabled_profiler_records_nothing(profiler):
+    profiler.disable()
+    _outer(pd.DataFrame({"value": range(5)}))
+    assert profiler.spans == []
+
+def test_requests_hook_counts_http_into_open_spans(profiler):
+    rows = synthetic.power_gen_rows("2021-01-01", "2023-12-31")
+    with StandInServer({synthetic.POWER_GEN_ROUTE: rows}) as server, use_stand_in(server):
+        frame = _pull_power_gen(rows)
+
+    span, = [span for span in profiler.spans if span.name == "EIADataPuller._get_frame"]
+    # Pages fetched on worker threads still count towards the stage that asked for them
+    assert span.requests == server.request_count == 3
+    assert span.rows_out == len(frame) == len(rows)
+    assert span.bytes > 0
+
+    endpoints = profiler.endpoint_summary()
+    assert len(endpoints) == 1 and endpoints["requests"].iloc[0] == 3 and endpoints["errors"].iloc[0] == 0
+    assert len(profiler.http_events) == 3
+
+def test_exports(profiler, tmp_path):
+    rows = synthetic.power_gen_rows("2021-01-01", "2023-12-31")
+    with StandInServer({synthetic.POWER_GEN_ROUTE: rows}) as server, use_stand_in(server):
+        _pull_power_gen(rows)
+
+    profiler.export_json(tmp_path / "profile.json")
+    profile = json.loads((tmp_path / "profile.json").read_text())
+    assert set(profile) == {"spans", "stages", "endpoints"}
+    assert {"name", "depth", "start", "seconds", "requests", "rows_out"} <= set(profile["spans"][0])
+    assert profile["endpoints"][0]["requests"] == 3
+
+    profiler.export_chrome_trace(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    events = trace["traceEvents"]
+    assert trace["displayTimeUnit"] == "ms"
+    assert all(event["ph"] == "X" and event["dur"] >= 0 and event["ts"] >= 0 for event in events)
+    assert sum(event["cat"] == "http" for event in events) == 3
+    stage = next(event for event in events if event["name"] == "EIADataPuller._get_frame")
+    assert stage["args"]["requests"] == 3 and stage["args"]["rows_out"] == len(rows)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.lag_features import LagFeatureGenerator, candidate_features
+
+COLUMNS = ["Heating_Days", "Storage"]
+
+def _weekly_frame(n_weeks: int = 120, seed: int = 0, missing: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "period": pd.date_range("2020-01-03", periods=n_weeks, freq="W-FRI"),
+        "Heating_Days": rng.uniform(10, 200, n_weeks),
+        "Storage": 2000 + np.cumsum(rng.normal(0, 40, n_weeks)),
+    })
+    if missing:
+        df.loc[rng.choice(n_weeks, n_weeks // 10, replace=False), "Heating_Days"] = np.nan
+    return df
+
+def test_features_match_pandas():
+    df = _weekly_frame()
+    generator = LagFeatureGenerator(COLUMNS, lags=(1, 3), windows=(4, 13), diffs=(1, 52), pct_changes=(1, 4), ewm_spans=(4, 52))
+    features_df, _ = generator.transform(df)
+    assert list(features_df.columns) == ["period"] + generator.feature_names
+
+    expected = {}
+    for col in COLUMNS:
+        series = df[col]
+        expected.update({f"{col}_lag{k}": series.shift(k) for k in (1, 3)})
+        for window in (4, 13):
+            expected[f"{col}_mean{window}"] = series.rolling(window).mean()
+            expected[f"{col}_sum{window}"] = series.rolling(window).sum()
+        expected.update({f"{col}_diff{k}": series.diff(k) for k in (1, 52)})
+        expected.update({f"{col}_pct{k}": series.pct_change(k) for k in (1, 4)})
+        expected.update({f"{col}_ewm{span}": series.ewm(span=span, adjust=False, ignore_na=True).mean() for span in (4, 52)})
+    expected_df = pd.DataFrame(expected)[generator.feature_names].astype(np.float32)
+    pd.testing.assert_frame_equal(features_df.drop(columns="period"), expected_df, rtol=1e-5)
+
+def test_ewm_skips_missing_weeks_like_pandas():
+    df = _weekly_frame(missing=True)
+    features_df, _ = LagFeatureGenerator(["Heating_Days"], ewm_spans=(4, 13)).transform(df)
+    for span in (4, 13):
+        expected = df["Heating_Days"].ewm(span=span, adjust=False, ignore_na=True).mean().astype(np.float32)
+        np.testing.assert_allclose(features_df[f"Heating_Days_ewm{span}"], expected, rtol=1e-5)
+
+def test_chunked_updates_match_one_transform():
+    df = _weekly_frame(missing=True)
+    generator = LagFeatureGenerator(COLUMNS)
+    expected, _ = generator.transform(df)
+
+    chunks, state = [], None
+    for start, end in [(0, 30), (30, 31), (31, 90), (90, 90), (90, 120)]:
+        if state is None:
+            chunk, state = generator.transform(df.iloc[start:end])
+        else:
+            chunk, state = generator.update(state, df.iloc[start:end])
+        chunks.append(chunk)
+    result = pd.concat([chunk for chunk in chunks if len(chunk)], ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected)
+    assert state.n_rows == len(df) and state.last_period == df["period"].iloc[-1]
+
+    with pytest.raises(ValueError, match="only appends rows after"):
+        generator.update(state, df.iloc[-1:])
+
+def test_empty_frames_get_a_clear_error():
+    with pytest.raises(ValueError, match="at least one row"):
+        LagFeatureGenerator(COLUMNS).transform(_weekly_frame().iloc[:0])
+    with pytest.raises(ValueError, match="at least one row"):
+        candidate_features(_weekly_frame().iloc[:0])
@@ -0,0 +1,18 @@
+import pandas as pd
+from utils.backtest import target_col
+from utils.custom_types import StorageRegion
+from utils.model_search import random_feature_subsets, search_models
+
+REGION = StorageRegion.EAST
+
+def test_worker_count_does_not_change_the_leaderboard(engineered_frame):
+    df = engineered_frame(n_weeks=200)
+    target = target_col(REGION)
+    subsets = random_feature_subsets(["Storage_t1", "Storage_t2", "Heating_Days", "Cooling_Days", "Heating_Days_4Wk_Avg"],
+                                     n_subsets=4, seed=1)
+    kwargs = dict(feature_subsets=subsets, families=["ols", "ridge", "lasso"], min_train=104, refit_every=26)
+    serial = search_models(df, target, max_workers=1, **kwargs)
+    pooled = search_models(df, target, max_workers=3, **kwargs)
+    assert len(serial) == 5 * 7
+    # Only the timings differ between runs
+    pd.testing.assert_frame_equal(serial.drop(columns="seconds"), pooled.drop(columns="seconds"))
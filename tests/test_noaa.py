@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+from benchmarks import reference, synthetic
+from utils.noaa import DegreeDayWeights, _degree_day_dataset, extract_degree_day_data, extract_weighted_degree_day_data
+
+@pytest.mark.parametrize("year", [2023, 2024]) # 2024 is a leap year
+@pytest.mark.parametrize("day_kind", ["Heating", "Cooling"])
+@pytest.mark.parametrize("states", [synthetic.ALL_STATES, ["NY", "PA", "TX"], ["ZZ"]])
+def test_bulk_parse_matches_per_line_parser(year, day_kind, states):
+    lines = synthetic.degree_day_text(year, day_kind, seed=year).split("\n")
+    expected = reference.extract_degree_day_data(year, lines, states)
+    result = extract_degree_day_data(year, lines, states)
+    # The bulk parser stores the schema's float32 values
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+
+def test_bulk_parse_matches_per_line_parser_on_partial_year():
+    lines = synthetic.degree_day_text(2025, "Heating", end=pd.Timestamp("2025-03-09")).split("\n")
+    expected = reference.extract_degree_day_data(2025, lines, synthetic.ALL_STATES)
+    result = extract_degree_day_data(2025, lines, synthetic.ALL_STATES)
+    assert len(result) == 68
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+@pytest.mark.parametrize("year, now, dataset", [
+    (2026, "2026-10-17", "noaa_current_year"),
+    (2025, "2026-01-20", "noaa_current_year"), # Last year's final days may still be revised
+    (2025, "2026-02-01", "noaa_historical"),
+    (2020, "2026-10-17", "noaa_historical"),
+])
+def test_finished_years_are_historical_after_a_grace_period(year, now, dataset):
+    assert _degree_day_dataset(year, datetime.fromisoformat(now)) == dataset
+
+def test_division_weights_match_zero_padded_ids_and_normalize_within_states():
+    divisions = {401: ("NY", "NY Division 1"), 402: ("NY", "NY Division 2"), 501: ("PA", "PA Division 1")}
+    weights = DegreeDayWeights.from_divisions({"EAST": ["NY", "PA"], "NY": ["NY"]}, divisions, {401: 3.0, 402: 1.0})
+    row_codes = np.array(["0401", "402", "0501", "9999"])
+    day_matrix = np.array([[4, 8], [8, 0], [10, 20], [100, 100]])
+
+    region_days, matched = weights.aggregate(row_codes, day_matrix)
+    # NY divisions weighted 3:1 within NY, PA's only division counts once
+    np.testing.assert_allclose(region_days, [[0.75 * 4 + 0.25 * 8 + 10, 0.75 * 8 + 20], [0.75 * 4 + 0.25 * 8, 0.75 * 8]])
+    assert matched.all()
+
+def test_regions_without_division_rows_get_empty_frames():
+    divisions = synthetic.climate_divisions(["NY", "PA", "TX"])
+    weights = DegreeDayWeights.from_divisions({"EAST": ["NY", "PA"], "WEST": ["WA"]}, divisions)
+    division_codes = [f"{division_id:04d}" for division_id in divisions]
+    lines = synthetic.degree_day_text(2023, "Heating", states=division_codes).split("\n")
+
+    region_dfs = extract_weighted_degree_day_data(2023, lines, weights)
+    assert len(region_dfs["EAST"]) == 365 and region_dfs["EAST"]["Heating_Days"].notna().all()
+    assert region_dfs["WEST"].empty and list(region_dfs["WEST"].columns) == ["period", "Heating_Days"]
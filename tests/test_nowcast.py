@@ -0,0 +1,66 @@
+import json
+import pandas as pd
+import pytest
+from datetime import datetime
+from utils.custom_types import StorageRegion
+from utils.feature_store import FeatureStore, ENGINEERED_FEATURES
+from utils.nowcast import NowcastModels, NowcastServer, next_report_week
+
+REGION = StorageRegion.EAST
+
+@pytest.fixture
+def server(tmp_path, engineered_frame) -> NowcastServer:
+    feature_store = FeatureStore(tmp_path)
+    feature_store.write(REGION, ENGINEERED_FEATURES, engineered_frame(n_weeks=160, last_week="2026-10-02"))
+    models = NowcastModels(feature_store, [REGION])
+    models.reload()
+    return NowcastServer(models)
+
+@pytest.mark.parametrize("now, report_week", [
+    ("2026-10-14 09:00", "2026-10-09"), # Wednesday, this week's report is still ahead
+    ("2026-10-15 10:00", "2026-10-09"), # Thursday before the 10:30 release
+    ("2026-10-15 11:00", "2026-10-16"), # Thursday after the release, next week's report is next
+    ("2026-10-17 12:00", "2026-10-16"),
+])
+def test_report_week_is_covered_by_the_next_release(now, report_week):
+    assert next_report_week(datetime.fromisoformat(now)) == pd.Timestamp(report_week)
+
+def test_nowcast_is_current_until_the_report_week_moves_past_it(server):
+    nowcast, = server.models.nowcast([{"region": "EAST"}], now=datetime(2026, 10, 14))
+    assert (nowcast["as_of"], nowcast["nowcast_week"], nowcast["report_week"]) == ("2026-10-02", "2026-10-09", "2026-10-09")
+    assert not nowcast["stale"]
+
+    nowcast, = server.models.nowcast([{"region": "EAST"}], now=datetime(2026, 10, 22))
+    assert (nowcast["nowcast_week"], nowcast["report_week"]) == ("2026-10-09", "2026-10-16")
+    assert nowcast["stale"]
+    assert server.models.models[REGION].info(datetime(2026, 10, 22))["stale"]
+
+def test_overrides_change_the_nowcast(server):
+    base, cold = server.models.nowcast([{"region": "EAST"}, {"region": "EAST", "features": {"Heating_Days": 400}}])
+    assert cold["overrides"] == {"Heating_Days": 400}
+    assert cold["storage_bcf"] != base["storage_bcf"]
+
+@pytest.mark.parametrize("body, message", [
+    (b"{not json", "Request body is not valid JSON"),
+    (b"[]", 'Expected a JSON body of the form {"requests"'),
+    (b'{"requests": {"region": "EAST"}}', "Expected requests to be a list"),
+    (b'{"requests": ["EAST"]}', "Request 0 must be an object with a region, got str"),
+    (b'{"requests": [{"region": "EAST"}, {"region": 3}]}', "Request 1 has unknown region 3"),
+    (b'{"requests": [{"region": "NOWHERE"}]}', "Request 0 has unknown region 'NOWHERE'"),
+    (b'{"requests": [{"region": "EAST", "feature": {}}]}', "Request 0 has unknown fields ['feature']"),
+    (b'{"requests": [{"region": "EAST", "features": [1]}]}', "Request 0 features must be an object"),
+    (b'{"requests": [{"region": "EAST", "features": {"Heating_Days": "cold"}}]}', "Request 0 feature Heating_Days must be a finite number, got 'cold'"),
+    (b'{"requests": [{"region": "EAST", "features": {"Heating_Days": NaN}}]}', "Request 0 feature Heating_Days must be a finite number"),
+    (b'{"requests": [{"region": "EAST", "features": {"Snow": 1}}]}', "Unknown feature Snow for EAST"),
+    (b'{"requests": [{"region": "SOUTH"}]}', "No nowcast model loaded for SOUTH"),
+])
+def test_malformed_requests_get_clear_400s(server, body, message):
+    status, payload = server.handle("POST", "/nowcast", body)
+    assert status == 400
+    assert payload["error"].startswith(message)
+
+def test_valid_batch_and_routes(server):
+    status, payload = server.handle("POST", "/nowcast", json.dumps({"requests": [{"region": "EAST"}]}).encode())
+    assert status == 200 and len(payload["nowcasts"]) == 1
+    assert server.handle("GET", "/nowcast?region=NOWHERE", None)[0] == 400
+    assert server.handle("GET", "/missing", None)[0] == 404
@@ -0,0 +1,78 @@
+import sys
+import importlib
+import pandas as pd
+from utils.data_transforms import DataTransforms
+from utils.pipeline import Pipeline, Stage, build_region_pipeline
+from utils.custom_types import StorageRegion
+from utils.series_store import SeriesStore
+from utils.feature_store import FeatureStore
+
+HELPERS = "def scale(df):\n    return df * 2\n"
+TRANSFORMS = (
+    "import pandas as pd\n"
+    "from stagepkg.helpers import scale\n\n"
+    "def load():\n"
+    "    return pd.DataFrame({'value': [1.0, 2.0, 3.0]})\n\n"
+    "def double(df):\n"
+    "    return scale(df)\n\n"
+    "def triple(df):\n"
+    "    return df * 3\n"
+)
+
+def _write_package(root, helpers: str = HELPERS, transforms: str = TRANSFORMS) -> None:
+    package = root / "stagepkg"
+    package.mkdir(exist_ok=True)
+    (package / "__init__.py").write_text("")
+    (package / "helpers.py").write_text(helpers)
+    (package / "transforms.py").write_text(transforms)
+
+def _import_package(root, monkeypatch):
+    monkeypatch.syspath_prepend(str(root))
+    for name in ["stagepkg.transforms", "stagepkg.helpers", "stagepkg"]:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    return importlib.import_module("stagepkg.transforms"), importlib.import_module("stagepkg.helpers")
+
+def _statuses(output: str) -> dict:
+    rows = [line.split() for line in output.splitlines()[1:]]
+    return {row[0]: row[1] for row in rows if len(row) == 3}
+
+def test_editing_a_transform_only_reruns_its_stage(tmp_path, monkeypatch, capsys):
+    _write_package(tmp_path)
+    transforms, helpers = _import_package(tmp_path, monkeypatch)
+
+    def pipeline() -> Pipeline:
+        return Pipeline([
+            Stage("load", transforms.load),
+            Stage("double", transforms.double, ["load"], code=[transforms.double, helpers.scale]),
+            Stage("triple", transforms.triple, ["load"]),
+        ], cache_dir=tmp_path / "memo")
+
+    outputs = pipeline().run()
+    pd.testing.assert_frame_equal(outputs["triple"], pd.DataFrame({"value": [3.0, 6.0, 9.0]}))
+    assert set(_statuses(capsys.readouterr().out).values()) == {"ran"}
+
+    # Sizes change too, so the source is re-read even within the same mtime tick
+    _write_package(tmp_path, transforms=TRANSFORMS.replace("return df * 3", "return df * 3.0 # Float literal"))
+    transforms, helpers = _import_package(tmp_path, monkeypatch)
+    pipeline().run()
+    assert _statuses(capsys.readouterr().out) == {"load": "cached", "double": "cached", "triple": "ran"}
+
+    # Helpers are only covered by the stages listing them
+    _write_package(tmp_path, helpers=HELPERS.replace("df * 2", "df * 2.0"), transforms=TRANSFORMS.replace("return df * 3", "return df * 3.0 # Float literal"))
+    transforms, helpers = _import_package(tmp_path, monkeypatch)
+    pipeline().run()
+    assert _statuses(capsys.readouterr().out) == {"load": "cached", "double": "ran", "triple": "cached"}
+
+def test_fingerprint_covers_code_params_and_upstream_keys():
+    stage = Stage("resample", DataTransforms.upscale_monthly_to_weekly, params={"region": "EAST"})
+    before = stage.fingerprint(["upstream"])
+    assert stage.fingerprint(["upstream"]) == before
+    assert stage.fingerprint(["other upstream"]) != before
+    assert Stage("resample", DataTransforms.upscale_monthly_to_weekly, params={"region": "SOUTH"}).fingerprint(["upstream"]) != before
+    assert Stage("resample", DataTransforms.upscale_monthly_to_weekly, code=[DataTransforms.upscale_monthly_to_weekly, DataTransforms._weekly_frame],
+                 params={"region": "EAST"}).fingerprint(["upstream"]) != before
+
+def test_region_stages_have_their_own_code(tmp_path):
+    pipeline = build_region_pipeline(StorageRegion.EAST, SeriesStore(FeatureStore(tmp_path)))
+    assert DataTransforms._weekly_frame in pipeline.stages["resample_usage"].code
+    assert DataTransforms._weekly_frame not in pipeline.stages["resample_degree_days"].code
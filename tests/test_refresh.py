@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from datetime import timedelta
+from benchmarks import synthetic
+from benchmarks.stand_in import StandInServer, use_stand_in
+from utils.custom_types import StorageRegion
+from utils.feature_store import FeatureStore, RAW_FEATURES
+from utils.refresh import refresh_region, refresh_series
+from utils.series_store import SeriesStore
+
+REGION = StorageRegion.EAST
+
+def _series(start: str, end: str, offset: float = 0.0) -> pd.DataFrame:
+    periods = pd.date_range(start, end, freq="W-FRI")
+    return pd.DataFrame({"period": periods, "value": range(len(periods))}).assign(value=lambda x: x["value"] + offset)
+
+class RecordingFetch:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.starts = []
+
+    def __call__(self, start):
+        self.starts.append(start)
+        return self.df if start is None else self.df[self.df["period"] >= start]
+
+@pytest.fixture
+def store(tmp_path) -> SeriesStore:
+    return SeriesStore(FeatureStore(tmp_path))
+
+def test_refresh_pulls_from_the_lookback_month(store):
+    fetch = RecordingFetch(_series("2024-01-05", "2024-06-28"))
+    refresh_series(REGION, "storage", fetch, store)
+    assert fetch.starts == [None] # Nothing stored yet
+
+    fetch.df = _series("2024-01-05", "2024-07-26")
+    result = refresh_series(REGION, "storage", fetch, store, lookback=timedelta(weeks=8))
+    # 2024-06-28 less eight weeks is 2024-05-03, floored to the month start
+    assert fetch.starts[-1] == pd.Timestamp("2024-05-01")
+    pd.testing.assert_frame_equal(result, store.load(REGION, "storage"))
+    assert result["period"].max() == pd.Timestamp("2024-07-26") and result["period"].is_unique
+
+    refresh_series(REGION, "storage", fetch, store, full=True)
+    assert fetch.starts[-1] is None
+
+def test_upsert_replaces_rows_from_the_new_minimum_onwards(store):
+    store.save(REGION, "storage", _series("2024-01-05", "2024-06-28"))
+    stored = store.load(REGION, "storage")
+    # A revision of May onwards, without the last week that was published before
+    revised = _series("2024-05-03", "2024-06-21", offset=1000)
+    result = store.upsert(REGION, "storage", revised)
+    pd.testing.assert_frame_equal(result, store.load(REGION, "storage"))
+
+    kept = result[result["period"] < pd.Timestamp("2024-05-03")]
+    pd.testing.assert_frame_equal(kept, stored.iloc[:17])
+    assert (result.loc[result["period"] >= pd.Timestamp("2024-05-03"), "value"] >= 1000).all()
+    assert result["period"].max() == pd.Timestamp("2024-06-21")
+
+    # An empty pull keeps the stored series
+    pd.testing.assert_frame_equal(store.upsert(REGION, "storage", revised.iloc[:0]), result)
+
+def test_incremental_refresh_matches_a_full_pull(tmp_path, store):
+    today = pd.Timestamp.today().normalize()
+    rows = synthetic.eia_dataset_rows("2010-01-01", today.strftime("%Y-%m-%d"))
+    del rows[synthetic.POWER_GEN_ROUTE] # Not part of the refreshed series
+    with StandInServer(rows) as server, use_stand_in(server):
+        full_df = refresh_region(REGION, store, output_dir=tmp_path)
+        full_requests = server.request_count
+        incremental_df = refresh_region(REGION, store, output_dir=tmp_path)
+        incremental_requests = server.request_count - full_requests
+
+    pd.testing.assert_frame_equal(incremental_df, full_df)
+    pd.testing.assert_frame_equal(store.feature_store.read(REGION, RAW_FEATURES), full_df)
+    # Only this year's and last year's degree day files (two each) and one page per EIA series are pulled again
+    assert incremental_requests <= 3 + 2 * 2 < full_requests
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.custom_types import StorageRegion
+from utils.feature_store import FeatureStore, ENGINEERED_FEATURES
+from utils.nowcast import REPORT_WEEK
+from utils.scenarios import ALIGN_DAYS, TOTAL, draw_analog_weeks, simulate_regions
+
+REGIONS = [StorageRegion.EAST, StorageRegion.MIDWEST]
+
+@pytest.fixture
+def feature_store(tmp_path, engineered_frame) -> FeatureStore:
+    feature_store = FeatureStore(tmp_path)
+    for seed, region in enumerate(REGIONS):
+        feature_store.write(region, ENGINEERED_FEATURES, engineered_frame(n_weeks=300, seed=seed, region=region))
+    return feature_store
+
+def test_blocks_are_consecutive_history_weeks_near_the_same_day_of_year():
+    weeks = pd.date_range("2015-01-02", periods=400, freq="W-FRI")
+    history = weeks.delete(range(200, 203)) # A gap, no block may span it
+    as_of = history[-1]
+    idx = draw_analog_weeks(history, as_of, horizon=10, n_scenarios=500, block_weeks=4, seed=3)
+    assert idx.shape == (500, 10)
+
+    for block_start in range(0, 10, 4):
+        block = history.to_numpy()[idx[:, block_start:block_start + 4]]
+        assert (np.diff(block, axis=1) == REPORT_WEEK.to_timedelta64()).all()
+        target_doy = (as_of + (block_start + 1) * REPORT_WEEK).dayofyear
+        distance = np.abs(pd.DatetimeIndex(block[:, 0]).dayofyear - target_doy)
+        assert (np.minimum(distance, 365 - distance) <= ALIGN_DAYS).all()
+    # Blocks are drawn independently
+    assert len({tuple(row) for row in idx[:, [0, 4]]}) > 1
+
+def test_scenarios_are_reproducible_for_a_seed(feature_store):
+    first = simulate_regions(REGIONS, n_scenarios=200, horizon=12, seed=7, feature_store=feature_store)
+    again = simulate_regions(REGIONS, n_scenarios=200, horizon=12, seed=7, feature_store=feature_store)
+    other = simulate_regions(REGIONS, n_scenarios=200, horizon=12, seed=8, feature_store=feature_store)
+    for name in first:
+        np.testing.assert_array_equal(first[name].storage, again[name].storage)
+        assert not np.array_equal(first[name].storage, other[name].storage)
+
+def test_total_is_the_sum_of_the_regions(feature_store):
+    results = simulate_regions(REGIONS, n_scenarios=200, horizon=12, seed=0, feature_store=feature_store)
+    assert set(results) == {"EAST", "MIDWEST", TOTAL}
+    np.testing.assert_allclose(results[TOTAL].storage, results["EAST"].storage + results["MIDWEST"].storage)
+    assert results[TOTAL].start_storage == pytest.approx(results["EAST"].start_storage + results["MIDWEST"].start_storage)
+    assert (results[TOTAL].periods == results["EAST"].periods).all()
@@ -0,0 +1,72 @@
+import json
+import time
+import threading
+import pytest
+import requests
+from benchmarks.stand_in import StandInServer
+from utils.scheduler import RequestScheduler
+
+ROUTE = "test/route"
+ROWS = [{"period": f"2024-01-{day:02d}", "value": str(day)} for day in range(1, 29)]
+
+def _scheduler(retries: int = 20, rate: float = 200.0, burst: int = 2, max_concurrency: int = 2) -> RequestScheduler:
+    # Small bucket and pool, millisecond backoffs so retries don't slow the suite down
+    return RequestScheduler(rate, burst, max_concurrency, retries=retries, backoff=0.001, max_backoff=0.01, timeout=5)
+
+def _get(scheduler: RequestScheduler, server: StandInServer, offset: int = 0) -> requests.Response:
+    return scheduler.get(f"{server.eia_url}/{ROUTE}/", headers={"X-Params": json.dumps({"offset": offset, "length": 1})})
+
+def test_transient_failures_are_retried_to_success():
+    scheduler = _scheduler()
+    with StandInServer({ROUTE: ROWS}, fault_rate=0.4, seed=1) as server:
+        values = [_get(scheduler, server, offset).json()["response"]["data"][0]["value"] for offset in range(len(ROWS))]
+    assert values == [row["value"] for row in ROWS]
+    assert server.fault_count > 0
+    assert scheduler.stats.retries == server.fault_count
+    assert scheduler.stats.requests == server.request_count == len(ROWS) + server.fault_count
+
+def test_http_error_once_retries_are_used_up():
+    scheduler = _scheduler(retries=3)
+    with StandInServer({ROUTE: ROWS}, fault_rate=1.0) as server:
+        with pytest.raises(requests.HTTPError):
+            _get(scheduler, server)
+    assert server.request_count == 4
+    assert scheduler.stats.retries == 3
+
+def test_client_errors_are_not_retried():
+    scheduler = _scheduler()
+    with StandInServer({ROUTE: ROWS}) as server:
+        with pytest.raises(requests.HTTPError):
+            scheduler.get(f"{server.eia_url}/missing/route/", headers={"X-Params": "{}"})
+    assert server.request_count == 1
+    assert scheduler.stats.retries == 0
+
+def test_concurrent_identical_requests_share_one_upstream_hit():
+    scheduler = _scheduler(max_concurrency=8)
+    callers = 8
+    barrier = threading.Barrier(callers)
+    bodies = [None] * callers
+
+    def call(i: int) -> None:
+        barrier.wait()
+        bodies[i] = _get(scheduler, server).content
+
+    with StandInServer({ROUTE: ROWS}, latency=0.3) as server:
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert server.request_count == 1
+    assert scheduler.stats.deduped == callers - 1
+    assert len(set(bodies)) == 1 and bodies[0] is not None
+
+def test_bucket_limits_the_request_rate():
+    scheduler = _scheduler(rate=20.0, burst=2)
+    with StandInServer({ROUTE: ROWS}) as server:
+        start = time.perf_counter()
+        for offset in range(12):
+            _get(scheduler, server, offset)
+        elapsed = time.perf_counter() - start
+    assert elapsed >= (12 - 2) / 20 * 0.95 # The burst goes out at once, the rest at 20 per second
+    assert scheduler.stats.throttled_seconds > 0
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.schema import CALENDAR_DTYPE, VALUE_DTYPE, calendar_columns, enforce_schema, week_of_year
+
+def test_enforce_schema_casts_every_column_role():
+    df = pd.DataFrame({
+        "period": pd.to_datetime(["2024-01-05", "2024-01-12"]).astype("datetime64[s]"),
+        "Year": np.array([2024, 2024], dtype=np.int64),
+        "Month": [1.0, 1.0],
+        "Week": np.array([0, 1], dtype=np.int32),
+        "series": ["NW2_EPG0_SWO_R31_BCF", "NW2_EPG0_SWO_R31_BCF"],
+        "EAST_NG_Storage_BCF": [3000.5, 2900.25],
+        "Heating_Days": np.array([120, 130], dtype=np.int64),
+        "flag": [True, False],
+        "note": ["a", "b"],
+    })
+    result = enforce_schema(df)
+    assert result.dtypes.to_dict() == {
+        "period": np.dtype("datetime64[ns]"),
+        "Year": np.dtype(CALENDAR_DTYPE),
+        "Month": np.dtype(CALENDAR_DTYPE),
+        "Week": np.dtype(CALENDAR_DTYPE),
+        "series": pd.CategoricalDtype(["NW2_EPG0_SWO_R31_BCF"]),
+        "EAST_NG_Storage_BCF": np.dtype(VALUE_DTYPE),
+        "Heating_Days": np.dtype(VALUE_DTYPE),
+        "flag": np.dtype(bool), # Booleans and strings keep their dtype
+        "note": np.dtype(object),
+    }
+    assert result["EAST_NG_Storage_BCF"].tolist() == [3000.5, 2900.25]
+    assert enforce_schema(result) is result # Nothing left to cast, no copy
+
+@pytest.mark.parametrize("start, end", [
+    ("2015-12-20", "2017-01-10"), # 2016 starts on a Friday and is a leap year
+    ("2022-12-25", "2024-01-08"), # 2023 starts on a Sunday
+    ("1999-12-01", "2001-01-31"),
+])
+def test_week_of_year_matches_strftime_across_year_boundaries(start, end):
+    dates = pd.date_range(start, end, freq="D")
+    expected = dates.strftime("%U").astype(int).to_numpy()
+    np.testing.assert_array_equal(week_of_year(dates.to_numpy()), expected)
+    np.testing.assert_array_equal(week_of_year(pd.Series(dates + pd.Timedelta(hours=23))), expected) # Time of day is ignored
+
+def test_calendar_columns():
+    dates = pd.to_datetime(["2023-12-31", "2024-01-01", "2024-02-29"]).to_numpy()
+    calendar = calendar_columns(dates)
+    assert {col: values.tolist() for col, values in calendar.items()} == {"Year": [2023, 2024, 2024], "Month": [12, 1, 2], "Week": [53, 0, 8]}
+    assert all(values.dtype == CALENDAR_DTYPE for values in calendar.values())
@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from utils.custom_types import StorageRegion, storage_region_to_noaa_states
+from utils.feature_store import FeatureStore, ENGINEERED_FEATURES
+from utils.instrumentation import instrumented
+
+EXPANDING = "expanding"
+ROLLING = "rolling"
+DEFAULT_MIN_TRAIN = 104 # Two years of weekly rows before the first forecast
+MAX_GRAM_BYTES = 256 * 1024 * 1024 # Above this the prefix-sum Gram matrices (e.g. of the ~370 column lag grid) give way to per-fold solves
+
+# Engineered columns computed from the target's own week (see refresh.build_engineered_features). A same-week
+# regression would read the answer from them, so they are left out of the default features
+TARGET_DERIVED_COLS = ["Storage_4Wk_Avg"]
+
+def target_col(region: StorageRegion) -> str:
+    return f"{region.name}_NG_Storage_BCF"
+
+def default_feature_cols(df: pd.DataFrame, target: str, datetime_col: str = "period") -> List[str]:
+    return [col for col in df.columns if col not in (target, datetime_col) and col not in TARGET_DERIVED_COLS]
+
+class BacktestResult:
+    """
+    Output of a walk-forward backtest.
+
+    Attributes:
+        forecasts: One row per forecast week with period, actual, forecast,
+            error (forecast - actual) and the fold that produced it
+        folds: One row per refit with its train and test ranges and error
+            metrics (mae, rmse, mape, bias)
+        coefs: (folds x features) coefficients of each refit, in the
+            units of the original features
+        intercepts: Intercept of each refit
+    """
+    def __init__(self, forecasts: pd.DataFrame, folds: pd.DataFrame, coefs: np.ndarray, intercepts: np.ndarray, feature_cols: List[str]):
+        self.forecasts = forecasts
+        self.folds = folds
+        self.coefs = coefs
+        self.intercepts = intercepts
+        self.feature_cols = feature_cols
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Error metrics over every out-of-sample forecast.
+        """
+        metrics = error_metrics(self.forecasts["actual"].to_numpy(), self.forecasts["forecast"].to_numpy())
+        return {"folds": len(self.folds), "forecasts": len(self.forecasts), **metrics}
+
+def error_metrics(actual: np.ndarray, forecast: np.ndarray) -> Dict[str, float]:
+    """
+    MAE, RMSE, MAPE, bias and out-of-sample R^2 of a forecast series.
+    """
+    metrics = {name: float(values[0]) for name, values in _fold_error_metrics(actual, forecast, np.zeros(len(actual), dtype=np.int64), 1).items()}
+    ss_tot = np.sum((actual - actual.mean()) ** 2)
+    r2 = 1 - np.sum((forecast - actual) ** 2) / ss_tot if ss_tot > 0 else np.nan
+    return {**metrics, "r2": float(r2)}
+
+def _fold_error_metrics(actual: np.ndarray, forecast: np.ndarray, row_folds: np.ndarray, n_folds: int) -> Dict[str, np.ndarray]:
+    """
+    MAE, RMSE, MAPE (skipping zero actuals) and bias (mean of forecast -
+    actual) of every fold at once, with bincount sums over row_folds.
+    """
+    error = forecast - actual
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.abs(error / actual)
+    finite = np.isfinite(ape)
+    n_rows = np.bincount(row_folds, minlength=n_folds)
+    n_finite = np.bincount(row_folds[finite], minlength=n_folds)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "mae": np.bincount(row_folds, weights=np.abs(error), minlength=n_folds) / n_rows,
+            "rmse": np.sqrt(np.bincount(row_folds, weights=error ** 2, minlength=n_folds) / n_rows),
+            "mape": np.bincount(row_folds[finite], weights=ape[finite], minlength=n_folds) / n_finite * 100,
+            "bias": np.bincount(row_folds, weights=error, minlength=n_folds) / n_rows,
+        }
+
+def walk_forward_folds(n_rows: int, window: str = EXPANDING, window_size: Optional[int] = None, min_train: int = DEFAULT_MIN_TRAIN,
+                       refit_every: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Row ranges of every walk-forward fold: fold i trains on rows
+    [train_starts[i], fold_starts[i]) and forecasts [fold_starts[i], fold_ends[i]).
+    """
+    if window not in (EXPANDING, ROLLING):
+        raise ValueError(f"window must be {EXPANDING} or {ROLLING}, got {window}")
+    if window == ROLLING and window_size is None:
+        raise ValueError("window_size is required for a rolling window")
+    if refit_every < 1:
+        raise ValueError(f"refit_every must be at least 1, got {refit_every}")
+    if window == ROLLING and window_size < min_train:
+        raise ValueError(f"window_size ({window_size}) must be at least min_train ({min_train})")
+    if n_rows <= min_train:
+        raise ValueError(f"Need more than min_train ({min_train}) rows, got {n_rows}")
+
+    fold_starts = np.arange(min_train, n_rows, refit_every)
+    train_starts = np.maximum(fold_starts - window_size, 0) if window == ROLLING else np.zeros_like(fold_starts)
+    fold_ends = np.minimum(fold_starts + refit_every, n_rows)
+    return train_starts, fold_starts, fold_ends
+
+def _window_coefs(design: np.ndarray, y_centered: np.ndarray, train_starts: np.ndarray, fold_starts: np.ndarray) -> np.ndarray:
+    """
+    (folds x columns) least squares coefficients of y_centered on the
+    design rows [train_starts[i], fold_starts[i]) of every fold.
+    """
+    n_rows, n_cols = design.shape
+    # Per-row outer products and their prefix sums, then the window Grams and their pseudo-inverses
+    gram_bytes = (2 * n_rows + 1 + 2 * len(fold_starts)) * n_cols ** 2 * design.itemsize
+    if gram_bytes > MAX_GRAM_BYTES:
+        print(f"Prefix-sum Gram matrices would take {gram_bytes / 1e6:.0f} MB, solving {len(fold_starts)} folds one at a time")
+        return np.stack([
+            np.linalg.pinv(design[start:end].T @ design[start:end], rcond=1e-12, hermitian=True) @ (design[start:end].T @ y_centered[start:end])
+            for start, end in zip(train_starts, fold_starts)
+        ])
+
+    # Prefix sums of the per-week rank-one updates, gram[k] covers rows [0, k)
+    gram = np.zeros((n_rows + 1, n_cols, n_cols))
+    np.cumsum(design[:, :, None] * design[:, None, :], axis=0, out=gram[1:])
+    moment = np.zeros((n_rows + 1, n_cols))
+    np.cumsum(design * y_centered[:, None], axis=0, out=moment[1:])
+
+    window_gram = gram[fold_starts] - gram[train_starts]
+    window_moment = moment[fold_starts] - moment[train_starts]
+    return np.einsum("fij,fj->fi", np.linalg.pinv(window_gram, rcond=1e-12, hermitian=True), window_moment)
+
+@instrumented()
+def walk_forward_backtest(df: pd.DataFrame, target: str, feature_cols: Optional[List[str]] = None, window: str = EXPANDING,
+                          window_size: Optional[int] = None, min_train: int = DEFAULT_MIN_TRAIN, refit_every: int = 1,
+                          datetime_col: str = "period") -> BacktestResult:
+    """
+    Walk-forward backtest of an ordinary least squares regression of target
+    on feature_cols (every other column but TARGET_DERIVED_COLS by
+    default), equivalent to refitting sklearn's LinearRegression on the
+    training window before every fold.
+
+    Rows are sorted by datetime_col. Every refit_every rows a model is fit
+    on the rows before the fold (all of them for an expanding window, the
+    last window_size for a rolling one) and forecasts the next refit_every
+    rows, so no fold ever trains on its own or later weeks.
+
+    Instead of refitting from scratch, the X'X and X'y sufficient statistics
+    are accumulated as running sums of rank-one updates (one per week).
+    Any window's statistics are then a difference of two prefix sums, and
+    every fold's normal equations are solved in one batched call. When
+    those arrays would exceed MAX_GRAM_BYTES, each fold is solved on its
+    own instead (see _window_coefs()).
+    """
+    feature_cols = feature_cols or default_feature_cols(df, target, datetime_col)
+    df = df.sort_values(by=datetime_col).reset_index(drop=True)
+    n_rows, n_features = len(df), len(feature_cols)
+    if min_train <= n_features:
+        raise ValueError(f"min_train ({min_train}) must exceed the number of features ({n_features})")
+    train_starts, fold_starts, fold_ends = walk_forward_folds(n_rows, window, window_size, min_train, refit_every)
+
+    x = df[feature_cols].to_numpy(dtype=np.float64)
+    y = df[target].to_numpy(dtype=np.float64)
+
+    # Standardize for conditioning, OLS forecasts with an intercept don't change under affine feature scaling
+    x_mean, x_std = x.mean(axis=0), x.std(axis=0)
+    x_std[x_std == 0] = 1
+    y_mean = y.mean()
+    design = np.column_stack([np.ones(n_rows), (x - x_mean) / x_std])
+
+    scaled_coefs = _window_coefs(design, y - y_mean, train_starts, fold_starts)
+
+    test_rows = np.arange(min_train, n_rows)
+    row_folds = (test_rows - min_train) // refit_every
+    forecast = np.einsum("ij,ij->i", design[test_rows], scaled_coefs[row_folds]) + y_mean
+    actual = y[test_rows]
+    periods = df[datetime_col].to_numpy()
+
+    forecasts_df = pd.DataFrame({
+        datetime_col: periods[test_rows],
+        "actual": actual,
+        "forecast": forecast,
+        "error": forecast - actual,
+        "fold": row_folds,
+    })
+
+    folds_df = pd.DataFrame({
+        "fold": np.arange(len(fold_starts)),
+        "train_start": periods[train_starts],
+        "train_end": periods[fold_starts - 1],
+        "test_start": periods[fold_starts],
+        "test_end": periods[fold_ends - 1],
+        "n_train": fold_starts - train_starts,
+        "n_test": fold_ends - fold_starts,
+    })
+    folds_df = folds_df.assign(**_fold_error_metrics(actual, forecast, row_folds, len(fold_starts)))
+
+    # Back to the units of the original features
+    coefs = scaled_coefs[:, 1:] / x_std
+    intercepts = scaled_coefs[:, 0] + y_mean - coefs @ x_mean
+    return BacktestResult(forecasts_df, folds_df, coefs, intercepts, feature_cols)
+
+def backtest_region(region: StorageRegion, feature_store: Optional[FeatureStore] = None, **kwargs) -> BacktestResult:
+    """
+    Backtests the region's engineered feature table from the feature store,
+    forecasting {REGION}_NG_Storage_BCF. kwargs go to walk_forward_backtest().
+    """
+    feature_store = feature_store or FeatureStore()
+    df = feature_store.read(region, ENGINEERED_FEATURES)
+    if df is None:
+        raise ValueError(f"No {ENGINEERED_FEATURES} stored for {region.name}, build the region first")
+    return walk_forward_backtest(df, target_col(region), **kwargs)
+
+def backtest_all_regions(storage_regions: Optional[List[StorageRegion]] = None, feature_store: Optional[FeatureStore] = None,
+                         **kwargs) -> Dict[StorageRegion, BacktestResult]:
+    """
+    Backtests every region with a stored engineered feature table.
+    """
+    feature_store = feature_store or FeatureStore()
+    storage_regions = storage_regions or [
+        region for region in storage_region_to_noaa_states if feature_store.exists(region, ENGINEERED_FEATURES)
+    ]
+    return {region: backtest_region(region, feature_store, **kwargs) for region in storage_regions}
+
+def summarize_backtests(results: Dict[StorageRegion, BacktestResult]) -> pd.DataFrame:
+    return pd.DataFrame([{"region": region.name, **result.summary()} for region, result in results.items()])
@@ -0,0 +1,71 @@
+import multiprocessing
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from utils.custom_types import StorageRegion, storage_region_to_noaa_states
+from utils.eia_api import EIADataPuller
+from utils.noaa import get_degree_days_by_region
+from utils.refresh import NOAA_START_YEAR, build_raw_features, build_engineered_features
+from utils.feature_store import DATA_DIR, RAW_FEATURES, ENGINEERED_FEATURES
+from utils.series_store import SeriesStore
+
+BATCH_REGIONS: List[StorageRegion] = list(storage_region_to_noaa_states)
+
+def fetch_all_region_series(storage_regions: List[StorageRegion]) -> Dict[StorageRegion, Dict[str, pd.DataFrame]]:
+    """
+    Pulls every series for all regions with one EIA query per dataset (all
+    duoareas/series in one facet list) and one parse per NOAA file, then
+    returns the series split by region.
+    """
+    puller = EIADataPuller(storage_regions[0])
+    series_by_name: Dict[str, Dict[StorageRegion, pd.DataFrame]] = {
+        "storage": puller.get_storage_data_for_regions(storage_regions),
+        "ng_withdrawls": puller.get_ng_withdrawls_data_for_regions(storage_regions),
+        "ng_usage": puller.get_all_ng_usage_data_for_regions(storage_regions),
+        "degree_days": get_degree_days_by_region(
+            NOAA_START_YEAR,
+            datetime.now().year,
+            {region: storage_region_to_noaa_states[region] for region in storage_regions}
+        ),
+    }
+    return {region: {name: region_dfs[region] for name, region_dfs in series_by_name.items()} for region in storage_regions}
+
+def _build_region_tables(region: StorageRegion, series: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    raw_features_df = build_raw_features(region, series)
+    return raw_features_df, build_engineered_features(region, raw_features_df)
+
+def build_all_regions(storage_regions: List[StorageRegion] = BATCH_REGIONS, store: Optional[SeriesStore] = None,
+                      output_dir: Path = DATA_DIR, max_processes: Optional[int] = None) -> Dict[StorageRegion, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Builds the raw and engineered feature tables of every region in one run.
+    Pulled series are saved to the series store so later runs can refresh
+    incrementally, and the per-region transforms run in a process pool.
+    Tables are published to the feature store along with their
+    {REGION}_data_raw.csv and {REGION}_data_engineered.csv exports.
+    """
+    store = store or SeriesStore()
+    region_series = fetch_all_region_series(storage_regions)
+    for region, series in region_series.items():
+        for name, df in series.items():
+            store.save(region, name, df.sort_values(by="period").reset_index(drop=True))
+
+    # The pullers' scheduler threads are running, so workers start fresh rather than forking this process
+    context = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(max_workers=max_processes, mp_context=context) as executor:
+        region_tables = dict(zip(
+            storage_regions,
+            executor.map(_build_region_tables, storage_regions, [region_series[region] for region in storage_regions])
+        ))
+
+    for region, (raw_features_df, engineered_features_df) in region_tables.items():
+        store.feature_store.publish(region, RAW_FEATURES, raw_features_df, output_dir)
+        store.feature_store.publish(region, ENGINEERED_FEATURES, engineered_features_df, output_dir)
+        print(f"Built {region.name}: {len(raw_features_df)} raw rows, {len(engineered_features_df)} engineered rows")
+    return region_tables
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    build_all_regions()
@@ -0,0 +1,243 @@
+import os
+import json
+import hashlib
+import threading
+import requests
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+CACHE_DIR = Path(os.getenv("NAT_GAS_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+ENTRY_SUFFIX = ".json"
+PAGES_SUFFIX = ".jsonl" # Header line, then one JSON-encoded body per page
+
+TTLPolicy = Callable[[datetime], Optional[datetime]] # Fetch time -> expiry time (None = never expires)
+
+def never_expires(fetched_at: datetime) -> Optional[datetime]:
+    return None
+
+def expires_after(delta: timedelta) -> TTLPolicy:
+    return lambda fetched_at: fetched_at + delta
+
+def expires_next_weekly_release(weekday: int = 3, hour: int = 10, minute: int = 30) -> TTLPolicy:
+    """
+    Expires at the next weekly release after the fetch time. Defaults to the
+    EIA storage report (Thursday 10:30 ET, local clock assumed to be ET).
+    """
+    def policy(fetched_at: datetime) -> Optional[datetime]:
+        release = fetched_at.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        release += timedelta(days=(weekday - fetched_at.weekday()) % 7)
+        if release <= fetched_at:
+            release += timedelta(weeks=1)
+        return release
+    return policy
+
+DATASET_TTLS: Dict[str, TTLPolicy] = {
+    "eia_storage": expires_next_weekly_release(),
+    "eia_power_gen": expires_after(timedelta(days=1)),
+    "eia_ng_usage": expires_after(timedelta(days=7)), # Monthly series, revised irregularly
+    "eia_ng_withdrawls": expires_after(timedelta(days=7)),
+    "noaa_regions": expires_after(timedelta(days=30)),
+    "noaa_current_year": expires_after(timedelta(days=1)),
+    "noaa_historical": never_expires, # Years finished over a month ago are never revised
+}
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return f"CacheStats(hits={self.hits}, misses={self.misses}, evictions={self.evictions}, hit_rate={self.hit_rate():.1%})"
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache keyed on URL plus the X-Params header. Each
+    entry carries an expiry computed from its dataset's TTL policy, and the
+    directory is kept under max_bytes by evicting least recently used entries.
+    The pages of a paginated query are stored as one entry, so they always
+    come from the same fetch and expire and are evicted together.
+    """
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url: str, headers: Optional[Dict[str, str]] = None, paginated: bool = False) -> str:
+        x_params = (headers or {}).get("X-Params", "")
+        if x_params:
+            params = json.loads(x_params)
+            params.pop("api_key", None) # Key rotation should not invalidate the cache
+            params.pop("end", None) # Always today's date, freshness is left to the dataset's TTL
+            if paginated: # One entry for every page of the query
+                params.pop("offset", None)
+                params.pop("length", None)
+            x_params = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{url}|{x_params}".encode()).hexdigest()
+
+    def _path(self, key: str, suffix: str = ENTRY_SUFFIX) -> Path:
+        return self.cache_dir / f"{key}{suffix}"
+
+    @staticmethod
+    def _expiry(dataset: str) -> Optional[str]:
+        if dataset not in DATASET_TTLS:
+            raise ValueError(f"No TTL policy for dataset {dataset}, expected one of {list(DATASET_TTLS)}")
+        expires_at = DATASET_TTLS[dataset](datetime.now())
+        return expires_at.isoformat() if expires_at else None
+
+    def _is_live(self, path: Path, expires_at: Optional[str]) -> bool:
+        """
+        Records a hit and bumps the entry when it has not expired, otherwise
+        removes it and records a miss.
+        """
+        if expires_at is not None and datetime.fromisoformat(expires_at) <= datetime.now():
+            path.unlink(missing_ok=True)
+            self._record(hit=False)
+            return False
+        os.utime(path) # Bump mtime, which orders LRU eviction
+        self._record(hit=True)
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._record(hit=False)
+            return None
+        return entry["body"] if self._is_live(path, entry["expires_at"]) else None
+
+    def put(self, key: str, body: str, dataset: str) -> None:
+        entry = {"expires_at": self._expiry(dataset), "body": body}
+
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path) # Atomic so concurrent readers never see partial entries
+        self._evict()
+
+    def get_pages(self, key: str) -> Optional[Iterator[str]]:
+        """
+        Page bodies of a query stored with write_pages(), in order, or None on
+        a miss. Pages are read from disk one at a time as they are consumed.
+        """
+        path = self._path(key, PAGES_SUFFIX)
+        try:
+            f = open(path, "r")
+        except FileNotFoundError:
+            self._record(hit=False)
+            return None
+        try:
+            header = json.loads(f.readline())
+        except json.JSONDecodeError:
+            f.close()
+            self._record(hit=False)
+            return None
+        if not self._is_live(path, header["expires_at"]):
+            f.close()
+            return None
+
+        def pages() -> Iterator[str]:
+            with f: # Still readable if the entry is evicted meanwhile
+                for line in f:
+                    yield json.loads(line)
+        return pages()
+
+    @contextmanager
+    def write_pages(self, key: str, dataset: str) -> Iterator[Callable[[str], None]]:
+        """
+        Yields a function appending a page body to a new entry for a
+        paginated query. The entry replaces any previous one only once the
+        block exits cleanly, and is discarded when it raises or is left
+        early, so no entry ever holds part of a query.
+        """
+        path = self._path(key, PAGES_SUFFIX)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(json.dumps({"expires_at": self._expiry(dataset)}) + "\n")
+                yield lambda body: f.write(json.dumps(body) + "\n")
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self._evict()
+
+    def get_text(self, url: str, dataset: str, get: Callable[..., requests.Response] = requests.get,
+                 headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, str]] = None) -> str:
+        """
+        Returns the response body for url, only calling get() on a cache miss.
+        Unsuccessful responses are returned but never cached.
+        """
+        key = self.make_key(url, headers)
+        body = self.get(key)
+        if body is not None:
+            return body
+
+        res = get(url, headers=headers, params=params)
+        if res.ok:
+            self.put(key, res.text, dataset)
+        return res.text
+
+    def _entries(self) -> list[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.suffix not in (ENTRY_SUFFIX, PAGES_SUFFIX):
+                continue
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError: # Evicted by another thread
+                continue
+        return entries
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+            total_bytes = sum(stat.st_size for _, stat in entries)
+            for path, stat in entries:
+                if total_bytes <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total_bytes -= stat.st_size
+                self.stats.evictions += 1
+
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+    def size_bytes(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def clear(self) -> None:
+        for path, _ in self._entries():
+            path.unlink(missing_ok=True)
+
+    def report(self) -> str:
+        return f"{self.stats} | {len(self._entries())} entries, {self.size_bytes() / 1e6:.1f}/{self.max_bytes / 1e6:.0f} MB"
+
+_default_cache: Optional[ResponseCache] = None
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """
+    Shared cache used by the EIA and NOAA pullers. Set NAT_GAS_CACHE=0 to disable.
+    """
+    global _default_cache
+    if os.getenv("NAT_GAS_CACHE", "1") == "0":
+        return None
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 from typing import List
+from utils.instrumentation import instrumented
+from utils.schema import calendar_columns, enforce_schema
 
 class DataTransforms:
     @staticmethod
@@ -10,6 +12,7 @@ class DataTransforms:
             raise ValueError(f"Columns {missing_cols} are required for the upscale_monthly_to_weekly()")
 
     @staticmethod
+    @instrumented()
     def downscale_daily_to_weekly(df: pd.DataFrame, datetime_col: str, value_col: str) -> pd.DataFrame:
         DataTransforms._validate_required_columns(df, [datetime_col, value_col])
 
@@ -18,45 +21,73 @@ class DataTransforms:
             .sort_index()
             .resample(rule="W-FRI", on=datetime_col).mean()
             .reset_index(drop=False)
+            .pipe(enforce_schema)
         )
 
     @staticmethod
+    def _weekly_frame(start: pd.Timestamp, end: pd.Timestamp, datetime_col: str) -> pd.DataFrame:
+        # Same as pd.date_range(start, end, freq='W-FRI').values without its per-date loop. Like date_range,
+        # start is rolled forward to a Friday keeping its time of day, and end is only rolled back to one
+        # when start already is a Friday
+        if start.weekday() == 4:
+            end -= pd.Timedelta(days=(end.weekday() - 4) % 7)
+        start += pd.Timedelta(days=(4 - start.weekday()) % 7)
+        weekly_index = np.arange(start.to_datetime64(), end.to_datetime64() + np.timedelta64(1, "ns"), np.timedelta64(7, "D")).astype("datetime64[ns]")
+        return pd.DataFrame({datetime_col: weekly_index, **calendar_columns(weekly_index)})
+
+    @staticmethod
+    @instrumented()
     def upscale_monthly_to_weekly(df: pd.DataFrame, datetime_col: str, value_col: str) -> pd.DataFrame:
-        DataTransforms._validate_required_columns(df, [datetime_col, value_col])
-        
-        df[value_col] = df[value_col] / df[datetime_col].dt.days_in_month
+        return DataTransforms.upscale_monthly_to_weekly_columns(df, datetime_col, [value_col])
 
-        weekly_index = pd.date_range(df[datetime_col].min(), df[datetime_col].max() + pd.Timedelta(weeks=4), freq='W-FRI', inclusive='both')
+    @staticmethod
+    @instrumented()
+    def upscale_monthly_to_weekly_columns(df: pd.DataFrame, datetime_col: str, value_cols: List[str]) -> pd.DataFrame:
+        """
+        Spreads monthly value columns evenly across the W-FRI weeks of each
+        month, joining on the Year and Month columns. All columns share a
+        single weekly index and merge. The input frame is not modified.
+        """
+        DataTransforms._validate_required_columns(df, [datetime_col, "Year", "Month"] + value_cols)
 
-        weekly_df = (pd.DataFrame(weekly_index,columns=[datetime_col])
-            .sort_values(by=[datetime_col])
-            .assign(Year=lambda x: x[datetime_col].dt.year,
-                    Month=lambda x: x[datetime_col].dt.month,
-                    Week=lambda x: x[datetime_col].dt.strftime("%U").astype(int))
-        )
-        return (pd.merge(weekly_df, df.drop(columns=[datetime_col]), on=["Year", "Month"], how="left")
-            .assign(value=lambda x: x['value'] / 30 * 4) # Assume scaled to 30 days/month, then scale to 4 weeks/month
-        )
+        days_in_month = df[datetime_col].dt.days_in_month
+        monthly_df = enforce_schema(df.drop(columns=[datetime_col]).assign(**{col: df[col] / days_in_month for col in value_cols}))
+
+        weekly_df = DataTransforms._weekly_frame(df[datetime_col].min(), df[datetime_col].max() + pd.Timedelta(weeks=4), datetime_col)
+        merged_df = pd.merge(weekly_df, monthly_df, on=["Year", "Month"], how="left")
+        merged_df[value_cols] = merged_df[value_cols] / 30 * 4 # Assume scaled to 30 days/month, then scale to 4 weeks/month
+        return enforce_schema(merged_df)
 
     @staticmethod
+    @instrumented()
     def weekly_interpolate_from_middle_week(df: pd.DataFrame, datetime_col: str, value_col: str) -> pd.DataFrame:
+        """
+        Keeps only the value of the week closest to the 15th of each month
+        (the first such row on ties) and linearly interpolates the rest. The
+        input frame is not modified.
+        """
         DataTransforms._validate_required_columns(df, [datetime_col, value_col])
 
-        df['is_middle_week'] = (df
-            .groupby(df[datetime_col].dt.to_period('M'), group_keys=False)
-            .apply(lambda g: g[datetime_col] == min(g[datetime_col], key=lambda d: abs(d - (d.replace(day=15)))))
-        )
+        dates = df[datetime_col].values.astype("datetime64[ns]")
+        days = dates.astype("datetime64[D]")
+        months = days.astype("datetime64[M]")
+        # Whole days from the 15th, like d - d.replace(day=15), whose time of day cancels out
+        distance = np.abs(days - (months.astype("datetime64[D]") + np.timedelta64(14, "D")))
 
-        return (df
-            .assign(value=lambda x: 
-                x[value_col]
-                .where(x['is_middle_week'], np.nan)
-                .interpolate('linear', limit_direction='both')
-            )
-            .drop(columns=["is_middle_week"])
-        )
+        # First row of each month after ordering by distance to the 15th, ties broken by row order
+        order = np.lexsort((np.arange(len(dates)), distance, months))
+        unique_months, first_idx = np.unique(months[order], return_index=True)
+        middle_dates = dates[order][first_idx]
+        is_middle_week = dates == middle_dates[np.searchsorted(unique_months, months)]
+
+        return df.assign(**{value_col:
+            df[value_col]
+            .where(is_middle_week, np.nan)
+            .interpolate('linear', limit_direction='both')
+        })
 
     @staticmethod
+    @instrumented()
     def calculate_deviation_from_yearly_avg(df: pd.DataFrame, datetime_col: str, value_col: str) -> pd.DataFrame:
         DataTransforms._validate_required_columns(df, [datetime_col, value_col])
 
@@ -73,5 +104,5 @@ class DataTransforms:
             .reset_index()
         )
 
-        return pd.merge(df, weekly_avg_deviation_df, on='Week', how='left').drop(columns=['value'])
+        return enforce_schema(pd.merge(df, weekly_avg_deviation_df, on='Week', how='left').drop(columns=['value']))
 
@@ -1,8 +1,10 @@
 import os
 from time import timezone
-import requests
 import json
-from typing import Dict, List, Tuple
+import contextlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Iterator, List, Tuple
 from datetime import datetime
 from utils.custom_types import (
     FuelType, 
@@ -13,19 +15,30 @@ from utils.custom_types import (
     storage_region_to_noaa_states,
     storage_region_to_power_gen_respondent_region
 )
+from utils.cache import ResponseCache, get_default_cache
+from utils.instrumentation import instrumented
+from utils.schema import VALUE_DTYPE, enforce_schema, with_calendar
+from utils.scheduler import EIA, get_scheduler
 from typing import Any, Optional
+import numpy as np
 import pandas as pd
 
+EIA_API_URL = os.getenv("EIA_API_URL", "https://api.eia.gov/v2") # Override to use a local stand-in
 MAX_QUERY_SIZE = 5000
+DEFAULT_MAX_WORKERS = 4 # Concurrent page requests once the total row count is known
 SET_TIMEZONE = Timezone.EASTERN # Hardcoded to ensure all data queries are consistent
 
 class EIADataPuller:
-    def __init__(self, storage_region: StorageRegion):
+    def __init__(self, storage_region: StorageRegion, max_workers: int = DEFAULT_MAX_WORKERS, use_cache: bool = True):
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, got {max_workers}")
         self.api_key = os.getenv('EIA_API_KEY')
+        self.max_workers = max_workers
+        self.cache: Optional[ResponseCache] = get_default_cache() if use_cache else None
         self.storage_region: StorageRegion = storage_region
-        self.power_gen_respondents: List[Respondent] = storage_region_to_power_gen_respondent_region[storage_region]
-        self.eia_duoareas: List[str] = [f"S{abbr.value}" for abbr in self.power_gen_respondents]
-        self.eia_withdrawl_series: List[str] = [f"N9010{state_abbr}2" for state_abbr in storage_region_to_noaa_states[storage_region]]
+        self.power_gen_respondents: List[Respondent] = self._region_respondents(storage_region)
+        self.eia_duoareas: List[str] = self._region_duoareas(storage_region)
+        self.eia_withdrawl_series: List[str] = self._region_withdrawl_series(storage_region)
 
     def _build_header(self, 
         frequency: Optional[str], 
@@ -59,134 +72,324 @@ class EIADataPuller:
             "X-Params": json.dumps(header)
         }
 
-    def _get_data_and_size(self, header: Dict[str, Any], url: str) -> Tuple[List[Dict[str, Any]], int]:
-        header["offset"] = 0
-        header["length"] = MAX_QUERY_SIZE
-        req = requests.get(url, headers=self._generate_header_str(header), params={"api_key": self.api_key})
+    def _request_text(self, header: Dict[str, Any], url: str) -> str:
+        # Every puller shares the EIA scheduler, so concurrent pulls stay under the key's rate limit together
+        return get_scheduler(EIA).get(url, headers=self._generate_header_str(header), params={"api_key": self.api_key}).text
 
+    @staticmethod
+    def _parse_response(text: str) -> Dict[str, Any]:
         try:
-            return req.json()['response']['data'], int(req.json()['response']['total'])
+            return json.loads(text)['response']
         except Exception as e:
-            print(f"Response: {req.text}")
+            print(f"Response: {text}")
             raise ValueError(f"Error parsing JSON: {e}")
-    
-    def _get_data_with_offset(self, header: Dict[str, Any], url: str, offset: int, length: int) -> List[Dict[str, Any]]:
-        header["offset"] = offset
-        header["length"] = length
-        req = requests.get(url, headers=self._generate_header_str(header), params={"api_key": self.api_key})
-        return req.json()['response']['data']
-
-    def _get_all_data(self, header: Dict[str, Any], url: str) -> List[Dict[str, Any]]:
-        res_list, res_size = self._get_data_and_size(header, url)
+
+    def _fetch_pages(self, header: Dict[str, Any], url: str, first_size: int, res_size: int) -> Iterator[str]:
+        """
+        Response bodies of the pages after the first, in offset order. The
+        offsets are requested concurrently, with at most 2 * max_workers
+        pages in flight so memory stays bounded by a few pages.
+        """
+        offsets = iter(range(first_size, res_size, MAX_QUERY_SIZE))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            def submit_next() -> None:
+                offset = next(offsets, None)
+                if offset is not None: # Copy the header, pages are requested concurrently
+                    in_flight.append(executor.submit(self._request_text, {**header, "offset": offset, "length": min(MAX_QUERY_SIZE, res_size - offset)}, url))
+
+            in_flight: Deque[Future] = deque()
+            for _ in range(2 * self.max_workers):
+                submit_next()
+            while in_flight:
+                text = in_flight.popleft().result()
+                submit_next()
+                yield text
+
+    def _stream_pages(self, header: Dict[str, Any], url: str, dataset: str) -> Tuple[int, Iterator[List[Dict[str, Any]]]]:
+        """
+        Returns the total row count of a query and a generator of its pages in
+        offset order. The first page reports the total, after which the rest
+        are fetched by _fetch_pages(). Every page of a query is cached in one
+        entry with the TTL policy of the given dataset, written once the last
+        page has arrived, so a cached query never mixes separate fetches.
+        """
+        key = self.cache.make_key(url, self._generate_header_str(header), paginated=True) if self.cache is not None else None
+        cached_texts = self.cache.get_pages(key) if key is not None else None
+        if cached_texts is not None:
+            first_text = next(cached_texts)
+        else:
+            first_text = self._request_text({**header, "offset": 0, "length": MAX_QUERY_SIZE}, url)
+        first_response = self._parse_response(first_text)
+        first_page, res_size = first_response['data'], int(first_response['total'])
         print(f"Querying {res_size} rows of data...")
-        while len(res_list) < res_size:
-            query_size = min(MAX_QUERY_SIZE, res_size - len(res_list))
-            res_list.extend(self._get_data_with_offset(header, url, len(res_list), query_size))
-            print(f"Recieved {len(res_list)} rows of data...")
-        return res_list
 
-    def get_power_gen_data(self, fueltype: FuelType) -> pd.DataFrame:
+        def pages() -> Iterator[List[Dict[str, Any]]]:
+            texts = cached_texts if cached_texts is not None else self._fetch_pages(header, url, len(first_page), res_size)
+            store = key is not None and cached_texts is None
+            with self.cache.write_pages(key, dataset) if store else contextlib.nullcontext(lambda text: None) as write:
+                write(first_text)
+                yield first_page
+                received = len(first_page)
+                for text in texts:
+                    page = self._parse_response(text)['data'] # Raises on error responses, so they are never cached
+                    write(text)
+                    received += len(page)
+                    print(f"Recieved {received} rows of data...")
+                    yield page
+
+        return res_size, pages()
+
+    def _get_all_data(self, header: Dict[str, Any], url: str, dataset: str) -> List[Dict[str, Any]]:
+        """
+        Pulls every row for a query as a list of JSON rows.
+        """
+        _, pages = self._stream_pages(header, url, dataset)
+        return [row for page in pages for row in page]
+
+    @instrumented()
+    def _get_frame(self, header: Dict[str, Any], url: str, dataset: str, facet_cols: List[str]) -> pd.DataFrame:
+        """
+        Pulls every row for a query into a DataFrame with only period
+        (datetime64), value (float32, NaN when missing) and facet_cols
+        (categorical). Each page is decoded into preallocated typed arrays as
+        it arrives, so the full response is never held as Python dicts.
+        """
+        res_size, pages = self._stream_pages(header, url, dataset)
+        periods = np.empty(res_size, dtype="datetime64[ns]")
+        values = np.empty(res_size, dtype=VALUE_DTYPE)
+        facet_codes = {col: np.empty(res_size, dtype=np.int32) for col in facet_cols}
+        facet_categories: Dict[str, Dict[str, int]] = {col: {} for col in facet_cols}
+
+        n_rows = 0
+        for page in pages:
+            page_end = n_rows + len(page)
+            if page_end > len(periods): # Rows were added to the dataset mid-pull
+                periods, values = np.resize(periods, page_end), np.resize(values, page_end)
+                facet_codes = {col: np.resize(codes, page_end) for col, codes in facet_codes.items()}
+
+            periods[n_rows:page_end] = pd.to_datetime([row["period"] for row in page]).values
+            values[n_rows:page_end] = pd.to_numeric([row["value"] for row in page], errors="coerce")
+            for col in facet_cols:
+                categories = facet_categories[col]
+                facet_codes[col][n_rows:page_end] = [
+                    -1 if row.get(col) is None else categories.setdefault(row[col], len(categories))
+                    for row in page
+                ]
+            n_rows = page_end
+
+        frame: Dict[str, Any] = {"period": periods[:n_rows], "value": values[:n_rows]}
+        for col in facet_cols:
+            frame[col] = pd.Categorical.from_codes(facet_codes[col][:n_rows], categories=list(facet_categories[col]))
+        return pd.DataFrame(frame)
+
+    @staticmethod
+    def _region_respondents(storage_region: StorageRegion) -> List[Respondent]:
+        return storage_region_to_power_gen_respondent_region[storage_region]
+
+    @staticmethod
+    def _region_duoareas(storage_region: StorageRegion) -> List[str]:
+        return [f"S{abbr.value}" for abbr in EIADataPuller._region_respondents(storage_region)]
+
+    @staticmethod
+    def _region_withdrawl_series(storage_region: StorageRegion) -> List[str]:
+        return [f"N9010{state_abbr}2" for state_abbr in storage_region_to_noaa_states[storage_region]]
+
+    @staticmethod
+    def _union(values: List[List[str]]) -> List[str]:
+        return sorted({value for region_values in values for value in region_values})
+
+    @instrumented()
+    def get_power_gen_data(self, fueltype: FuelType, start: Optional[str] = None) -> pd.DataFrame:
         """
         Pulls EIA Power Generation Consumption data for a specific fueltype. 
         Daily data is aggregated across all respondents for a given storage 
-        region, then is grouped again to find a weekly average.
+        region, then is grouped again to find a weekly average. Pass start
+        (YYYY-MM-DD) to pull only data on or after that date.
+        """
+        return self.get_power_gen_data_for_regions(fueltype, [self.storage_region], start)[self.storage_region]
+
+    @instrumented()
+    def get_power_gen_data_for_regions(self, fueltype: FuelType, storage_regions: List[StorageRegion], start: Optional[str] = None) -> Dict[StorageRegion, pd.DataFrame]:
         """
-        POWER_GEN_URL = f"https://api.eia.gov/v2/electricity/rto/daily-fuel-type-data/data/"
+        Same as get_power_gen_data(), but pulls the respondents of every
+        region in a single query and splits the rows by region locally.
+        """
+        POWER_GEN_URL = f"{EIA_API_URL}/electricity/rto/daily-fuel-type-data/data/"
         POWER_GEN_START_DATE = "2019-01-01"
-        EXP_COLS = ["period", "value", "respondent-name"]
+        FACET_COLS = ["respondent", "respondent-name"]
+        respondents = self._union([[respondent.value for respondent in self._region_respondents(region)] for region in storage_regions])
         header = self._build_header(
             frequency="daily",
             data=["value"],
-            facets={"respondent": [respondent.value for respondent in self.power_gen_respondents], "fueltype": [fueltype.value], "timezone": [SET_TIMEZONE.value]},
-            start=POWER_GEN_START_DATE,
+            facets={"respondent": respondents, "fueltype": [fueltype.value], "timezone": [SET_TIMEZONE.value]},
+            start=start or POWER_GEN_START_DATE,
             end=datetime.now().strftime("%Y-%m-%d"),
         )
 
-        df = (pd.DataFrame(self._get_all_data(header, POWER_GEN_URL))[EXP_COLS]
-            .astype({"value": int, "period": "datetime64[ns]", "respondent-name": "category"})
-            .assign(Week=lambda x: x['period'].dt.strftime("%U").astype(int),
-                    Year=lambda x: x['period'].dt.year)
-            .groupby(["period", "Year", "Week"])["value"].sum() # Sum across all respondents on a given day
-            .reset_index(drop=False)
-            .groupby(["Week", "Year"])["value"].mean() # Average across all days on a given week
-            .reset_index(drop=False) 
-            .rename(columns={"value": f"{self.storage_region.name}_NG_Power_Gen_MWh"})
-        )
-        return df
-
+        raw_df = self._get_frame(header, POWER_GEN_URL, "eia_power_gen", FACET_COLS).pipe(with_calendar, ["Week", "Year"])
 
+        region_dfs: Dict[StorageRegion, pd.DataFrame] = {}
+        for region in storage_regions:
+            region_respondents = [respondent.value for respondent in self._region_respondents(region)]
+            region_dfs[region] = (raw_df[raw_df["respondent"].isin(region_respondents)]
+                .groupby(["period", "Year", "Week"])["value"].sum() # Sum across all respondents on a given day
+                .reset_index(drop=False)
+                .groupby(["Week", "Year"])["value"].mean() # Average across all days on a given week
+                .reset_index(drop=False) 
+                .rename(columns={"value": f"{region.name}_NG_Power_Gen_MWh"})
+                .pipe(enforce_schema)
+            )
+        return region_dfs
 
-    def get_storage_data(self) -> pd.DataFrame:
+    @instrumented()
+    def get_storage_data(self, start: Optional[str] = None) -> pd.DataFrame:
         """
         Pulls EIA Natural Gas Storage data for a specific storage
-        region. Data is retrieved at a weekly frequency.
+        region. Data is retrieved at a weekly frequency. Pass start
+        (YYYY-MM-DD) to pull only data on or after that date.
+        """
+        return self.get_storage_data_for_regions([self.storage_region], start)[self.storage_region]
+
+    @instrumented()
+    def get_storage_data_for_regions(self, storage_regions: List[StorageRegion], start: Optional[str] = None) -> Dict[StorageRegion, pd.DataFrame]:
+        """
+        Same as get_storage_data(), but pulls the series of every region in
+        a single query and splits the rows by region locally.
         """
-        STORAGE_URL = f"https://api.eia.gov/v2/natural-gas/stor/wkly/data/"
+        STORAGE_URL = f"{EIA_API_URL}/natural-gas/stor/wkly/data/"
         STORAGE_START_DATE= "2010-01-01"
-        EXP_COLS = ["period", "value"]
+        FACET_COLS = ["series"]
 
         header = self._build_header(
             frequency="weekly",
             data=["value"],
-            facets={"series": [self.storage_region.value]},
-            start=STORAGE_START_DATE,
+            facets={"series": [region.value for region in storage_regions]},
+            start=start or STORAGE_START_DATE,
             end=datetime.now().strftime("%Y-%m-%d"),
         )
 
-        return (pd.DataFrame(self._get_all_data(header, STORAGE_URL))[EXP_COLS]
-            .astype({"value": int, "period": 'datetime64[ns]'})
-            .rename(columns={"value": f"{self.storage_region.name}_NG_Storage_BCF"})
-            .sort_values(by="period", ascending=False)
-            .reset_index(drop=True)
-            .assign(Week=lambda x: x['period'].dt.strftime("%U").astype(int),
-                    Year=lambda x: x['period'].dt.year)
-            # .drop(columns=["period"])
-        )
+        raw_df = self._get_frame(header, STORAGE_URL, "eia_storage", FACET_COLS)
+
+        region_dfs: Dict[StorageRegion, pd.DataFrame] = {}
+        for region in storage_regions:
+            region_dfs[region] = (raw_df[raw_df["series"] == region.value]
+                .drop(columns=["series"])
+                .rename(columns={"value": f"{region.name}_NG_Storage_BCF"})
+                .sort_values(by="period", ascending=False)
+                .reset_index(drop=True)
+                .pipe(with_calendar, ["Week", "Year"])
+                # .drop(columns=["period"])
+            )
+        return region_dfs
+
+    @instrumented()
+    def get_ng_usage_data(self, consumption_type: EIAConsumptionType, start: Optional[str] = None) -> pd.DataFrame:
+        return self.get_ng_usage_data_for_regions(consumption_type, [self.storage_region], start)[self.storage_region]
 
-    def get_ng_usage_data(self, consumption_type: EIAConsumptionType) -> pd.DataFrame:
-        USAGE_URL = f"https://api.eia.gov/v2/natural-gas/cons/sum/data/"
+    def _get_ng_usage_rows(self, consumption_types: List[EIAConsumptionType], storage_regions: List[StorageRegion], start: Optional[str] = None) -> pd.DataFrame:
+        USAGE_URL = f"{EIA_API_URL}/natural-gas/cons/sum/data/"
         USAGE_START_DATE = "2010-01-01"
-        EXP_COLS = ["period", "value"]
+        FACET_COLS = ["duoarea", "process"]
 
         header = self._build_header(
             frequency="monthly",
             data=["value"],
-            facets={"duoarea": self.eia_duoareas, "process": [consumption_type.value]},
-            start=USAGE_START_DATE,
+            facets={
+                "duoarea": self._union([self._region_duoareas(region) for region in storage_regions]),
+                "process": [consumption_type.value for consumption_type in consumption_types]
+            },
+            start=start or USAGE_START_DATE,
             end=datetime.now().strftime("%Y-%m-%d"),
         )
 
-        return (pd.DataFrame(self._get_all_data(header, USAGE_URL))[EXP_COLS]
-            .fillna(0)
-            .astype({"value": int, "period": "datetime64[ns]"})
-            .groupby("period")["value"].sum()
-            .reset_index(drop=False)
-            .sort_values(by="period", ascending=True)
-            .assign(Year=lambda x: x["period"].dt.year,
-                    Month=lambda x: x["period"].dt.month,
-                    value=lambda x: x["value"] / x["period"].dt.days_in_month * 30) # Scale by days in month
-        )
+        return self._get_frame(header, USAGE_URL, "eia_ng_usage", FACET_COLS).fillna({"value": 0})
 
-    def get_ng_withdrawls_data(self) -> pd.DataFrame:
-        WITHDRAWLS_URL = f"https://api.eia.gov/v2/natural-gas/prod/sum/data"
+    @instrumented()
+    def get_ng_usage_data_for_regions(self, consumption_type: EIAConsumptionType, storage_regions: List[StorageRegion], start: Optional[str] = None) -> Dict[StorageRegion, pd.DataFrame]:
+        """
+        Pulls monthly natural gas consumption for every region in a single
+        query, then sums each region's duoareas locally.
+        """
+        raw_df = self._get_ng_usage_rows([consumption_type], storage_regions, start)
+
+        region_dfs: Dict[StorageRegion, pd.DataFrame] = {}
+        for region in storage_regions:
+            region_dfs[region] = (raw_df[raw_df["duoarea"].isin(self._region_duoareas(region))]
+                .groupby("period")["value"].sum()
+                .reset_index(drop=False)
+                .sort_values(by="period", ascending=True)
+                .pipe(with_calendar, ["Year", "Month"])
+                .assign(value=lambda x: x["value"] / x["period"].dt.days_in_month * 30) # Scale by days in month
+                .pipe(enforce_schema)
+            )
+        return region_dfs
+
+    @instrumented()
+    def get_all_ng_usage_data(self, start: Optional[str] = None) -> pd.DataFrame:
+        """
+        Pulls every EIAConsumptionType in one query. Returns a wide frame with
+        one column per consumption type (named by the enum name), scaled the
+        same way as get_ng_usage_data().
+        """
+        return self.get_all_ng_usage_data_for_regions([self.storage_region], start)[self.storage_region]
+
+    @instrumented()
+    def get_all_ng_usage_data_for_regions(self, storage_regions: List[StorageRegion], start: Optional[str] = None) -> Dict[StorageRegion, pd.DataFrame]:
+        consumption_types = list(EIAConsumptionType)
+        process_to_col = {consumption_type.value: consumption_type.name for consumption_type in consumption_types}
+        usage_cols = list(process_to_col.values())
+        raw_df = self._get_ng_usage_rows(consumption_types, storage_regions, start)
+
+        region_dfs: Dict[StorageRegion, pd.DataFrame] = {}
+        for region in storage_regions:
+            wide_df = (raw_df[raw_df["duoarea"].isin(self._region_duoareas(region))]
+                .groupby(["period", "process"], observed=True)["value"].sum()
+                .unstack("process")
+                .rename(columns=process_to_col)
+                .reindex(columns=usage_cols)
+                .sort_index()
+            )
+            wide_df.columns.name = None
+            wide_df = wide_df.div(wide_df.index.days_in_month, axis=0) * 30 # Scale by days in month
+            region_dfs[region] = (wide_df
+                .reset_index(drop=False)
+                .pipe(with_calendar, ["Year", "Month"])
+                .pipe(enforce_schema)
+            )
+        return region_dfs
+
+    @instrumented()
+    def get_ng_withdrawls_data(self, start: Optional[str] = None) -> pd.DataFrame:
+        return self.get_ng_withdrawls_data_for_regions([self.storage_region], start)[self.storage_region]
+
+    @instrumented()
+    def get_ng_withdrawls_data_for_regions(self, storage_regions: List[StorageRegion], start: Optional[str] = None) -> Dict[StorageRegion, pd.DataFrame]:
+        """
+        Pulls monthly gross withdrawals for every region in a single query,
+        then sums each region's state series locally.
+        """
+        WITHDRAWLS_URL = f"{EIA_API_URL}/natural-gas/prod/sum/data"
         WITHDRAWLS_START_DATE = "2010-01-01"
         
-        EXP_COLS = ["period", "value"]
+        FACET_COLS = ["series"]
 
         header = self._build_header(
             frequency="monthly",
             data=["value"],
-            facets={"series": [self.eia_withdrawl_series]},
-            start=WITHDRAWLS_START_DATE,
+            facets={"series": self._union([self._region_withdrawl_series(region) for region in storage_regions])},
+            start=start or WITHDRAWLS_START_DATE,
             end=datetime.now().strftime("%Y-%m-%d"),
         )
 
-        return (pd.DataFrame(self._get_all_data(header, WITHDRAWLS_URL))[EXP_COLS]
-            .fillna(0)
-            .astype({"period": "datetime64[ns]", "value" : int})
-            .groupby("period")["value"].sum()
-            .reset_index(drop=False)
-            .assign(Year=lambda x: x["period"].dt.year,
-                    Month=lambda x: x["period"].dt.month,
-                    value=lambda x: x["value"] / x["period"].dt.days_in_month * 30) # Scale by days in month
-        )
\ No newline at end of file
+        raw_df = self._get_frame(header, WITHDRAWLS_URL, "eia_ng_withdrawls", FACET_COLS).fillna({"value": 0})
+
+        region_dfs: Dict[StorageRegion, pd.DataFrame] = {}
+        for region in storage_regions:
+            region_dfs[region] = (raw_df[raw_df["series"].isin(self._region_withdrawl_series(region))]
+                .groupby("period")["value"].sum()
+                .reset_index(drop=False)
+                .pipe(with_calendar, ["Year", "Month"])
+                .assign(value=lambda x: x["value"] / x["period"].dt.days_in_month * 30) # Scale by days in month
+                .pipe(enforce_schema)
+            )
+        return region_dfs
@@ -0,0 +1,136 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import List, Optional, Union
+from utils.custom_types import StorageRegion
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+FEATURE_STORE_DIR = DATA_DIR / "store"
+ROW_GROUP_SIZE = 512 # ~10 years of weekly rows, so date-range reads can skip row groups
+
+RAW_FEATURES = "raw_features"
+ENGINEERED_FEATURES = "engineered_features"
+
+# Compatibility CSV exports read by the notebooks
+table_to_csv_suffix = {
+    RAW_FEATURES: "data_raw",
+    ENGINEERED_FEATURES: "data_engineered",
+}
+
+class FeatureStore:
+    """
+    Columnar store of every series and feature table, one uncompressed
+    Parquet file per region and series under
+    {root}/region={REGION}/series={name}/data.parquet. Files are sorted by
+    period and memory-mapped on read, so reads only touch the requested
+    columns and the row groups overlapping the requested date range.
+    """
+    def __init__(self, root: Path = FEATURE_STORE_DIR):
+        self.root = Path(root)
+
+    def _path(self, region: StorageRegion, name: str) -> Path:
+        return self.root / f"region={region.name}" / f"series={name}" / "data.parquet"
+
+    def exists(self, region: StorageRegion, name: str) -> bool:
+        return self._path(region, name).exists()
+
+    def names(self, region: StorageRegion) -> List[str]:
+        return sorted(path.parent.name.removeprefix("series=") for path in (self.root / f"region={region.name}").glob("series=*/data.parquet"))
+
+    def modified_time(self, region: StorageRegion, name: str) -> Optional[int]:
+        """
+        mtime (ns) of a stored series, which changes whenever it is
+        rewritten. None if the series is not stored.
+        """
+        path = self._path(region, name)
+        return path.stat().st_mtime_ns if path.exists() else None
+
+    def columns(self, region: StorageRegion, name: str) -> List[str]:
+        """
+        Column names of a stored series, read from the file schema only.
+        """
+        return pq.read_schema(self._path(region, name), memory_map=True).names
+
+    def write(self, region: StorageRegion, name: str, df: pd.DataFrame) -> None:
+        if "period" in df.columns:
+            df = df.sort_values(by="period")
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+
+        path = self._path(region, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, compression="none")
+        os.replace(tmp_path, path) # Atomic so readers never see a partial file
+
+    def read(self, region: StorageRegion, name: str, columns: Optional[List[str]] = None,
+             start: Optional[Union[str, pd.Timestamp]] = None, end: Optional[Union[str, pd.Timestamp]] = None) -> Optional[pd.DataFrame]:
+        """
+        Reads a series, optionally projected to columns and limited to
+        periods in [start, end]. Returns None if the series is not stored.
+        """
+        path = self._path(region, name)
+        if not path.exists():
+            return None
+
+        filters = []
+        if start is not None:
+            filters.append(("period", ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append(("period", "<=", pd.Timestamp(end)))
+
+        table = pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+        return table.to_pandas()
+
+    def last_period(self, region: StorageRegion, name: str) -> Optional[pd.Timestamp]:
+        """
+        Latest stored period, read from the row group statistics without
+        loading any data.
+        """
+        path = self._path(region, name)
+        if not path.exists():
+            return None
+
+        metadata = pq.ParquetFile(path, memory_map=True).metadata
+        period_idx = metadata.schema.to_arrow_schema().get_field_index("period")
+        if period_idx == -1:
+            return None
+        last_periods = [
+            metadata.row_group(i).column(period_idx).statistics.max
+            for i in range(metadata.num_row_groups)
+            if metadata.row_group(i).column(period_idx).statistics is not None
+        ]
+        return pd.Timestamp(max(last_periods)) if last_periods else None
+
+    @staticmethod
+    def csv_path(region: StorageRegion, name: str, output_dir: Path = DATA_DIR) -> Path:
+        if name not in table_to_csv_suffix:
+            raise ValueError(f"No CSV export for {name}, expected one of {list(table_to_csv_suffix)}")
+        return Path(output_dir) / f"{region.name}_{table_to_csv_suffix[name]}.csv"
+
+    def export_csv(self, region: StorageRegion, name: str, output_dir: Path = DATA_DIR) -> Path:
+        """
+        Writes a stored feature table to the CSV path the notebooks read,
+        e.g. data/EAST_data_raw.csv.
+        """
+        csv_path = self.csv_path(region, name, output_dir)
+        self.read(region, name).to_csv(csv_path, index=False)
+        return csv_path
+
+    def import_csv(self, region: StorageRegion, name: str, input_dir: Path = DATA_DIR) -> pd.DataFrame:
+        """
+        Seeds the store from an existing CSV export.
+        """
+        df = pd.read_csv(self.csv_path(region, name, input_dir), float_precision="round_trip").astype({"period": "datetime64[ns]"})
+        self.write(region, name, df)
+        return df
+
+    def publish(self, region: StorageRegion, name: str, df: pd.DataFrame, output_dir: Optional[Path] = DATA_DIR) -> None:
+        """
+        Stores a feature table and writes its compatibility CSV export
+        (skipped when output_dir is None).
+        """
+        self.write(region, name, df)
+        if output_dir is not None:
+            df.to_csv(self.csv_path(region, name, output_dir), index=False)
@@ -0,0 +1,277 @@
+import os
+import re
+import json
+import time
+import threading
+import functools
+import tracemalloc
+import pandas as pd
+import requests
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+class Span:
+    """
+    One timed call of an instrumented stage. HTTP, row and memory figures
+    are inclusive of nested stages, like the wall time.
+    """
+    def __init__(self, name: str, category: str, start: float, thread_id: int, depth: int):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end: Optional[float] = None
+        self.thread_id = thread_id
+        self.depth = depth
+        self.rows_in = 0
+        self.rows_out = 0
+        self.requests = 0
+        self.bytes = 0
+        self.latency = 0.0 # Summed seconds to response headers
+        self.start_bytes = 0
+        self.peak_bytes = 0 # Peak traced allocation above start_bytes
+
+    @property
+    def seconds(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latencies: List[float] = []
+
+class Profiler:
+    """
+    Records a Span per call of every instrumented stage (EIADataPuller
+    methods, NOAA functions, DataTransforms steps and pipeline stages)
+    plus per-endpoint HTTP stats. Disabled profilers record nothing, so
+    instrumented code only pays for an attribute check.
+    """
+    def __init__(self, trace_memory: bool = False):
+        self.enabled = False
+        self.trace_memory = trace_memory
+        self.spans: List[Span] = []
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.http_events: List[Dict[str, Any]] = []
+        self.origin = time.perf_counter()
+        self._open: Dict[int, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, trace_memory: Optional[bool] = None) -> None:
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans, self.endpoints, self.http_events = [], {}, []
+            self.origin = time.perf_counter()
+
+    def _stack(self) -> List[Span]:
+        # Threads without open spans (e.g. page fetch workers) report to the main thread's stages
+        stack = self._open.get(threading.get_ident())
+        return stack if stack else self._open.get(threading.main_thread().ident, [])
+
+    def _checkpoint_memory(self) -> int:
+        """
+        Folds the traced peak since the last checkpoint into every open span
+        and resets it, so nested and concurrent spans each keep their own peak.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        for stack in self._open.values():
+            for span in stack:
+                span.peak_bytes = max(span.peak_bytes, peak - span.start_bytes)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextmanager
+    def span(self, name: str, category: str = "stage") -> Iterator[Optional[Span]]:
+        if not self.enabled:
+            yield None
+            return
+
+        thread_id = threading.get_ident()
+        with self._lock:
+            parent_depth = len(self._stack())
+            span = Span(name, category, time.perf_counter(), thread_id, parent_depth)
+            if self.trace_memory and tracemalloc.is_tracing():
+                span.start_bytes = self._checkpoint_memory()
+            self._open.setdefault(thread_id, []).append(span)
+        try:
+            yield span
+        finally:
+            with self._lock:
+                span.end = time.perf_counter()
+                if self.trace_memory and tracemalloc.is_tracing():
+                    self._checkpoint_memory()
+                self._open[thread_id].remove(span)
+                self.spans.append(span)
+
+    def record_response(self, res: requests.Response) -> None:
+        """
+        Adds a response to its endpoint's stats and to every open stage.
+        """
+        if not self.enabled:
+            return
+        url = urlsplit(res.url)
+        endpoint = f"{url.netloc}{re.sub(r'/[0-9]+(?=/)', '/{n}', url.path)}" # One endpoint for every year's NOAA file
+        n_bytes = len(res.content)
+        latency = res.elapsed.total_seconds()
+        end = time.perf_counter()
+
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.errors += 0 if res.ok else 1
+            stats.bytes += n_bytes
+            stats.latencies.append(latency)
+            self.http_events.append({"endpoint": endpoint, "start": end - latency, "end": end, "bytes": n_bytes,
+                                     "status": res.status_code, "thread_id": threading.get_ident()})
+            for span in self._stack():
+                span.requests += 1
+                span.bytes += n_bytes
+                span.latency += latency
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Per stage totals across calls, slowest first.
+        """
+        columns = ["stage", "category", "calls", "seconds", "requests", "mb_downloaded", "mean_latency_ms", "rows_in", "rows_out", "peak_mb"]
+        if not self.spans:
+            return pd.DataFrame(columns=columns)
+        spans_df = pd.DataFrame([{
+            "stage": span.name, "category": span.category, "seconds": span.seconds, "requests": span.requests,
+            "bytes": span.bytes, "latency": span.latency, "rows_in": span.rows_in, "rows_out": span.rows_out,
+            "peak_mb": span.peak_bytes / 1e6,
+        } for span in self.spans])
+        summary_df = (spans_df
+            .groupby(["stage", "category"], sort=False)
+            .agg(calls=("seconds", "size"), seconds=("seconds", "sum"), requests=("requests", "sum"), bytes=("bytes", "sum"),
+                 latency=("latency", "sum"), rows_in=("rows_in", "sum"), rows_out=("rows_out", "sum"), peak_mb=("peak_mb", "max"))
+            .reset_index()
+            .assign(mb_downloaded=lambda x: x["bytes"] / 1e6,
+                    mean_latency_ms=lambda x: (x["latency"] / x["requests"].where(x["requests"] > 0) * 1000).fillna(0))
+            .sort_values(by="seconds", ascending=False)
+        )
+        if not self.trace_memory:
+            columns.remove("peak_mb")
+        return summary_df[columns].reset_index(drop=True)
+
+    def endpoint_summary(self) -> pd.DataFrame:
+        return pd.DataFrame([{
+            "endpoint": endpoint,
+            "requests": stats.requests,
+            "errors": stats.errors,
+            "mb_downloaded": stats.bytes / 1e6,
+            "mean_latency_ms": sum(stats.latencies) / len(stats.latencies) * 1000,
+            "max_latency_ms": max(stats.latencies) * 1000,
+        } for endpoint, stats in self.endpoints.items()], columns=["endpoint", "requests", "errors", "mb_downloaded", "mean_latency_ms", "max_latency_ms"])
+
+    def report(self) -> str:
+        with pd.option_context("display.max_rows", None, "display.width", 200, "display.float_format", "{:.3f}".format):
+            return "\n".join([
+                "Stages (inclusive of nested stages):",
+                self.summary().to_string(index=False),
+                "",
+                "HTTP endpoints:",
+                self.endpoint_summary().to_string(index=False),
+            ])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spans": [{
+                "name": span.name, "category": span.category, "depth": span.depth, "thread_id": span.thread_id,
+                "start": span.start - self.origin, "seconds": span.seconds, "rows_in": span.rows_in, "rows_out": span.rows_out,
+                "requests": span.requests, "bytes": span.bytes, "latency": span.latency, "peak_mb": span.peak_bytes / 1e6,
+            } for span in self.spans],
+            "stages": self.summary().to_dict(orient="records"),
+            "endpoints": self.endpoint_summary().to_dict(orient="records"),
+        }
+
+    def export_json(self, path: Path) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def export_chrome_trace(self, path: Path) -> None:
+        """
+        Writes spans and HTTP requests in the Chrome trace event format, for
+        chrome://tracing or https://ui.perfetto.dev.
+        """
+        pid = os.getpid()
+        events = [{
+            "name": span.name, "cat": span.category, "ph": "X", "pid": pid, "tid": span.thread_id,
+            "ts": (span.start - self.origin) * 1e6, "dur": span.seconds * 1e6,
+            "args": {"rows_in": span.rows_in, "rows_out": span.rows_out, "requests": span.requests,
+                     "bytes": span.bytes, "peak_mb": span.peak_bytes / 1e6},
+        } for span in self.spans]
+        events += [{
+            "name": event["endpoint"], "cat": "http", "ph": "X", "pid": pid, "tid": event["thread_id"],
+            "ts": (event["start"] - self.origin) * 1e6, "dur": (event["end"] - event["start"]) * 1e6,
+            "args": {"bytes": event["bytes"], "status": event["status"]},
+        } for event in self.http_events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+def count_rows(obj: Any) -> int:
+    """
+    Rows in a DataFrame, a dict or list of DataFrames, or a list of rows.
+    """
+    if isinstance(obj, pd.DataFrame):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(count_rows(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        if obj and all(isinstance(value, pd.DataFrame) for value in obj):
+            return sum(len(value) for value in obj)
+        return len(obj)
+    return 0
+
+_profiler = Profiler()
+if os.getenv("NAT_GAS_PROFILE", "0") == "1":
+    _profiler.enable(trace_memory=os.getenv("NAT_GAS_PROFILE_MEMORY", "0") == "1")
+
+def get_profiler() -> Profiler:
+    """
+    Shared profiler used by every instrumented stage. Enable it with
+    NAT_GAS_PROFILE=1 or get_profiler().enable(). Peak memory per stage is
+    only recorded with NAT_GAS_PROFILE_MEMORY=1 or enable(trace_memory=True),
+    since tracemalloc slows allocation-heavy code several times over.
+    """
+    return _profiler
+
+def instrumented(name: Optional[str] = None, category: str = "stage") -> Callable[[Callable], Callable]:
+    """
+    Records a span per call of the decorated function, with the rows of
+    its DataFrame arguments as rows_in and of its result as rows_out.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _profiler.enabled:
+                return func(*args, **kwargs)
+            with _profiler.span(span_name, category) as span:
+                span.rows_in = sum(count_rows(arg) for arg in [*args, *kwargs.values()] if isinstance(arg, pd.DataFrame))
+                result = func(*args, **kwargs)
+                span.rows_out = count_rows(result)
+                return result
+        return wrapper
+    return decorator
+
+def record_response(res: requests.Response, *args: Any, **kwargs: Any) -> requests.Response:
+    """
+    requests response hook feeding the shared profiler.
+    """
+    _profiler.record_response(res)
+    return res
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Optional, Sequence, Tuple
+from utils.instrumentation import instrumented
+from utils.schema import VALUE_DTYPE
+
+DEFAULT_LAGS = (1, 2, 3, 4)
+DEFAULT_WINDOWS = (2, 4, 8, 13, 26, 52)
+DEFAULT_DIFFS = (1, 4, 52)
+DEFAULT_PCT_CHANGES = (1,) # Week over week
+DEFAULT_EWM_SPANS = (4, 13, 52)
+
+class FeatureState:
+    """
+    Everything LagFeatureGenerator.update() needs to extend the features
+    past the last row seen: the last lookback rows of every column, the
+    last EWM values and the last period.
+    """
+    def __init__(self, tail: np.ndarray, ewm: np.ndarray, last_period: pd.Timestamp, n_rows: int):
+        self.tail = tail # (lookback x columns), NaN padded when fewer rows were seen
+        self.ewm = ewm # (columns x spans), NaN until a column's first non-NaN value
+        self.last_period = last_period
+        self.n_rows = n_rows
+
+class LagFeatureGenerator:
+    """
+    Builds a grid of lag and rolling window features for every column.
+
+    For each column col it adds:
+        {col}_lag{k}: value k weeks earlier, for k in lags
+        {col}_mean{w} / {col}_sum{w}: trailing w-week mean / sum, for w in windows
+        {col}_diff{k}: change from k weeks earlier, for k in diffs
+        {col}_pct{k}: relative change from k weeks earlier, for k in pct_changes
+        {col}_ewm{s}: exponentially weighted mean with span s, for s in ewm_spans,
+            equal to df[col].ewm(span=s, adjust=False, ignore_na=True).mean()
+
+    Windows that reach before the first row are NaN, like pandas shift()
+    and rolling(). All features except the EWMs come from one strided view
+    of the last lookback + 1 rows at every row, and update() only needs
+    the FeatureState of the previous call, so appending a week costs the
+    same however long the history is. Features are computed in float64
+    and returned as the float32 value dtype of utils.schema.
+    """
+    def __init__(self, columns: List[str], lags: Sequence[int] = DEFAULT_LAGS, windows: Sequence[int] = DEFAULT_WINDOWS,
+                 diffs: Sequence[int] = DEFAULT_DIFFS, pct_changes: Sequence[int] = DEFAULT_PCT_CHANGES,
+                 ewm_spans: Sequence[int] = DEFAULT_EWM_SPANS):
+        if not columns:
+            raise ValueError("At least one column is required")
+        periods = [*lags, *windows, *diffs, *pct_changes, *ewm_spans]
+        if any(period < 1 for period in periods):
+            raise ValueError(f"Lags, windows, diffs, pct changes and EWM spans must be at least 1, got {periods}")
+        self.columns = list(columns)
+        self.lags, self.windows, self.diffs, self.pct_changes = list(lags), list(windows), list(diffs), list(pct_changes)
+        self.ewm_spans = list(ewm_spans)
+        self.lookback = max([*self.lags, *[window - 1 for window in self.windows], *self.diffs, *self.pct_changes, 0])
+
+    @property
+    def feature_names(self) -> List[str]:
+        """
+        Output columns, grouped by feature kind then by column.
+        """
+        kinds = (
+            [f"lag{lag}" for lag in self.lags]
+            + [f"{stat}{window}" for window in self.windows for stat in ("mean", "sum")]
+            + [f"diff{diff}" for diff in self.diffs]
+            + [f"pct{pct}" for pct in self.pct_changes]
+            + [f"ewm{span}" for span in self.ewm_spans]
+        )
+        return [f"{col}_{kind}" for kind in kinds for col in self.columns]
+
+    def _window_features(self, padded: np.ndarray) -> List[np.ndarray]:
+        """
+        Features of every row of padded after its first lookback rows, each
+        (rows x columns), in feature_names order (without the EWMs).
+        """
+        lookback = self.lookback
+        views = sliding_window_view(padded, lookback + 1, axis=0) # (rows x columns x lookback + 1), last = current row
+        current = views[..., lookback]
+
+        features = [views[..., lookback - lag] for lag in self.lags]
+        for window in self.windows:
+            window_sum = views[..., lookback - window + 1:].sum(axis=-1)
+            features += [window_sum / window, window_sum]
+        features += [current - views[..., lookback - diff] for diff in self.diffs]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            features += [current / views[..., lookback - pct] - 1 for pct in self.pct_changes]
+        return features
+
+    def _ewm_features(self, values: np.ndarray, ewm: np.ndarray) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Runs the EWM recursion over values starting from ewm (columns x
+        spans), vectorized across columns and spans. Returns one (rows x
+        columns) array per span and the final state.
+        """
+        alphas = 2 / (np.array(self.ewm_spans, dtype=np.float64) + 1)
+        ewm = ewm.copy()
+        out = np.empty((len(values), len(self.columns), len(self.ewm_spans)))
+        for i, row in enumerate(values):
+            row = row[:, None]
+            updated = np.where(np.isnan(ewm), row, ewm + alphas * (row - ewm)) # First value seeds the mean
+            ewm = np.where(np.isnan(row), ewm, updated) # Missing weeks keep the previous mean
+            out[i] = ewm
+        return [out[:, :, s] for s in range(len(self.ewm_spans))], ewm
+
+    def _build(self, values: np.ndarray, periods: np.ndarray, tail: np.ndarray, ewm: np.ndarray,
+               n_seen: int, datetime_col: str) -> Tuple[pd.DataFrame, FeatureState]:
+        padded = np.concatenate([tail, values])
+        ewm_features, ewm = self._ewm_features(values, ewm)
+        grid = np.stack(self._window_features(padded) + ewm_features, axis=1) # (rows x kinds x columns)
+
+        features_df = pd.DataFrame(grid.reshape(len(values), -1).astype(VALUE_DTYPE), columns=self.feature_names)
+        features_df.insert(0, datetime_col, periods)
+        state = FeatureState(padded[len(padded) - self.lookback:], ewm, pd.Timestamp(periods[-1]), n_seen + len(values))
+        return features_df, state
+
+    @instrumented()
+    def transform(self, df: pd.DataFrame, datetime_col: str = "period") -> Tuple[pd.DataFrame, FeatureState]:
+        """
+        Features for every row of df (sorted by datetime_col), plus the state
+        to append later weeks with update().
+        """
+        if len(df) == 0:
+            raise ValueError("transform() needs at least one row to build features and a FeatureState from, got an empty frame")
+        df = df.sort_values(by=datetime_col)
+        values = df[self.columns].to_numpy(dtype=np.float64)
+        tail = np.full((self.lookback, len(self.columns)), np.nan)
+        ewm = np.full((len(self.columns), len(self.ewm_spans)), np.nan)
+        return self._build(values, df[datetime_col].to_numpy(), tail, ewm, 0, datetime_col)
+
+    @instrumented()
+    def update(self, state: FeatureState, new_df: pd.DataFrame, datetime_col: str = "period") -> Tuple[pd.DataFrame, FeatureState]:
+        """
+        Features for rows appended after the rows state was built from,
+        touching only state and the new rows. Rows must be strictly later
+        than state.last_period; revised history needs a fresh transform().
+        """
+        new_df = new_df.sort_values(by=datetime_col)
+        if len(new_df) == 0:
+            return pd.DataFrame(columns=[datetime_col] + self.feature_names), state
+        if new_df[datetime_col].iloc[0] <= state.last_period:
+            raise ValueError(f"update() only appends rows after {state.last_period.date()}, got {new_df[datetime_col].iloc[0]}")
+
+        values = new_df[self.columns].to_numpy(dtype=np.float64)
+        return self._build(values, new_df[datetime_col].to_numpy(), state.tail, state.ewm, state.n_rows, datetime_col)
+
+def candidate_features(df: pd.DataFrame, columns: Optional[List[str]] = None, datetime_col: str = "period",
+                       **grid: Sequence[int]) -> pd.DataFrame:
+    """
+    df with the full lag/rolling grid of columns (every column but
+    datetime_col by default) appended. grid overrides the
+    LagFeatureGenerator defaults, e.g. windows=(4, 8).
+    """
+    columns = columns or [col for col in df.columns if col != datetime_col]
+    features_df, _ = LagFeatureGenerator(columns, **grid).transform(df, datetime_col)
+    return pd.merge(df, features_df, on=datetime_col, how="left")
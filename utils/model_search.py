@@ -0,0 +1,204 @@
+import os
+import time
+import random
+import warnings
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sklearn.base import RegressorMixin
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import Lasso, LinearRegression, Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+from utils.backtest import EXPANDING, DEFAULT_MIN_TRAIN, default_feature_cols, error_metrics, target_col, walk_forward_folds
+from utils.custom_types import StorageRegion
+from utils.feature_store import FeatureStore, ENGINEERED_FEATURES
+from utils.instrumentation import instrumented
+from utils.lag_features import candidate_features
+from utils.schema import VALUE_DTYPE
+
+DEFAULT_REFIT_EVERY = 26 # Refits per candidate stay in the tens, gradient boosting dominates the search otherwise
+
+# Family -> parameter sets tried for it
+MODEL_FAMILIES: Dict[str, List[Dict[str, Any]]] = {
+    "ols": [{}],
+    "ridge": [{"alpha": alpha} for alpha in (0.1, 1.0, 10.0)],
+    "lasso": [{"alpha": alpha} for alpha in (0.1, 1.0, 10.0)],
+    "gbr": [{"n_estimators": 100, "max_depth": 3, "learning_rate": 0.1}],
+}
+
+def make_model(family: str, params: Dict[str, Any]) -> RegressorMixin:
+    if family == "ols":
+        return LinearRegression(**params)
+    if family == "ridge":
+        return make_pipeline(StandardScaler(), Ridge(**params))
+    if family == "lasso":
+        return make_pipeline(StandardScaler(), Lasso(max_iter=10000, **params))
+    if family == "gbr":
+        return GradientBoostingRegressor(random_state=0, **params)
+    raise ValueError(f"Unknown model family {family}, expected one of {list(MODEL_FAMILIES)}")
+
+def random_feature_subsets(feature_cols: List[str], n_subsets: int = 20, min_size: int = 2, max_size: Optional[int] = None,
+                           seed: int = 0, include_all: bool = True) -> List[List[str]]:
+    """
+    n_subsets distinct random subsets of feature_cols with min_size to
+    max_size columns, plus every column when include_all is set.
+    """
+    max_size = min(max_size or len(feature_cols), len(feature_cols))
+    if not 1 <= min_size <= max_size:
+        raise ValueError(f"Subset sizes must satisfy 1 <= min_size <= max_size, got {min_size} and {max_size}")
+    rng = random.Random(seed)
+    subsets = {tuple(feature_cols)} if include_all else set()
+    target_count = len(subsets) + n_subsets
+    for _ in range(n_subsets * 100): # Bounded, small column sets run out of distinct subsets
+        if len(subsets) >= target_count:
+            break
+        subsets.add(tuple(sorted(rng.sample(feature_cols, rng.randint(min_size, max_size)), key=feature_cols.index)))
+    return sorted((list(subset) for subset in subsets), key=len, reverse=True)
+
+# Set in each worker by _init_worker, so tasks only carry column indices
+_worker_shm: Optional[SharedMemory] = None
+_worker_matrix: Optional[np.ndarray] = None
+
+def _attach_matrix(shm_name: str, shape: Tuple[int, int]) -> None:
+    global _worker_shm, _worker_matrix
+    _worker_shm = SharedMemory(name=shm_name)
+    _worker_matrix = np.ndarray(shape, dtype=VALUE_DTYPE, buffer=_worker_shm.buf)
+
+def _release_matrix() -> None:
+    global _worker_shm, _worker_matrix
+    _worker_matrix = None
+    _worker_shm.close()
+    _worker_shm = None
+
+def _init_worker(shm_name: str, shape: Tuple[int, int]) -> None:
+    _attach_matrix(shm_name, shape)
+    threadpool_limits(1) # One core per worker, BLAS/OpenMP threads would oversubscribe the pool
+
+def _evaluate(family: str, params: Dict[str, Any], feature_idx: List[int], folds: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> Dict[str, Any]:
+    """
+    Walk-forward forecasts of column 0 of the shared matrix from its
+    feature_idx columns, refitting a fresh model for every fold.
+    """
+    start = time.perf_counter()
+    warnings.simplefilter("ignore", ConvergenceWarning) # A lasso stopped at max_iter is still scored on its forecasts
+    # Only the task's columns are copied out of shared memory, upcast so the fits match a float64 refit
+    x, y = _worker_matrix[:, feature_idx].astype(np.float64), _worker_matrix[:, 0].astype(np.float64)
+    train_starts, fold_starts, fold_ends = folds
+    forecast = np.empty(fold_ends[-1] - fold_starts[0])
+    for train_start, fold_start, fold_end in zip(train_starts, fold_starts, fold_ends):
+        model = make_model(family, params).fit(x[train_start:fold_start], y[train_start:fold_start])
+        forecast[fold_start - fold_starts[0]:fold_end - fold_starts[0]] = model.predict(x[fold_start:fold_end])
+    metrics = error_metrics(y[fold_starts[0]:fold_ends[-1]], forecast)
+    return {**metrics, "fits": len(fold_starts), "seconds": time.perf_counter() - start}
+
+@instrumented()
+def search_models(df: pd.DataFrame, target: str, feature_subsets: Optional[List[List[str]]] = None,
+                  families: Optional[Sequence[str]] = None, window: str = EXPANDING, window_size: Optional[int] = None,
+                  min_train: int = DEFAULT_MIN_TRAIN, refit_every: int = DEFAULT_REFIT_EVERY,
+                  max_workers: Optional[int] = None, datetime_col: str = "period") -> pd.DataFrame:
+    """
+    Walk-forward cross-validates every model family / parameter set of
+    MODEL_FAMILIES on every feature subset (all columns but target,
+    datetime_col and TARGET_DERIVED_COLS by default) and returns a
+    leaderboard ranked by RMSE.
+
+    Candidates are spread over a pool of max_workers processes (one per
+    core by default). The target and feature columns are copied once into
+    shared memory that every worker maps, so each task only sends its
+    column indices and the fold boundaries.
+    """
+    families = list(families or MODEL_FAMILIES)
+    for family in families:
+        if family not in MODEL_FAMILIES:
+            raise ValueError(f"Unknown model family {family}, expected one of {list(MODEL_FAMILIES)}")
+
+    df = df.sort_values(by=datetime_col).reset_index(drop=True)
+    feature_cols = [col for col in df.columns if col not in (target, datetime_col)]
+    feature_subsets = feature_subsets or [default_feature_cols(df, target, datetime_col)]
+    missing = {col for subset in feature_subsets for col in subset} - set(feature_cols)
+    if missing:
+        raise ValueError(f"Feature subsets reference columns not in the frame: {sorted(missing)}")
+    folds = walk_forward_folds(len(df), window, window_size, min_train, refit_every)
+
+    column_idx = {col: i + 1 for i, col in enumerate(feature_cols)} # Column 0 is the target
+    tasks = [
+        (family, params, subset)
+        for family in sorted(families, key=lambda family: family != "gbr") # Slowest first so no worker is left with a long tail
+        for params in MODEL_FAMILIES[family]
+        for subset in feature_subsets
+    ]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+
+    matrix = df[[target] + feature_cols].to_numpy(dtype=VALUE_DTYPE)
+    shm = SharedMemory(create=True, size=matrix.nbytes)
+    try:
+        np.ndarray(matrix.shape, dtype=VALUE_DTYPE, buffer=shm.buf)[:] = matrix
+        print(f"Evaluating {len(tasks)} candidates on {max_workers} worker(s)")
+        results = []
+        if max_workers == 1:
+            _attach_matrix(shm.name, matrix.shape)
+            try:
+                results = [((family, params, subset), _evaluate(family, params, [column_idx[col] for col in subset], folds))
+                           for family, params, subset in tasks]
+            finally:
+                _release_matrix()
+        else:
+            # Workers attach by name, so they needn't fork this (possibly multi-threaded) process
+            context = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(shm.name, matrix.shape)) as executor:
+                futures = {
+                    executor.submit(_evaluate, family, params, [column_idx[col] for col in subset], folds): (family, params, subset)
+                    for family, params, subset in tasks
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    results.append((futures[future], future.result()))
+                    if done % max(len(tasks) // 10, 1) == 0:
+                        print(f"Evaluated {done}/{len(tasks)} candidates")
+    finally:
+        shm.close()
+        shm.unlink()
+
+    leaderboard_df = pd.DataFrame([{
+        "model": family,
+        "params": ", ".join(f"{key}={value}" for key, value in params.items()),
+        "n_features": len(subset),
+        **metrics,
+        "features": ", ".join(subset),
+    } for (family, params, subset), metrics in results])
+    leaderboard_df = leaderboard_df.sort_values(by=["rmse", "n_features"]).reset_index(drop=True)
+    leaderboard_df.insert(0, "rank", np.arange(1, len(leaderboard_df) + 1))
+    return leaderboard_df
+
+def search_region(region: StorageRegion, feature_store: Optional[FeatureStore] = None, n_subsets: int = 20,
+                  min_size: int = 2, max_size: Optional[int] = None, lag_grid: bool = False, seed: int = 0,
+                  **kwargs) -> pd.DataFrame:
+    """
+    Searches random feature subsets of the region's engineered feature
+    table for forecasting {REGION}_NG_Storage_BCF, leaving out
+    TARGET_DERIVED_COLS. With lag_grid the candidate_features() lag/rolling
+    grid of every other feature column is added first (rows without a full
+    window, and columns with gaps after them, are dropped). kwargs go to
+    search_models().
+    """
+    feature_store = feature_store or FeatureStore()
+    df = feature_store.read(region, ENGINEERED_FEATURES)
+    if df is None:
+        raise ValueError(f"No {ENGINEERED_FEATURES} stored for {region.name}, build the region first")
+
+    target = target_col(region)
+    if lag_grid:
+        # The grid's windows include the current week, so the target only gets the lags already in the table
+        df = candidate_features(df, default_feature_cols(df, target)).replace([np.inf, -np.inf], np.nan)
+        # Keep columns whose only gaps are the leading warm-up weeks (e.g. not % changes of weeks with zero cooling days)
+        leading_gaps_only = df.notna().cummax().eq(df.notna()).all()
+        df = df.loc[:, leading_gaps_only].dropna().reset_index(drop=True)
+    feature_cols = default_feature_cols(df, target)
+    subsets = random_feature_subsets(feature_cols, n_subsets, min_size, max_size, seed)
+    return search_models(df, target, subsets, **kwargs)
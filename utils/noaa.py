@@ -1,15 +1,47 @@
-import requests
+import os
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Tuple, Optional, List, Set
+from scipy import sparse
+from typing import Dict, Hashable, Tuple, Optional, List
 from utils.custom_types import storage_region_to_noaa_states, StorageRegion
+from utils.cache import get_default_cache
+from utils.instrumentation import instrumented
+from utils.schema import PERIOD_DTYPE, VALUE_DTYPE
+from utils.scheduler import NOAA, get_scheduler
 NYC_COASTAL_REGION_ID = 3004
+DEFAULT_MAX_WORKERS = 8 # Concurrent file downloads, two files per year
+STATES_FILE = "StatesCONUS"
+DIVISIONS_FILE = "ClimateDivisions"
+STATES = "states"
+DIVISIONS = "divisions"
+DEGREE_DAY_SOURCE = os.getenv("NAT_GAS_DEGREE_DAYS", STATES) # Switching source needs a --full re-pull of the stored series
+DIVISION_WEIGHTS_PATH = os.getenv("NAT_GAS_DIVISION_WEIGHTS") # CSV of Region ID, weight (e.g. gas customers per division)
+HISTORICAL_GRACE = timedelta(days=31) # Late station reports still revise a year's final days into January
+NOAA_DEGREE_DAYS_URL = os.getenv(
+    "NOAA_DEGREE_DAYS_URL", "https://ftp.cpc.ncep.noaa.gov/htdocs/degree_days/weighted/daily_data"
+) # Override to use a local stand-in
 
-def get_noaa_region_data() -> Dict[int, Tuple[str, str]]:
-    REGION_DATA_URL = "https://ftp.cpc.ncep.noaa.gov/htdocs/degree_days/weighted/daily_data/regions/ClimateDivisions.txt"
-    res = requests.get(REGION_DATA_URL)
+def _get_noaa_text(url: str, dataset: str) -> str:
+    get = get_scheduler(NOAA).get
+    cache = get_default_cache()
+    if cache is None:
+        return get(url).text
+    return cache.get_text(url, dataset, get=get)
+
+def _degree_day_dataset(year: int, now: Optional[datetime] = None) -> str:
+    """
+    A year's files are cached as historical (never expiring) only once
+    HISTORICAL_GRACE has passed after it ended, and as current before then.
+    """
+    now = now or datetime.now()
+    return "noaa_historical" if now >= datetime(year + 1, 1, 1) + HISTORICAL_GRACE else "noaa_current_year"
 
-    lines = res.text.split("\n")
+@instrumented()
+def get_noaa_region_data() -> Dict[int, Tuple[str, str]]:
+    REGION_DATA_URL = f"{NOAA_DEGREE_DAYS_URL}/regions/ClimateDivisions.txt"
+    lines = _get_noaa_text(REGION_DATA_URL, "noaa_regions").split("\n")
 
     columns = lines[4].split("|")
     id_idx = columns.index("Region ID")
@@ -22,53 +54,204 @@ def get_noaa_region_data() -> Dict[int, Tuple[str, str]]:
 
     return id_to_region_and_st
 
-def extract_degree_day_data(year: int, lines: List[str], states: List[str]) -> pd.DataFrame:
-    states: Set[str] = set(states)
+def load_division_weights(path: str) -> Dict[int, float]:
+    """
+    Reads per-division weights from a CSV with Region ID and weight columns.
+    """
+    weights_df = pd.read_csv(path)
+    return dict(zip(weights_df["Region ID"].astype(int), weights_df["weight"].astype(float)))
+
+class DegreeDayWeights:
+    """
+    Sparse (file rows x regions) weight matrix turning the rows of a degree
+    day file (state codes or climate division ids) into one series per
+    region, with a single sparse-dense matrix multiply per file however
+    many regions there are.
+    """
+    def __init__(self, row_codes: List[Hashable], regions: List[Hashable], matrix: sparse.csr_matrix):
+        self.row_codes = pd.Index(row_codes)
+        self.regions = regions
+        self.matrix = matrix.tocsr()
+
+    @staticmethod
+    def _from_entries(entries: List[Tuple[Hashable, Hashable, float]], regions: List[Hashable]) -> "DegreeDayWeights":
+        row_codes = sorted({code for code, _, _ in entries})
+        row_idx = {code: i for i, code in enumerate(row_codes)}
+        region_idx = {region: i for i, region in enumerate(regions)}
+        matrix = sparse.csr_matrix(
+            ([weight for _, _, weight in entries], ([row_idx[code] for code, _, _ in entries], [region_idx[region] for _, region, _ in entries])),
+            shape=(len(row_codes), len(regions)),
+        )
+        return DegreeDayWeights(row_codes, regions, matrix)
+
+    @staticmethod
+    def from_states(region_states: Dict[Hashable, List[str]]) -> "DegreeDayWeights":
+        """
+        Sums the StatesCONUS rows of each region's states.
+        """
+        entries = [(state, region, 1.0) for region, states in region_states.items() for state in states]
+        return DegreeDayWeights._from_entries(entries, list(region_states))
+
+    @staticmethod
+    def from_divisions(region_states: Dict[Hashable, List[str]], divisions: Dict[int, Tuple[str, str]],
+                       division_weights: Optional[Dict[int, float]] = None) -> "DegreeDayWeights":
+        """
+        Weights the ClimateDivisions rows of each region's states by
+        division_weights (e.g. population or gas customers, equal by
+        default), normalized within each state so every state still counts
+        once and regions stay on the scale of the StatesCONUS sums.
+        divisions is the id -> (state, name) map of get_noaa_region_data().
+        Rows are matched on the integer id, so zero-padded codes match too.
+        """
+        division_weights = division_weights or {}
+        state_totals: Dict[str, float] = {}
+        for division_id, (state, _) in divisions.items():
+            state_totals[state] = state_totals.get(state, 0.0) + division_weights.get(division_id, 1.0)
+
+        entries = [
+            (int(division_id), region, division_weights.get(division_id, 1.0) / state_totals[state])
+            for region, states in region_states.items()
+            for division_id, (state, _) in divisions.items()
+            if state in states and state_totals[state] > 0
+        ]
+        return DegreeDayWeights._from_entries(entries, list(region_states))
+
+    def aggregate(self, row_codes: np.ndarray, day_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (regions x days) weighted sums of a file's rows, and whether each
+        region had any weighted row in the file.
+        """
+        if pd.api.types.is_integer_dtype(self.row_codes): # Division ids, e.g. "0401" is division 401
+            row_codes = pd.to_numeric(row_codes, errors="coerce")
+        idx = self.row_codes.get_indexer(row_codes) # -1 for rows without weights
+        present = idx >= 0
+        weights = self.matrix[idx[present]]
+        region_days = np.asarray(weights.T @ day_matrix[present])
+        return region_days, weights.getnnz(axis=0) > 0
+
+def _parse_degree_day_matrix(lines: List[str]) -> Tuple[str, np.ndarray, np.ndarray]:
+    """
+    Parses a StatesCONUS or ClimateDivisions file in bulk into its day
+    type, the state code or division id of each row and a (rows x days)
+    matrix of degree days.
+    """
     day_type = "Cooling_Days" if "Cooling" in lines[0] else "Heating_Days"
     n_days = len(lines[3].split("|")) - 1 
+    state_lines = lines[4:-1] # Skip last empty line
+
+    state_codes = np.array([row.split("|", 1)[0] for row in state_lines])
+    day_matrix = np.loadtxt(state_lines, delimiter="|", usecols=range(1, n_days + 1), dtype=np.int64, ndmin=2)
+    return day_type, state_codes, day_matrix.reshape(len(state_lines), n_days)
 
-    day_sum: Dict[datetime, int] = {}
-    for row in [row.split("|") for row in lines[4:-1]]: # Skip last empty line
+@instrumented()
+def extract_weighted_degree_day_data(year: int, lines: List[str], weights: DegreeDayWeights) -> Dict[Hashable, pd.DataFrame]:
+    """
+    Daily degree days of every region of weights, parsing the file once and
+    aggregating all regions in one matrix multiply. Regions without any
+    row in the file get an empty frame.
+    """
+    day_type, row_codes, day_matrix = _parse_degree_day_matrix(lines)
+    periods = pd.date_range(datetime(year, 1, 1), periods=day_matrix.shape[1], freq="D")
+    region_days, matched = weights.aggregate(row_codes, day_matrix)
 
-        if row[0] not in states:
+    region_dfs: Dict[Hashable, pd.DataFrame] = {}
+    for i, region in enumerate(weights.regions):
+        if not matched[i]:
+            region_dfs[region] = pd.DataFrame({"period": pd.Series(dtype=PERIOD_DTYPE), day_type: pd.Series(dtype=VALUE_DTYPE)})
             continue
+        region_dfs[region] = pd.DataFrame({"period": periods, day_type: region_days[i].astype(VALUE_DTYPE)})
+    return region_dfs
+
+@instrumented()
+def extract_degree_day_data_by_region(year: int, lines: List[str], region_states: Dict[Hashable, List[str]]) -> Dict[Hashable, pd.DataFrame]:
+    """
+    Sums the daily degree days of each region's states from a StatesCONUS
+    file, parsing it only once for all regions.
+    """
+    return extract_weighted_degree_day_data(year, lines, DegreeDayWeights.from_states(region_states))
+
+@instrumented()
+def extract_degree_day_data(year: int, lines: List[str], states: List[str]) -> pd.DataFrame:
+    return extract_degree_day_data_by_region(year, lines, {None: states})[None]
+
+@instrumented()
+def get_noaa_day_data(start_year: int, end_year: int, states: List[str], max_workers: int = DEFAULT_MAX_WORKERS) -> Optional[pd.DataFrame]:
+    """
+    Pulls heating and cooling degree days for every year in the range. All
+    files are downloaded concurrently, results are returned in year order.
+    """
+    return get_noaa_day_data_by_region(start_year, end_year, {None: states}, max_workers)[None]
 
-        date = datetime(year, 1, 1)
-        for day_n in range(n_days):
-            cooling_days = int(row[day_n + 1])
+@instrumented()
+def get_noaa_day_data_by_region(start_year: int, end_year: int, region_states: Dict[Hashable, List[str]],
+                                max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[Hashable, pd.DataFrame]:
+    """
+    Same as get_noaa_day_data(), but each downloaded file is parsed once and
+    split into every region of region_states.
+    """
+    return _get_weighted_day_data(start_year, end_year, STATES_FILE, DegreeDayWeights.from_states(region_states), max_workers)
 
-            day_sum[date] = day_sum.get(date, 0) + cooling_days
+@instrumented()
+def get_noaa_division_day_data_by_region(start_year: int, end_year: int, region_states: Dict[Hashable, List[str]],
+                                         division_weights: Optional[Dict[int, float]] = None,
+                                         max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[Hashable, pd.DataFrame]:
+    """
+    Same as get_noaa_day_data_by_region(), but built from the climate
+    division files weighted by DegreeDayWeights.from_divisions().
+    """
+    weights = DegreeDayWeights.from_divisions(region_states, get_noaa_region_data(), division_weights)
+    return _get_weighted_day_data(start_year, end_year, DIVISIONS_FILE, weights, max_workers)
 
-            date += timedelta(days=1)
+@instrumented()
+def get_degree_days_by_region(start_year: int, end_year: int, region_states: Dict[Hashable, List[str]]) -> Dict[Hashable, pd.DataFrame]:
+    """
+    Degree days of every region from the source picked by the
+    NAT_GAS_DEGREE_DAYS environment variable: states (StatesCONUS files,
+    the default) or divisions (ClimateDivisions files weighted by the
+    NAT_GAS_DIVISION_WEIGHTS CSV, equal weights when unset).
+    """
+    if DEGREE_DAY_SOURCE == STATES:
+        return get_noaa_day_data_by_region(start_year, end_year, region_states)
+    if DEGREE_DAY_SOURCE == DIVISIONS:
+        division_weights = load_division_weights(DIVISION_WEIGHTS_PATH) if DIVISION_WEIGHTS_PATH else None
+        return get_noaa_division_day_data_by_region(start_year, end_year, region_states, division_weights)
+    raise ValueError(f"NAT_GAS_DEGREE_DAYS must be {STATES} or {DIVISIONS}, got {DEGREE_DAY_SOURCE}")
 
-    columns = ["period", day_type]
+def _get_weighted_day_data(start_year: int, end_year: int, file_name: str, weights: DegreeDayWeights,
+                           max_workers: int) -> Dict[Hashable, pd.DataFrame]:
+    def get_year_data(year: int, day_kind: str) -> Dict[Hashable, pd.DataFrame]:
+        url = f"{NOAA_DEGREE_DAYS_URL}/{year}/{file_name}.{day_kind}.txt"
+        lines = _get_noaa_text(url, _degree_day_dataset(year)).split("\n")
+        return extract_weighted_degree_day_data(year, lines, weights)
 
-    df = pd.DataFrame([(date, day_sum[date]) for date in day_sum], columns=columns)
-    return df
+    years = list(range(start_year, end_year + 1))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        heating_futures = [executor.submit(get_year_data, year, "Heating") for year in years]
+        cooling_futures = [executor.submit(get_year_data, year, "Cooling") for year in years]
 
-def get_noaa_day_data(start_year: int, end_year: int, states: List[str]) -> Optional[pd.DataFrame]:
-    dfs: List[pd.DataFrame] = []
-    for year in range(start_year, end_year + 1):
-        print(f"Getting data for {year}")
-        heating_days = get_noaa_heating_days(year, states)
-        cooling_days = get_noaa_cooling_days(year, states)
-        comb_df = pd.merge(heating_days, cooling_days, on="period")
-        dfs.append(comb_df)
+        region_dfs: Dict[Hashable, List[pd.DataFrame]] = {region: [] for region in weights.regions}
+        for year, heating_future, cooling_future in zip(years, heating_futures, cooling_futures):
+            print(f"Getting data for {year}")
+            heating_days, cooling_days = heating_future.result(), cooling_future.result()
+            for region in weights.regions:
+                region_dfs[region].append(pd.merge(heating_days[region], cooling_days[region], on="period"))
 
-    return pd.concat(dfs)
+    return {region: pd.concat(dfs) for region, dfs in region_dfs.items()}
 
+@instrumented()
 def get_noaa_cooling_days(year: int, states: List[str]) -> Optional[pd.DataFrame]:
-    res = requests.get(f"https://ftp.cpc.ncep.noaa.gov/htdocs/degree_days/weighted/daily_data/{year}/StatesCONUS.Cooling.txt")
-    lines = res.text.split("\n")
+    url = f"{NOAA_DEGREE_DAYS_URL}/{year}/StatesCONUS.Cooling.txt"
+    lines = _get_noaa_text(url, _degree_day_dataset(year)).split("\n")
 
     data = extract_degree_day_data(year, lines, states)
     if data is None:
         print(f"No data found for NYC Coastal Region for {year}")
     return data
 
+@instrumented()
 def get_noaa_heating_days(year: int, states: List[str]) -> Optional[pd.DataFrame]:
-    res = requests.get(f"https://ftp.cpc.ncep.noaa.gov/htdocs/degree_days/weighted/daily_data/{year}/StatesCONUS.Heating.txt")
-    lines = res.text.split("\n")
+    url = f"{NOAA_DEGREE_DAYS_URL}/{year}/StatesCONUS.Heating.txt"
+    lines = _get_noaa_text(url, _degree_day_dataset(year)).split("\n")
 
     data = extract_degree_day_data(year, lines, states)
     if data is None:
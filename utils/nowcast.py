@@ -0,0 +1,327 @@
+import json
+import math
+import time
+import threading
+import traceback
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from sklearn.linear_model import LinearRegression
+from utils.backtest import target_col
+from utils.cache import expires_next_weekly_release
+from utils.custom_types import StorageRegion, storage_region_to_noaa_states
+from utils.feature_store import FeatureStore, ENGINEERED_FEATURES
+
+DEFAULT_PORT = 8750
+DEFAULT_RELOAD_INTERVAL = 5.0 # Seconds between checks for newly published feature tables
+REPORT_WEEK = pd.Timedelta(weeks=1)
+REPORT_LAG = pd.Timedelta(days=6) # The Thursday report covers the week ending the Friday before
+next_storage_release = expires_next_weekly_release() # Thursday 10:30 ET, the storage report's TTL policy
+
+def next_report_week(now: Optional[datetime] = None) -> pd.Timestamp:
+    """
+    Week (ending Friday) covered by the next EIA storage report released
+    after now.
+    """
+    return pd.Timestamp(next_storage_release(now or datetime.now()).date()) - REPORT_LAG
+
+def _report_fields(as_of: pd.Timestamp, report_week: pd.Timestamp) -> Dict[str, Any]:
+    # The model predicts the week after as_of, which falls short of the report week when the features are stale
+    nowcast_week = as_of + REPORT_WEEK
+    return {
+        "as_of": as_of.date().isoformat(),
+        "report_week": report_week.date().isoformat(),
+        "nowcast_week": nowcast_week.date().isoformat(),
+        "stale": bool(nowcast_week < report_week),
+    }
+
+class RegionNowcaster:
+    """
+    One-step-ahead storage model of a region, fit on its engineered feature
+    table: next week's storage level regressed on this week's row (every
+    column but period, including this week's storage). Only the latest row
+    is needed to nowcast the upcoming report week, so it is kept in memory
+    with the coefficients and a nowcast is a single dot product.
+    """
+    def __init__(self, region: StorageRegion, feature_cols: List[str], coef: np.ndarray, intercept: float,
+                 latest: np.ndarray, as_of: pd.Timestamp, n_train: int, source_mtime: Optional[int]):
+        self.region = region
+        self.feature_cols = feature_cols
+        self.feature_idx = {col: i for i, col in enumerate(feature_cols)}
+        self.coef = coef
+        self.intercept = intercept
+        self.latest = latest # Feature row of the as_of week
+        self.as_of = as_of
+        self.n_train = n_train
+        self.source_mtime = source_mtime
+        self.loaded_at = pd.Timestamp.now(tz="UTC")
+
+    @property
+    def latest_storage(self) -> float:
+        return float(self.latest[self.feature_idx[target_col(self.region)]])
+
+    @staticmethod
+    def fit(region: StorageRegion, df: pd.DataFrame, source_mtime: Optional[int] = None) -> "RegionNowcaster":
+        target = target_col(region)
+        df = df.sort_values(by="period").reset_index(drop=True)
+        feature_cols = [col for col in df.columns if col != "period"]
+
+        x = df[feature_cols].to_numpy(dtype=np.float64)
+        y_next = df[target].to_numpy(dtype=np.float64)[1:]
+        consecutive = (df["period"].diff().iloc[1:] == REPORT_WEEK).to_numpy() # Skip pairs across missing weeks
+        if consecutive.sum() <= len(feature_cols):
+            raise ValueError(f"Need more than {len(feature_cols)} consecutive weeks to fit {region.name}, got {consecutive.sum()}")
+
+        model = LinearRegression().fit(x[:-1][consecutive], y_next[consecutive])
+        return RegionNowcaster(region, feature_cols, model.coef_, float(model.intercept_), x[-1],
+                               pd.Timestamp(df["period"].iloc[-1]), int(consecutive.sum()), source_mtime)
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Next week's storage for each (rows x features) feature row.
+        """
+        return rows @ self.coef + self.intercept
+
+    def feature_rows(self, overrides: List[Dict[str, float]]) -> np.ndarray:
+        """
+        The latest row once per overrides dict, with its features replaced,
+        e.g. [{}, {"Heating_Days": 150}] for a base case and a cold case.
+        """
+        rows = np.tile(self.latest, (len(overrides), 1))
+        for i, features in enumerate(overrides):
+            for col, value in features.items():
+                if col not in self.feature_idx:
+                    raise ValueError(f"Unknown feature {col} for {self.region.name}, expected one of {self.feature_cols}")
+                rows[i, self.feature_idx[col]] = float(value)
+        return rows
+
+    def info(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        return {
+            "region": self.region.name,
+            **_report_fields(self.as_of, next_report_week(now)),
+            "n_train": self.n_train,
+            "features": self.feature_cols,
+            "loaded_at": self.loaded_at.isoformat(),
+        }
+
+class NowcastModels:
+    """
+    RegionNowcasters of every region with a published engineered feature
+    table, refit whenever the pipeline rewrites a region's table.
+    """
+    def __init__(self, feature_store: Optional[FeatureStore] = None, storage_regions: Optional[List[StorageRegion]] = None):
+        self.feature_store = feature_store or FeatureStore()
+        self.storage_regions = storage_regions or list(storage_region_to_noaa_states)
+        self.models: Dict[StorageRegion, RegionNowcaster] = {}
+        self._reload_lock = threading.Lock()
+
+    def reload(self, force: bool = False) -> List[StorageRegion]:
+        """
+        Refits the regions whose feature table changed since it was loaded
+        (all of them with force) and returns them. A table that fails to
+        fit keeps serving its previous model.
+        """
+        with self._reload_lock:
+            models = dict(self.models)
+            reloaded = []
+            for region in self.storage_regions:
+                mtime = self.feature_store.modified_time(region, ENGINEERED_FEATURES)
+                if mtime is None or (not force and region in models and models[region].source_mtime == mtime):
+                    continue
+                try:
+                    df = self.feature_store.read(region, ENGINEERED_FEATURES)
+                    models[region] = RegionNowcaster.fit(region, df, mtime)
+                    reloaded.append(region)
+                except Exception as e:
+                    print(f"Failed to load the {region.name} nowcast model, keeping the previous one: {e}")
+            self.models = models # Swapped whole, so requests never see a half-reloaded set
+        return reloaded
+
+    @staticmethod
+    def validate(requests: Any) -> None:
+        """
+        Raises a ValueError describing the first malformed request.
+        """
+        if not isinstance(requests, list):
+            raise ValueError(f'Expected requests to be a list of {{"region": ..., "features": {{...}}}} objects, got {type(requests).__name__}')
+        for i, request in enumerate(requests):
+            if not isinstance(request, dict):
+                raise ValueError(f"Request {i} must be an object with a region, got {type(request).__name__}")
+            unknown = sorted(set(request) - {"region", "features"})
+            if unknown:
+                raise ValueError(f'Request {i} has unknown fields {unknown}, expected "region" and optionally "features"')
+            name = request.get("region")
+            if not isinstance(name, str) or name not in StorageRegion.__members__:
+                raise ValueError(f"Request {i} has unknown region {name!r}, expected one of {list(StorageRegion.__members__)}")
+            features = request.get("features")
+            if features is None:
+                continue
+            if not isinstance(features, dict):
+                raise ValueError(f"Request {i} features must be an object of feature names to numbers, got {type(features).__name__}")
+            for col, value in features.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                    raise ValueError(f"Request {i} feature {col} must be a finite number, got {value!r}")
+
+    def nowcast(self, requests: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Nowcasts of the week covered by the next EIA report after now, one
+        per request of the form {"region": "EAST", "features": {...optional
+        overrides...}}. Requests for the same region are predicted in one
+        batch. Models whose latest week is more than a week before the
+        report week can only nowcast an earlier week, so their nowcasts are
+        flagged stale, with the week they do cover as nowcast_week.
+        """
+        self.validate(requests)
+        models = self.models
+        report_week = next_report_week(now)
+        by_region: Dict[StorageRegion, List[int]] = {}
+        for i, request in enumerate(requests):
+            name = request["region"]
+            if StorageRegion[name] not in models:
+                raise ValueError(f"No nowcast model loaded for {name}, publish its engineered features first")
+            by_region.setdefault(StorageRegion[name], []).append(i)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        for region, idx in by_region.items():
+            model = models[region]
+            overrides = [requests[i].get("features") or {} for i in idx]
+            rows = model.feature_rows(overrides)
+            storage = model.predict(rows)
+            current = rows[:, model.feature_idx[target_col(region)]]
+            for i, features, level, last in zip(idx, overrides, storage, current):
+                results[i] = {
+                    "region": region.name,
+                    **_report_fields(model.as_of, report_week),
+                    "storage_bcf": float(level),
+                    "net_change_bcf": float(level - last), # Injection when positive, withdrawal when negative
+                    "overrides": features,
+                }
+        return results
+
+class NowcastServer:
+    """
+    Local HTTP service for NowcastModels.
+
+        GET  /nowcast?region=EAST&region=SOUTH  Upcoming week of the regions (default: all loaded)
+        POST /nowcast {"requests": [{"region": "EAST", "features": {...}}, ...]}  Batch with overrides
+        GET  /models                            Loaded models and the weeks they nowcast
+        POST /reload                            Refit every region now
+
+    Malformed requests get a 400 with a message naming the offending field.
+    Feature tables are checked for changes every reload_interval seconds.
+    """
+    def __init__(self, models: NowcastModels, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 reload_interval: float = DEFAULT_RELOAD_INTERVAL):
+        self.models = models
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise ValueError("NowcastServer is not running, call start() first")
+        return f"http://{self.host}:{self._server.server_port}"
+
+    def start(self) -> "NowcastServer":
+        service = self
+        self.models.reload()
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                self._respond(*service.handle("GET", self.path, None))
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._respond(*service.handle("POST", self.path, body))
+
+            def _respond(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._stop.clear()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._watch, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "NowcastServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.reload_interval):
+            for region in self.models.reload():
+                print(f"Reloaded the {region.name} nowcast model (as of {self.models.models[region].as_of.date()})")
+
+    def handle(self, method: str, path: str, body: Optional[bytes]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Returns the status and JSON payload for a request.
+        """
+        url = urlsplit(path)
+        try:
+            if url.path == "/nowcast" and method == "GET":
+                regions = parse_qs(url.query).get("region") or [region.name for region in self.models.models]
+                return self._nowcast([{"region": region} for region in regions])
+            if url.path == "/nowcast" and method == "POST":
+                return self._nowcast(self._parse_body(body).get("requests"))
+            if url.path == "/models" and method == "GET":
+                now = datetime.now()
+                return 200, {"models": [model.info(now) for model in self.models.models.values()]}
+            if url.path == "/reload" and method == "POST":
+                return 200, {"reloaded": [region.name for region in self.models.reload(force=True)]}
+        except ValueError as e: # Raised with a message meant for the client
+            return 400, {"error": str(e)}
+        except Exception:
+            traceback.print_exc()
+            return 500, {"error": f"Internal error handling {method} {url.path}"}
+        return 404, {"error": f"No route {method} {url.path}"}
+
+    @staticmethod
+    def _parse_body(body: Optional[bytes]) -> Dict[str, Any]:
+        try:
+            payload = json.loads(body or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ValueError("Request body is not valid JSON") from None
+        if not isinstance(payload, dict) or "requests" not in payload:
+            raise ValueError('Expected a JSON body of the form {"requests": [{"region": ...}, ...]}')
+        return payload
+
+    def _nowcast(self, requests: List[Dict[str, Any]]) -> Tuple[int, Dict[str, Any]]:
+        start = time.perf_counter()
+        nowcasts = self.models.nowcast(requests)
+        return 200, {"nowcasts": nowcasts, "model_ms": (time.perf_counter() - start) * 1000}
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, reload_interval: float = DEFAULT_RELOAD_INTERVAL,
+          feature_store: Optional[FeatureStore] = None) -> None:
+    """
+    Runs the nowcast service until interrupted.
+    """
+    with NowcastServer(NowcastModels(feature_store), host, port, reload_interval) as server:
+        print(f"Serving nowcasts of {[region.name for region in server.models.models]} at {server.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
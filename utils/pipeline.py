@@ -0,0 +1,249 @@
+import time
+import hashlib
+import inspect
+import pandas as pd
+from pathlib import Path
+from datetime import timedelta
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.cache import CACHE_DIR, get_default_cache
+from utils.custom_types import StorageRegion
+from utils.data_transforms import DataTransforms
+from utils.eia_api import EIADataPuller
+from utils.instrumentation import get_profiler
+from utils.schema import calendar_columns, column_dtype, enforce_schema, week_of_year
+from utils.feature_store import DATA_DIR, RAW_FEATURES, ENGINEERED_FEATURES
+from utils.series_store import SeriesStore
+from utils.refresh import (
+    DEFAULT_LOOKBACK,
+    series_fetchers,
+    refresh_series,
+    resample_usage,
+    interpolate_power_gen,
+    power_gen_deviation,
+    resample_degree_days,
+    resample_withdrawls,
+    merge_features,
+    build_engineered_features,
+)
+
+PIPELINE_CACHE_DIR = CACHE_DIR / "pipeline"
+
+# Helpers shared by the transforms, listed in the code of the stages that call them
+SCHEMA_CODE = [enforce_schema, column_dtype]
+WEEKLY_INDEX_CODE = [DataTransforms._weekly_frame, calendar_columns, week_of_year]
+
+def code_source(code: Callable) -> str:
+    """
+    Source of a function or class, looking through partials and decorators.
+    """
+    while isinstance(code, partial):
+        code = code.func
+    return inspect.getsource(code)
+
+class Stage:
+    """
+    A pipeline step producing one DataFrame from the outputs of its deps.
+
+    Args:
+        name: Unique stage name
+        func: Called with the outputs of deps, in order
+        deps: Names of the upstream stages
+        code: Functions and classes whose source is part of the fingerprint,
+            including the helpers func calls (defaults to func). Only
+            editing one of them re-runs this stage
+        params: Extra values that are part of the fingerprint
+        volatile: Always run (e.g. fetches). Downstream stages are keyed on
+            a hash of the output, so they only re-run when the data changed
+    """
+    def __init__(self, name: str, func: Callable[..., pd.DataFrame], deps: Optional[List[str]] = None,
+                 code: Optional[List[Callable]] = None, params: Optional[Dict[str, Any]] = None, volatile: bool = False):
+        self.name = name
+        self.func = func
+        self.deps = deps or []
+        self.code = code or [func]
+        self.params = params or {}
+        self.volatile = volatile
+
+    def fingerprint(self, dep_keys: List[str]) -> str:
+        hasher = hashlib.sha256(self.name.encode())
+        for code in self.code:
+            hasher.update(code_source(code).encode())
+        hasher.update(repr(sorted(self.params.items())).encode())
+        for dep_key in dep_keys:
+            hasher.update(dep_key.encode())
+        return hasher.hexdigest()
+
+def hash_frame(df: pd.DataFrame) -> str:
+    hasher = hashlib.sha256(repr(list(df.columns)).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return hasher.hexdigest()
+
+class Pipeline:
+    """
+    Runs a DAG of stages, memoizing each stage's output on disk under its
+    fingerprint. A stage only re-runs when its code, params or upstream
+    outputs changed, and memoized outputs are only loaded when needed.
+    """
+    def __init__(self, stages: List[Stage], cache_dir: Path = PIPELINE_CACHE_DIR):
+        self.stages: Dict[str, Stage] = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique")
+        self.cache_dir = Path(cache_dir)
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        visiting, visited = set(), set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through stage {name}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.remove(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _ancestors(self, targets: List[str]) -> set:
+        needed, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].deps)
+        return needed
+
+    def _memo_path(self, name: str, key: str) -> Path:
+        return self.cache_dir / f"{name}-{key[:16]}.pkl"
+
+    def _save_memo(self, name: str, key: str, df: pd.DataFrame) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale_path in self.cache_dir.glob(f"{name}-*.pkl"): # Keep only the latest output per stage
+            stale_path.unlink(missing_ok=True)
+        df.to_pickle(self._memo_path(name, key))
+
+    @staticmethod
+    def _run_stage(stage: Stage, inputs: List[pd.DataFrame]) -> pd.DataFrame:
+        with get_profiler().span(f"pipeline.{stage.name}", "pipeline") as span:
+            df = stage.func(*inputs)
+            if span is not None:
+                span.rows_in, span.rows_out = sum(len(input_df) for input_df in inputs), len(df)
+        return df
+
+    def run(self, targets: Optional[List[str]] = None, force: bool = False) -> Dict[str, pd.DataFrame]:
+        """
+        Runs the stages needed for targets (all stages by default) and returns
+        the target outputs. Set force to ignore memoized outputs.
+        """
+        targets = targets or list(self.order)
+        needed = self._ancestors(targets)
+
+        profiler = get_profiler()
+        keys: Dict[str, str] = {}
+        outputs: Dict[str, pd.DataFrame] = {}
+        report: List[Tuple[str, str, float]] = []
+
+        def output(name: str) -> pd.DataFrame:
+            if name not in outputs:
+                outputs[name] = pd.read_pickle(self._memo_path(name, keys[name]))
+            return outputs[name]
+
+        for name in [name for name in self.order if name in needed]:
+            stage = self.stages[name]
+            start_time = time.perf_counter()
+
+            if stage.volatile:
+                outputs[name] = self._run_stage(stage, [output(dep) for dep in stage.deps])
+                keys[name] = hash_frame(outputs[name])
+                status = "ran"
+            else:
+                keys[name] = stage.fingerprint([keys[dep] for dep in stage.deps])
+                if not force and self._memo_path(name, keys[name]).exists():
+                    status = "cached"
+                else:
+                    outputs[name] = self._run_stage(stage, [output(dep) for dep in stage.deps])
+                    self._save_memo(name, keys[name], outputs[name])
+                    status = "ran"
+            report.append((name, status, time.perf_counter() - start_time))
+
+        print(f"{'Stage':<24}{'Status':<8}{'Seconds':>8}")
+        for name, status, seconds in report:
+            print(f"{name:<24}{status:<8}{seconds:>8.2f}")
+        if profiler.enabled:
+            print(profiler.report())
+
+        return {name: output(name) for name in targets}
+
+def build_region_pipeline(region: StorageRegion, store: Optional[SeriesStore] = None,
+                          lookback: timedelta = DEFAULT_LOOKBACK, full: bool = False) -> Pipeline:
+    """
+    Stages of the raw_features.ipynb / engineered_features.ipynb workflow
+    for one region: fetch, resample, interpolate, deviation, merge and lag
+    features. Fetch stages incrementally refresh the series store.
+    """
+    store = store or SeriesStore()
+    fetchers = series_fetchers(region, EIADataPuller(region))
+
+    def fetch_stage(stage_name: str, series_name: str) -> Stage:
+        return Stage(
+            stage_name,
+            partial(refresh_series, region, series_name, fetchers[series_name], store, lookback, full),
+            code=[refresh_series],
+            volatile=True,
+        )
+
+    stages = [
+        fetch_stage("fetch_storage", "storage"),
+        fetch_stage("fetch_usage", "ng_usage"),
+        fetch_stage("fetch_withdrawls", "ng_withdrawls"),
+        fetch_stage("fetch_degree_days", "degree_days"),
+        Stage("resample_usage", resample_usage, ["fetch_usage"],
+              code=[resample_usage, DataTransforms.upscale_monthly_to_weekly_columns, DataTransforms._validate_required_columns,
+                    *WEEKLY_INDEX_CODE, *SCHEMA_CODE]),
+        Stage("resample_withdrawls", resample_withdrawls, ["fetch_withdrawls"],
+              code=[resample_withdrawls, DataTransforms.upscale_monthly_to_weekly, DataTransforms.upscale_monthly_to_weekly_columns,
+                    DataTransforms._validate_required_columns, *WEEKLY_INDEX_CODE, *SCHEMA_CODE]),
+        Stage("resample_degree_days", resample_degree_days, ["fetch_degree_days"],
+              code=[resample_degree_days, DataTransforms.downscale_daily_to_weekly, DataTransforms._validate_required_columns, *SCHEMA_CODE]),
+        Stage("interpolate_power_gen", interpolate_power_gen, ["resample_usage"],
+              code=[interpolate_power_gen, DataTransforms.weekly_interpolate_from_middle_week, DataTransforms._validate_required_columns]),
+        Stage("deviation_power_gen", power_gen_deviation, ["interpolate_power_gen"],
+              code=[power_gen_deviation, DataTransforms.calculate_deviation_from_yearly_avg, DataTransforms._validate_required_columns,
+                    *SCHEMA_CODE]),
+        Stage("merge", partial(merge_features, region),
+              ["resample_usage", "deviation_power_gen", "resample_degree_days", "resample_withdrawls", "fetch_storage"],
+              code=[merge_features, *SCHEMA_CODE], params={"region": region.name}),
+        Stage("lag_features", partial(build_engineered_features, region), ["merge"],
+              code=[build_engineered_features, *SCHEMA_CODE], params={"region": region.name}),
+    ]
+    return Pipeline(stages, cache_dir=PIPELINE_CACHE_DIR / region.name)
+
+def build_region(region: StorageRegion, store: Optional[SeriesStore] = None, output_dir: Path = DATA_DIR,
+                 lookback: timedelta = DEFAULT_LOOKBACK, full: bool = False, force: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Runs the region pipeline and publishes the raw and engineered tables to
+    the feature store, with {REGION}_data_raw.csv and
+    {REGION}_data_engineered.csv exports in output_dir. Prints the response
+    cache's hit rate and size at the end.
+    """
+    store = store or SeriesStore()
+    outputs = build_region_pipeline(region, store, lookback, full).run(["merge", "lag_features"], force=force)
+    raw_features_df, engineered_features_df = outputs["merge"], outputs["lag_features"]
+
+    store.feature_store.publish(region, RAW_FEATURES, raw_features_df, output_dir)
+    store.feature_store.publish(region, ENGINEERED_FEATURES, engineered_features_df, output_dir)
+
+    cache = get_default_cache()
+    if cache is not None:
+        print(f"Response cache: {cache.report()}")
+    return raw_features_df, engineered_features_df
@@ -0,0 +1,165 @@
+import pandas as pd
+from pathlib import Path
+from functools import reduce
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from utils.custom_types import StorageRegion, EIAConsumptionType, storage_region_to_noaa_states
+from utils.data_transforms import DataTransforms
+from utils.eia_api import EIADataPuller
+from utils.noaa import get_degree_days_by_region
+from utils.feature_store import DATA_DIR, RAW_FEATURES
+from utils.schema import enforce_schema
+from utils.series_store import SeriesStore
+
+NOAA_START_YEAR = 2010
+DEFAULT_LOOKBACK = timedelta(weeks=8) # EIA revises the most recent weekly and monthly prints
+
+usage_type_to_feature_name = {
+    EIAConsumptionType.ELECTRICITY: "NG_Power_Gen",
+    EIAConsumptionType.COMMERCIAL: "NG_Commercial_Usage",
+    EIAConsumptionType.VEHICLEFUEL: "NG_Vehicle_Fuel_Usage",
+    EIAConsumptionType.DELIVERY: "NG_Delivery_Usage",
+    EIAConsumptionType.INDUSTRIAL: "NG_Industrial_Usage",
+    EIAConsumptionType.RESIDENTIAL: "NG_Residential_Usage",
+}
+
+def series_fetchers(region: StorageRegion, puller: EIADataPuller) -> Dict[str, Callable[[Optional[datetime]], pd.DataFrame]]:
+    """
+    Maps each stored series name to a function pulling it from a start date
+    onwards (None pulls the full history).
+    """
+    def to_date_str(start: Optional[datetime]) -> Optional[str]:
+        return start.strftime("%Y-%m-%d") if start else None
+
+    fetchers = {
+        "storage": lambda start: puller.get_storage_data(start=to_date_str(start)),
+        "ng_withdrawls": lambda start: puller.get_ng_withdrawls_data(start=to_date_str(start)),
+        "ng_usage": lambda start: puller.get_all_ng_usage_data(start=to_date_str(start)),
+        "degree_days": lambda start: get_degree_days_by_region(
+            start.year if start else NOAA_START_YEAR,
+            datetime.now().year,
+            {region: storage_region_to_noaa_states[region]}
+        )[region],
+    }
+    return fetchers
+
+def resample_usage(ng_usage_df: pd.DataFrame) -> pd.DataFrame:
+    usage_cols = [consumption_type.name for consumption_type in usage_type_to_feature_name]
+    return DataTransforms.upscale_monthly_to_weekly_columns(ng_usage_df, "period", usage_cols)
+
+def interpolate_power_gen(weekly_usage_df: pd.DataFrame) -> pd.DataFrame:
+    electricity_col = EIAConsumptionType.ELECTRICITY.name
+    electricity_df = weekly_usage_df[["period", "Year", "Month", "Week", electricity_col]].rename(columns={electricity_col: "value"})
+    return DataTransforms.weekly_interpolate_from_middle_week(electricity_df, "period", "value")
+
+def power_gen_deviation(interpolated_df: pd.DataFrame) -> pd.DataFrame:
+    seasonal_deviation_df = DataTransforms.calculate_deviation_from_yearly_avg(interpolated_df.copy(), "period", "value")
+    return seasonal_deviation_df[["period", "deviation"]].rename(columns={"deviation": "NG_Seasonal_Power_Gen"})
+
+def resample_degree_days(degree_data_df: pd.DataFrame) -> pd.DataFrame:
+    weekly_dfs = [
+        DataTransforms.downscale_daily_to_weekly(degree_data_df[["period", day_type]], "period", day_type)[["period", day_type]]
+        for day_type in ["Heating_Days", "Cooling_Days"]
+    ]
+    return reduce(lambda x, y: pd.merge(x, y, on="period"), weekly_dfs)
+
+def resample_withdrawls(withdrawls_df: pd.DataFrame) -> pd.DataFrame:
+    weekly_withdrawls_df = DataTransforms.upscale_monthly_to_weekly(withdrawls_df.copy(), "period", "value")
+    return weekly_withdrawls_df[["period", "value"]].rename(columns={"value": "NG_Gross_Withdrawls"})
+
+def merge_features(region: StorageRegion, weekly_usage_df: pd.DataFrame, seasonal_deviation_df: pd.DataFrame,
+                   weekly_degree_days_df: pd.DataFrame, weekly_withdrawls_df: pd.DataFrame, storage_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merges the weekly series into the raw feature table, in the column order
+    exported by raw_features.ipynb.
+    """
+    usage_cols = [consumption_type.name for consumption_type in usage_type_to_feature_name]
+    usage_feature_names = list(usage_type_to_feature_name.values())
+    usage_features_df = pd.merge(
+        weekly_usage_df[["period"] + usage_cols].rename(columns=dict(zip(usage_cols, usage_feature_names))),
+        seasonal_deviation_df,
+        on="period"
+    )
+    final_feature_dfs: List[pd.DataFrame] = [
+        usage_features_df[["period", usage_feature_names[0], "NG_Seasonal_Power_Gen"] + usage_feature_names[1:]],
+        weekly_degree_days_df,
+        weekly_withdrawls_df,
+    ]
+
+    features = reduce(lambda x, y: pd.merge(x, y, on="period"), final_feature_dfs)
+    storage_col = f"{region.name}_NG_Storage_BCF"
+    return enforce_schema(pd.merge(features, storage_df[["period", storage_col]], on="period"))
+
+def build_raw_features(region: StorageRegion, series: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Builds the weekly raw feature table (as exported by raw_features.ipynb)
+    from the stored series of a region. Input frames are not modified.
+    """
+    weekly_usage_df = resample_usage(series["ng_usage"])
+    seasonal_deviation_df = power_gen_deviation(interpolate_power_gen(weekly_usage_df))
+    return merge_features(
+        region,
+        weekly_usage_df,
+        seasonal_deviation_df,
+        resample_degree_days(series["degree_days"]),
+        resample_withdrawls(series["ng_withdrawls"]),
+        series["storage"],
+    )
+
+def build_engineered_features(region: StorageRegion, raw_features_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the lagged and rolling features of engineered_features.ipynb to a
+    raw feature table, dropping the leading weeks without a full window.
+    """
+    storage_col = f"{region.name}_NG_Storage_BCF"
+    return (raw_features_df
+        .sort_values(by="period")
+        .assign(
+            Storage_t1=lambda x: x[storage_col].shift(1),
+            Storage_t2=lambda x: x[storage_col].shift(2),
+            Storage_4Wk_Avg=lambda x: x[storage_col].rolling(window=4).mean(),
+            Heating_Days_4Wk_Avg=lambda x: x['Heating_Days'].rolling(window=4).mean(),
+            Cooling_Days_4Wk_Avg=lambda x: x['Cooling_Days'].rolling(window=4).mean(),
+        )
+        .dropna()
+        .reset_index(drop=True)
+        .pipe(enforce_schema)
+    )
+
+def refresh_series(region: StorageRegion, name: str, fetch: Callable[[Optional[datetime]], pd.DataFrame],
+                   store: SeriesStore, lookback: timedelta = DEFAULT_LOOKBACK, full: bool = False) -> pd.DataFrame:
+    """
+    Pulls a single series from its last stored period minus the lookback
+    window (floored to the month start so monthly prints are re-pulled
+    whole) and merges it into the store. Pulls the full history when full
+    is set or nothing is stored yet.
+    """
+    last_period = None if full else store.last_period(region, name)
+    start = (last_period - lookback).replace(day=1) if last_period is not None else None
+    print(f"Refreshing {region.name} {name} from {start.date() if start is not None else 'full history'}")
+
+    return store.upsert(region, name, fetch(start))
+
+def refresh_region(region: StorageRegion, store: Optional[SeriesStore] = None,
+                   lookback: timedelta = DEFAULT_LOOKBACK, full: bool = False, output_dir: Path = DATA_DIR) -> pd.DataFrame:
+    """
+    Incrementally refreshes every stored series of a region (see
+    refresh_series()), then rebuilds the raw feature table and publishes it
+    to the feature store and {output_dir}/{REGION}_data_raw.csv.
+    """
+    store = store or SeriesStore()
+    puller = EIADataPuller(region)
+
+    series: Dict[str, pd.DataFrame] = {
+        name: refresh_series(region, name, fetch, store, lookback, full)
+        for name, fetch in series_fetchers(region, puller).items()
+    }
+
+    raw_features_df = build_raw_features(region, series)
+    store.feature_store.publish(region, RAW_FEATURES, raw_features_df, output_dir)
+    return raw_features_df
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    refresh_region(StorageRegion.EAST)
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+from utils.backtest import target_col
+from utils.custom_types import StorageRegion, storage_region_to_noaa_states
+from utils.feature_store import FeatureStore, ENGINEERED_FEATURES
+from utils.instrumentation import instrumented
+from utils.nowcast import REPORT_WEEK, RegionNowcaster
+
+DEFAULT_SCENARIOS = 10_000
+DEFAULT_HORIZON = 30 # Weeks, about one injection or withdrawal season
+DEFAULT_BLOCK_WEEKS = 4 # Consecutive historical weeks per draw, keeps cold/warm spells intact
+DEFAULT_PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+ALIGN_DAYS = 3 # Analog weeks are the historical weeks within this many days of the same day of year
+TOTAL = "TOTAL"
+
+# Engineered features derived from the simulated storage and weather paths (see refresh.build_engineered_features)
+WEATHER_COLS = ["Heating_Days", "Cooling_Days"]
+ROLLING_WEEKS = 4
+STORAGE_LAG_COLS = {"Storage_t1": 1, "Storage_t2": 2}
+STORAGE_AVG_COL = "Storage_4Wk_Avg"
+
+class ScenarioResult:
+    """
+    Simulated weekly storage of every scenario of a region, (scenarios x
+    weeks) for the weeks in periods.
+    """
+    def __init__(self, region_name: str, as_of: pd.Timestamp, start_storage: float, periods: pd.DatetimeIndex, storage: np.ndarray):
+        self.region_name = region_name
+        self.as_of = as_of
+        self.start_storage = start_storage
+        self.periods = periods
+        self.storage = storage
+
+    def bands(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> pd.DataFrame:
+        """
+        Storage percentiles of every simulated week, one p{q} column per
+        percentile.
+        """
+        values = np.percentile(self.storage, percentiles, axis=0)
+        return pd.DataFrame({"period": self.periods, **{f"p{q:g}": row for q, row in zip(percentiles, values)}})
+
+    def end_of_horizon(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        final = self.storage[:, -1]
+        return {
+            "region": self.region_name,
+            "as_of": self.as_of.date().isoformat(),
+            "end": self.periods[-1].date().isoformat(),
+            "start_bcf": self.start_storage,
+            "mean_bcf": float(final.mean()),
+            **{f"p{q:g}": float(value) for q, value in zip(percentiles, np.percentile(final, percentiles))},
+        }
+
+def draw_analog_weeks(history: pd.DatetimeIndex, as_of: pd.Timestamp, horizon: int, n_scenarios: int,
+                      block_weeks: int = DEFAULT_BLOCK_WEEKS, seed: int = 0) -> np.ndarray:
+    """
+    (scenarios x horizon) indices into history of the historical week
+    standing in for each future week. Every block_weeks future weeks come
+    from one run of consecutive history weeks starting within ALIGN_DAYS
+    days of the block's day of year, drawn independently per scenario and
+    block (a seasonal block bootstrap). Drawn with one loop per block,
+    vectorized across scenarios.
+    """
+    if horizon < 1 or n_scenarios < 1 or block_weeks < 1:
+        raise ValueError(f"Horizon, scenarios and block weeks must be at least 1, got {horizon}, {n_scenarios} and {block_weeks}")
+    history = pd.DatetimeIndex(history)
+    rng = np.random.default_rng(seed)
+    doy = history.dayofyear.to_numpy()
+    # Start rows whose next block_weeks - 1 weeks are all in history
+    run_end = np.arange(len(history)) + block_weeks - 1
+    complete = run_end < len(history)
+    complete[complete] = (history[run_end[complete]] - history[complete]) == (block_weeks - 1) * REPORT_WEEK
+
+    idx = np.empty((n_scenarios, horizon), dtype=np.int64)
+    for block_start in range(0, horizon, block_weeks):
+        target_doy = (as_of + (block_start + 1) * REPORT_WEEK).dayofyear
+        distance = np.abs(doy - target_doy)
+        candidates = np.flatnonzero(complete & (np.minimum(distance, 365 - distance) <= ALIGN_DAYS))
+        if len(candidates) == 0:
+            raise ValueError(f"No complete {block_weeks}-week history runs near day {target_doy} of the year")
+        starts = candidates[rng.integers(0, len(candidates), size=n_scenarios)]
+        width = min(block_weeks, horizon - block_start)
+        idx[:, block_start:block_start + width] = starts[:, None] + np.arange(width)
+    return idx
+
+@instrumented()
+def simulate_region(model: RegionNowcaster, history_df: pd.DataFrame, analog_idx: np.ndarray) -> ScenarioResult:
+    """
+    Pushes every scenario through the one-step storage regression of
+    model, one batched step per week: each step predicts next week's
+    storage for all scenarios with one matrix product, then builds the
+    next feature rows from the analog history weeks (weather and the
+    other exogenous columns) and the simulated storage and weather paths
+    (lags and 4-week averages). history_df is the table model was fit on
+    and analog_idx indexes its rows sorted by period.
+    """
+    history_df = history_df.sort_values(by="period").reset_index(drop=True)
+    target = target_col(model.region)
+    history = history_df[model.feature_cols].to_numpy(dtype=np.float64)
+    n_scenarios, horizon = analog_idx.shape
+    col = model.feature_idx
+
+    # Trailing ROLLING_WEEKS values of the paths, oldest first, shared by every scenario at the start
+    storage_tail = np.tile(history_df[target].to_numpy(dtype=np.float64)[-ROLLING_WEEKS:], (n_scenarios, 1))
+    weather_tails = {
+        weather: np.tile(history_df[weather].to_numpy(dtype=np.float64)[-ROLLING_WEEKS:], (n_scenarios, 1))
+        for weather in WEATHER_COLS if f"{weather}_{ROLLING_WEEKS}Wk_Avg" in col
+    }
+
+    rows = np.tile(model.latest, (n_scenarios, 1))
+    storage = np.empty((n_scenarios, horizon), dtype=np.float64)
+    for week in range(horizon):
+        storage[:, week] = model.predict(rows)
+
+        rows = history[analog_idx[:, week]] # Exogenous columns of the analog week, copied by the fancy index
+        storage_tail = np.column_stack([storage_tail[:, 1:], storage[:, week]])
+        rows[:, col[target]] = storage[:, week]
+        for lag_col, lag in STORAGE_LAG_COLS.items():
+            if lag_col in col:
+                rows[:, col[lag_col]] = storage_tail[:, -1 - lag]
+        if STORAGE_AVG_COL in col:
+            rows[:, col[STORAGE_AVG_COL]] = storage_tail.mean(axis=1)
+        for weather, tail in weather_tails.items():
+            tail = weather_tails[weather] = np.column_stack([tail[:, 1:], rows[:, col[weather]]])
+            rows[:, col[f"{weather}_{ROLLING_WEEKS}Wk_Avg"]] = tail.mean(axis=1)
+
+    periods = pd.date_range(model.as_of + REPORT_WEEK, periods=horizon, freq=REPORT_WEEK)
+    return ScenarioResult(model.region.name, model.as_of, model.latest_storage, periods, storage)
+
+@instrumented()
+def simulate_regions(storage_regions: Optional[List[StorageRegion]] = None, n_scenarios: int = DEFAULT_SCENARIOS,
+                     horizon: int = DEFAULT_HORIZON, block_weeks: int = DEFAULT_BLOCK_WEEKS, seed: int = 0,
+                     feature_store: Optional[FeatureStore] = None) -> Dict[str, ScenarioResult]:
+    """
+    Storage scenarios of every region with a stored engineered feature
+    table (all of them by default) from the weeks after their latest
+    week. Scenario i uses the same historical weeks in every region, so
+    the regions stay jointly consistent and, with more than one region
+    ending on the same week, their sum is returned as TOTAL.
+    """
+    feature_store = feature_store or FeatureStore()
+    storage_regions = storage_regions or [
+        region for region in storage_region_to_noaa_states if feature_store.exists(region, ENGINEERED_FEATURES)
+    ]
+    if not storage_regions:
+        raise ValueError("No engineered feature tables stored, build a region first")
+    tables = {region: feature_store.read(region, ENGINEERED_FEATURES).sort_values(by="period").reset_index(drop=True)
+              for region in storage_regions}
+    models = {region: RegionNowcaster.fit(region, df) for region, df in tables.items()}
+
+    # Analog weeks are drawn once from the weeks every region has, then mapped to each table's rows
+    common = pd.DatetimeIndex(sorted(set.intersection(*(set(df["period"]) for df in tables.values()))))
+    as_of = max(model.as_of for model in models.values())
+    analog = common.to_numpy()[draw_analog_weeks(common, as_of, horizon, n_scenarios, block_weeks, seed)]
+    print(f"Simulating {n_scenarios} scenarios of {horizon} weeks from {as_of.date()} for {[region.name for region in storage_regions]}")
+
+    results = {
+        region.name: simulate_region(
+            models[region], tables[region],
+            pd.DatetimeIndex(tables[region]["period"]).get_indexer(analog.ravel()).reshape(analog.shape),
+        )
+        for region in storage_regions
+    }
+    if len(results) > 1 and len({model.as_of for model in models.values()}) == 1: # Regions ending on different weeks don't line up
+        first = next(iter(results.values()))
+        results[TOTAL] = ScenarioResult(
+            TOTAL, first.as_of, sum(result.start_storage for result in results.values()), first.periods,
+            sum(result.storage for result in results.values()),
+        )
+    return results
+
+def summarize_scenarios(results: Dict[str, ScenarioResult], percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> pd.DataFrame:
+    return pd.DataFrame([result.end_of_horizon(percentiles) for result in results.values()])
+
+def scenario_bands(results: Dict[str, ScenarioResult], percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> pd.DataFrame:
+    return pd.concat([result.bands(percentiles).assign(region=name) for name, result in results.items()], ignore_index=True)
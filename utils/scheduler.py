@@ -0,0 +1,211 @@
+import os
+import json
+import math
+import time
+import random
+import threading
+import requests
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional, Tuple
+from utils.instrumentation import record_response
+
+EIA = "eia"
+NOAA = "noaa"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504}) # Throttled or transient server errors
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 0.5 # Seconds before the first retry, doubled on every later one
+DEFAULT_MAX_BACKOFF = 30.0
+DEFAULT_TIMEOUT = 60.0 # Seconds to connect or between bytes of a response
+
+# Source -> (requests per second, burst, concurrent requests), shared by every fetcher of that source.
+# The EIA rate is per API key, set NAT_GAS_EIA_RATE / NAT_GAS_EIA_BURST to match a key's quota
+SCHEDULER_LIMITS: Dict[str, Tuple[float, int, int]] = {
+    EIA: (float(os.getenv("NAT_GAS_EIA_RATE", "5")), int(os.getenv("NAT_GAS_EIA_BURST", "10")), 8),
+    NOAA: (float(os.getenv("NAT_GAS_NOAA_RATE", "20")), int(os.getenv("NAT_GAS_NOAA_BURST", "20")), 8),
+}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket holding up to burst tokens, refilled at rate
+    tokens per second. Callers reserve a token and sleep outside the lock
+    until it is due, so waiting threads are released in arrival order at
+    exactly rate per second. An infinite rate never waits.
+    """
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Rate must be positive and burst at least 1, got {rate} and {burst}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """
+        Takes a token, sleeping until it is available. Returns the seconds
+        waited.
+        """
+        if math.isinf(self.rate):
+            return 0.0
+        with self._lock:
+            self._refill()
+            self._tokens -= 1 # Negative balance = tokens already promised to earlier callers
+            wait = max(0.0, -self._tokens / self.rate)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """
+        Holds back every caller for at least seconds, e.g. after a 429.
+        """
+        if math.isinf(self.rate):
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+class SchedulerStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.deduped = 0
+        self.throttled_seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (f"SchedulerStats(requests={self.requests}, retries={self.retries}, deduped={self.deduped}, "
+                f"throttled_seconds={self.throttled_seconds:.1f})")
+
+class RequestScheduler:
+    """
+    Single entry point for the GETs of one source. Every request takes a
+    token from a shared TokenBucket and one of max_concurrency slots on a
+    pooled keep-alive session. Throttled (429) and transient (5xx,
+    connection error, timeout) failures are retried up to retries times
+    with jittered exponential backoff, or after Retry-After when the
+    server sends one, and a 429 pauses the whole bucket. Only the failed
+    request is retried, so pages already received are kept. Identical
+    requests in flight at the same time share one response. Responses
+    still failing after the retries raise requests.HTTPError.
+    """
+    def __init__(self, rate: float, burst: int, max_concurrency: int, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, max_backoff: float = DEFAULT_MAX_BACKOFF, timeout: float = DEFAULT_TIMEOUT):
+        if max_concurrency < 1 or retries < 0:
+            raise ValueError(f"max_concurrency must be at least 1 and retries at least 0, got {max_concurrency} and {retries}")
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.stats = SchedulerStats()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.hooks["response"].append(record_response)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: str, headers: Optional[Dict[str, str]], params: Optional[Dict[str, str]]) -> str:
+        return f"{url}|{json.dumps(headers or {}, sort_keys=True)}|{json.dumps(params or {}, sort_keys=True)}"
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        Drop-in for requests.get(url, headers=, params=) that only returns
+        successful responses.
+        """
+        key = self._key(url, headers, params)
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.stats.deduped += 1
+        if not leader:
+            return future.result()
+
+        try:
+            res = self._get_with_retries(url, headers, params)
+            future.set_result(res)
+            return res
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _delay(self, attempt: int, res: Optional[requests.Response]) -> float:
+        retry_after = res.headers.get("Retry-After", "") if res is not None else ""
+        if retry_after.replace(".", "", 1).isdigit():
+            return float(retry_after)
+        cap = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def _record(self, sent: int = 0, retries: int = 0, throttled_seconds: float = 0.0) -> None:
+        with self._lock:
+            self.stats.requests += sent
+            self.stats.retries += retries
+            self.stats.throttled_seconds += throttled_seconds
+
+    def _get_with_retries(self, url: str, headers: Optional[Dict[str, str]], params: Optional[Dict[str, str]]) -> requests.Response:
+        attempt = 0
+        while True:
+            self._record(throttled_seconds=self.bucket.acquire())
+            res: Optional[requests.Response] = None
+            try:
+                with self._slots:
+                    self._record(sent=1)
+                    res = self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                reason = type(e).__name__
+            else:
+                if res.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    res.raise_for_status()
+                    return res
+                reason = f"HTTP {res.status_code}"
+
+            delay = self._delay(attempt, res)
+            if res is not None and res.status_code == 429:
+                self.bucket.pause(delay)
+            attempt += 1
+            self._record(retries=1)
+            print(f"Retrying {url} in {delay:.2f}s after {reason} ({attempt}/{self.retries})")
+            time.sleep(delay)
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(source: str) -> RequestScheduler:
+    """
+    The shared scheduler of a source (EIA or NOAA), created on first use
+    with its SCHEDULER_LIMITS.
+    """
+    with _schedulers_lock:
+        if source not in _schedulers:
+            if source not in SCHEDULER_LIMITS:
+                raise ValueError(f"Unknown source {source}, expected one of {list(SCHEDULER_LIMITS)}")
+            _schedulers[source] = RequestScheduler(*SCHEDULER_LIMITS[source])
+        return _schedulers[source]
+
+def set_scheduler(source: str, scheduler: Optional[RequestScheduler]) -> Optional[RequestScheduler]:
+    """
+    Replaces the shared scheduler of a source (None = recreate from
+    SCHEDULER_LIMITS on next use) and returns the previous one.
+    """
+    with _schedulers_lock:
+        previous = _schedulers.pop(source, None)
+        if scheduler is not None:
+            _schedulers[source] = scheduler
+        return previous
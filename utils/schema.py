@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Union
+
+# Declared dtypes of every series and feature table, by column role
+PERIOD_DTYPE = "datetime64[ns]"
+VALUE_DTYPE = np.float32 # Every measurement (BCF, MMcf, MWh, degree days), 7 significant digits
+CALENDAR_DTYPE = np.int16 # Year, Month and Week helper columns
+CATEGORY_DTYPE = "category"
+
+CALENDAR_COLS = ["Year", "Month", "Week"]
+FACET_COLS = ["region", "respondent", "respondent-name", "series", "duoarea", "process"]
+
+def week_of_year(dates: Union[np.ndarray, pd.Series]) -> np.ndarray:
+    """
+    Sunday-based week of year, equal to strftime("%U"), computed with
+    datetime64 arithmetic.
+    """
+    days = np.asarray(dates).astype("datetime64[D]")
+    day_of_year = (days - days.astype("datetime64[Y]")).astype(np.int64) # 0-based
+    weekday = (days.astype(np.int64) + 4) % 7 # 1970-01-01 was a Thursday, Sunday = 0
+    return ((day_of_year + 7 - weekday) // 7).astype(CALENDAR_DTYPE)
+
+def calendar_columns(dates: Union[np.ndarray, pd.Series]) -> Dict[str, np.ndarray]:
+    """
+    Year, Month and Week of every date, as CALENDAR_DTYPE arrays.
+    """
+    months = np.asarray(dates).astype("datetime64[M]").astype(np.int64)
+    return {
+        "Year": (months // 12 + 1970).astype(CALENDAR_DTYPE),
+        "Month": (months % 12 + 1).astype(CALENDAR_DTYPE),
+        "Week": week_of_year(dates),
+    }
+
+def with_calendar(df: pd.DataFrame, cols: List[str], datetime_col: str = "period") -> pd.DataFrame:
+    """
+    df with the cols calendar columns (e.g. ["Year", "Month"]) of
+    datetime_col appended.
+    """
+    calendar = calendar_columns(df[datetime_col])
+    return df.assign(**{col: calendar[col] for col in cols})
+
+def column_dtype(df: pd.DataFrame, col: str) -> object:
+    """
+    Declared dtype of a column: period is datetime64, the calendar helpers
+    are int16, facets are categorical and every other numeric column is a
+    float32 value. Non-numeric columns keep their dtype.
+    """
+    if col == "period":
+        return PERIOD_DTYPE
+    if col in CALENDAR_COLS:
+        return CALENDAR_DTYPE
+    if col in FACET_COLS:
+        return CATEGORY_DTYPE
+    if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+        return VALUE_DTYPE
+    return df[col].dtype
+
+def enforce_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts every column of df to its declared dtype, copying only the
+    columns that change.
+    """
+    casts = {col: dtype for col in df.columns if df[col].dtype != (dtype := column_dtype(df, col))}
+    return df.astype(casts) if casts else df
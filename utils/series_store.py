@@ -0,0 +1,47 @@
+import pandas as pd
+from typing import List, Optional
+from utils.custom_types import StorageRegion
+from utils.feature_store import FeatureStore
+from utils.schema import enforce_schema
+
+class SeriesStore:
+    """
+    Keeps each pulled series of a region as its own partition in the
+    feature store, so refreshes can append to a single series without
+    re-pulling the others. Series are cast to the declared schema on the
+    way in and out, so series stored before it are compacted on load.
+    """
+    def __init__(self, feature_store: Optional[FeatureStore] = None):
+        self.feature_store = feature_store or FeatureStore()
+
+    def names(self, region: StorageRegion) -> List[str]:
+        return self.feature_store.names(region)
+
+    def load(self, region: StorageRegion, name: str) -> Optional[pd.DataFrame]:
+        df = self.feature_store.read(region, name)
+        return enforce_schema(df) if df is not None else None
+
+    def save(self, region: StorageRegion, name: str, df: pd.DataFrame) -> None:
+        self.feature_store.write(region, name, enforce_schema(df))
+
+    def last_period(self, region: StorageRegion, name: str) -> Optional[pd.Timestamp]:
+        return self.feature_store.last_period(region, name)
+
+    def upsert(self, region: StorageRegion, name: str, new_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Merges newly pulled rows into the stored series. Every stored row from
+        the start of new_df onwards is replaced, so revised values (and rows
+        dropped in a revision) are picked up from the lookback window.
+        """
+        existing_df = self.load(region, name)
+        if existing_df is not None and len(new_df) > 0:
+            kept_df = existing_df[existing_df["period"] < new_df["period"].min()]
+            merged_df = pd.concat([kept_df, new_df], ignore_index=True)
+        elif existing_df is not None:
+            merged_df = existing_df
+        else:
+            merged_df = new_df
+
+        merged_df = enforce_schema(merged_df.sort_values(by="period").reset_index(drop=True)) # Returned as stored
+        self.save(region, name, merged_df)
+        return merged_df